@@ -5,6 +5,17 @@ Description:
     using the recursive backtracking algorithm.
 """
 
+import time
+
+
+# Row, column and box of each cell of a flat (81) board
+ROW_OF = [i // 9 for i in range(81)]
+COL_OF = [i % 9 for i in range(81)]
+BOX_OF = [(i // 27) * 3 + (i % 9) // 3 for i in range(81)]
+
+# Bitmask with every digit 1-9 (bit d set for digit d)
+ALL_DIGITS = 0b1111111110
+
 
 def solve(b):
     """
@@ -86,6 +97,131 @@ def is_valid(b, num, pos):
     return True  # Valid position
 
 
+def is_valid_board(b):
+    """
+    Check that the given values of a board don't repeat in any row, col, or grid
+    :param b: 2d list of ints (board)
+    :returns: bool valid
+    """
+
+    for i in range(len(b)):
+        for j in range(len(b[0])):
+            if b[i][j] != 0 and not is_valid(b, b[i][j], (i, j)):
+                return False
+    return True
+
+
+def solve_flat(buf):
+    """
+    Solves a flat board in place, reading and writing the buffer without per-access numpy boxing
+    :param buf: 81 ints (0 = empty) as any writable buffer (ex. (81,) or (9, 9) numpy array, also transposed
+        or strided views, bytearray) or a list
+    :returns: bool solved (buffer updated with the solution if so)
+    """
+    return count_solutions(buf, limit=1) == 1
+
+
+def count_solutions(buf, limit=2, deadline=None):
+    """
+    Count the solutions of a flat board (up to a limit), writing the first one found back in place
+    :param buf: 81 ints (0 = empty) as any writable buffer or a list (see solve_flat)
+    :param limit: stop counting once this many solutions are found (2 checks for a unique solution)
+    :param deadline: (optional) time.perf_counter() value after which TimeoutError is raised
+    :returns: int number of solutions found (0 if the givens repeat)
+    """
+
+    if isinstance(buf, list):
+        view = buf
+    else:
+        view = memoryview(buf)
+        if view.ndim != 1 and view.c_contiguous:
+            # Flatten (ex. a 9x9 array) keeping the item format
+            view = view.cast('B').cast(view.format)
+    if isinstance(view, memoryview) and view.ndim == 2:
+        # Not C-contiguous (ex. a transposed 9x9 array): read and write through (row, col) indexes
+        if view.shape != (9, 9):
+            raise ValueError('board must have 81 values')
+        values = [num for row in view.tolist() for num in row]
+    else:
+        values = view.tolist() if isinstance(view, memoryview) else list(view)
+    if len(values) != 81:
+        raise ValueError('board must have 81 values')
+
+    # Digits used in each row, column and box
+    rows, cols, boxes = [0] * 9, [0] * 9, [0] * 9
+    empty = []
+    for i, num in enumerate(values):
+        if num == 0:
+            empty.append(i)
+            continue
+        if not 0 < num < 10:
+            return 0  # Invalid given
+        bit = 1 << num
+        if (rows[ROW_OF[i]] | cols[COL_OF[i]] | boxes[BOX_OF[i]]) & bit:
+            return 0  # Repeated given
+        rows[ROW_OF[i]] |= bit
+        cols[COL_OF[i]] |= bit
+        boxes[BOX_OF[i]] |= bit
+
+    found = 0
+    first = None  # First solution found
+    nodes = 0
+
+    def search(remaining):
+        nonlocal found, first, nodes
+        nodes += 1
+        if deadline is not None and nodes % 256 == 0 and time.perf_counter() > deadline:
+            raise TimeoutError('search ran past its deadline')
+        if not remaining:
+            found += 1
+            if first is None:
+                first = list(values)
+            return found >= limit
+
+        # Fill the cell with the fewest candidates first
+        best, best_count, best_mask = 0, 10, 0
+        for k, i in enumerate(remaining):
+            mask = ALL_DIGITS & ~(rows[ROW_OF[i]] | cols[COL_OF[i]] | boxes[BOX_OF[i]])
+            count = bin(mask).count('1')
+            if count < best_count:
+                best, best_count, best_mask = k, count, mask
+                if count < 2:
+                    break
+        if best_count == 0:
+            return False
+
+        i = remaining[best]
+        rest = remaining[:best] + remaining[best + 1:]
+        r, c, x = ROW_OF[i], COL_OF[i], BOX_OF[i]
+        while best_mask:
+            bit = best_mask & -best_mask
+            best_mask ^= bit
+            rows[r] |= bit
+            cols[c] |= bit
+            boxes[x] |= bit
+            values[i] = bit.bit_length() - 1
+            done = search(rest)
+            rows[r] ^= bit
+            cols[c] ^= bit
+            boxes[x] ^= bit
+            if done:
+                return True
+        values[i] = 0
+        return False
+
+    search(empty)
+
+    if first is not None:
+        # Write the (first) solution back into the buffer
+        if isinstance(view, memoryview) and view.ndim == 2:
+            for i in empty:
+                view[ROW_OF[i], COL_OF[i]] = first[i]
+        else:
+            for i in empty:
+                view[i] = first[i]
+    return found
+
+
 def show(b):
     """
     Prints board in a readable format (testing)
@@ -0,0 +1,94 @@
+"""
+File: assets.py
+Description:
+    Asset manager used by the game and player modules. Loads every image
+    under the Assets folder once and hands out shared, pre-scaled surfaces
+    so no images are loaded from disk while screens are running.
+"""
+
+import os
+from collections import OrderedDict
+
+import pygame
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+
+class AssetManager():
+    def __init__(self, root='Assets', budget=32 * 1024 * 1024):
+        """
+        Cache of converted (and scaled) image surfaces. The budget only covers the scaled
+        surfaces: the originals are preloaded and kept for the whole run (never evicted,
+        so screens never read from disk), their memory is loaded_bytes
+        :param root: folder containing the image assets
+        :param budget: max bytes of scaled surfaces kept in the cache (originals not counted)
+        """
+
+        self.root = root
+        self.budget = budget
+        self.loaded = {}  # path: converted surface at original size (kept, outside the budget)
+        self.loaded_bytes = 0
+        self.scaled = OrderedDict()  # (path, size): scaled surface (least recently used first)
+        self.scaled_bytes = 0
+        self.disk_loads = 0  # Number of images read from disk
+
+    def preload(self):
+        """Load every image under the root folder (call once the display mode is set)"""
+
+        for folder, _, files in os.walk(self.root):
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    self.load(os.path.join(folder, name).replace(os.sep, '/'))
+
+    def load(self, path):
+        """
+        Get an image at its original size, reading it from disk only once
+        :param path: path of the image file
+        :returns: shared surface (do not draw onto it)
+        """
+
+        surface = self.loaded.get(path)
+        if surface is None:
+            surface = pygame.image.load(path).convert_alpha()
+            self.loaded[path] = surface
+            self.loaded_bytes += surface_bytes(surface)
+            self.disk_loads += 1
+        return surface
+
+    def get(self, path, size=None):
+        """
+        Get an image scaled to a size, scaling it only once
+        :param path: path of the image file
+        :param size: (optional) (width, height) to scale to
+        :returns: shared surface (do not draw onto it)
+        """
+
+        if size is None:
+            return self.load(path)
+
+        key = (path, tuple(size))
+        surface = self.scaled.get(key)
+        if surface is not None:
+            self.scaled.move_to_end(key)
+            return surface
+
+        surface = pygame.transform.scale(self.load(path), key[1])
+        self.scaled[key] = surface
+        self.scaled_bytes += surface_bytes(surface)
+
+        # Evict least recently used surfaces over the memory budget
+        while self.scaled_bytes > self.budget and len(self.scaled) > 1:
+            _, old = self.scaled.popitem(last=False)
+            self.scaled_bytes -= surface_bytes(old)
+
+        return surface
+
+
+def surface_bytes(surface):
+    """Memory used by a surface's pixels"""
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+# Shared asset manager for all screens
+assets = AssetManager()
@@ -0,0 +1,412 @@
+"""
+File: benchmark.py
+Description:
+    Benchmarks for the image pipeline in the img_solver module. Compares
+    the latency and digit readings of the pipeline's scaling strategies
+    on high resolution (12 MP) versions of the images in Boards, and
+    measures accuracy and per-stage latency over the Boards corpus against
+    its ground truth files, as a JSON report that can gate changes.
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from algorithm import solve, solve_flat, is_valid_board
+from formats import read_puzzles
+from img_solver import display_image_solution, render_solution, render_detected_digits, HEIGHT_IMG, WIDTH_IMG
+from process import display_nums, draw_grid, initialize_prediction_model
+from randomize import random_sudoku_board, HARD_MODE
+from template_classifier import TemplateClassifier
+from tracing import Tracer
+
+
+def upscale_photo(img, size=(4000, 3000)):
+    """
+    Simulate a phone photo by upscaling a board image to a large size
+    :param img: image of a sudoku board
+    :param size: (width, height) of the photo (12 MP by default)
+    :returns: (high resolution image, scale from the image to the photo, (x, y) offset in the photo)
+    """
+
+    width, height = size
+    ratio = min(width / img.shape[1], height / img.shape[0])
+    photo = cv2.resize(img, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_CUBIC)
+
+    # Pad to the photo's aspect ratio with the page's color (a different background would outline
+    # the page, which then becomes the largest quadrilateral instead of the board)
+    edges = np.concatenate([img[0], img[-1], img[:, 0], img[:, -1]])
+    page = [int(value) for value in np.median(edges, axis=0)]
+    y = (height - photo.shape[0]) // 2
+    x = (width - photo.shape[1]) // 2
+    photo = cv2.copyMakeBorder(photo, y, height - photo.shape[0] - y, x, width - photo.shape[1] - x,
+                               cv2.BORDER_CONSTANT, value=page)
+    return photo, ratio, (x, y)
+
+
+def image_corners(result, shape):
+    """
+    Board corners found by a run, in the coordinates of the image it read
+    :param result: ImageResult (corners are in the coordinates of its scaled result.image)
+    :param shape: shape of the image that was read
+    :returns: 4x2 float array
+    """
+
+    scale = (shape[1] / result.image.shape[1], shape[0] / result.image.shape[0])
+    return np.float32(result.corners).reshape(4, 2) * scale
+
+
+def time_solve(path_img, scaling, repeats, model=None):
+    """
+    Run the compute core of the pipeline several times
+    :param path_img: image file of a sudoku board
+    :param scaling: scaling strategy passed to display_image_solution
+    :param repeats: number of timed runs
+    :param model: (optional) digit classifier passed to display_image_solution
+    :returns: median latency in ms, ImageResult of the last run
+    """
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = display_image_solution(path_img, scaling=scaling, model=model)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def compare_scaling(paths, size=(4000, 3000), repeats=3, model=None):
+    """
+    Compare the 'resize' and 'proxy' scaling strategies on 12 MP photos
+    :param paths: list of image files of sudoku boards
+    :param size: (width, height) of the simulated photos
+    :param repeats: number of timed runs per image and strategy
+    :param model: (optional) digit classifier passed to display_image_solution, the CNN by default
+    :returns: list of dicts (one row per image and strategy)
+    """
+
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for path_img in paths:
+            img = cv2.imread(path_img)
+            if img is None:
+                continue
+
+            # Readings at the image's own resolution are used as the reference
+            reference_result = display_image_solution(path_img, model=model)
+            if reference_result.error:
+                continue
+            reference = reference_result.digits
+            photo, ratio, offset = upscale_photo(img, size)
+            photo_path = os.path.join(folder, os.path.basename(path_img) + '.png')
+            cv2.imwrite(photo_path, photo)
+
+            # Where the board is in the photo, so each strategy is checked to find it (not the page)
+            expected = image_corners(reference_result, img.shape) * ratio + offset
+            tolerance = 0.02 * ratio * max(img.shape[:2])
+
+            for scaling in ('resize', 'proxy'):
+                latency, result = time_solve(photo_path, scaling, repeats, model)
+                if not result.error:
+                    error = np.abs(image_corners(result, photo.shape) - expected).max()
+                    assert error <= tolerance, \
+                        f'{path_img} ({scaling}): board found {error:.0f} px away from the board in the photo'
+                agree = None
+                if reference and result.digits:
+                    agree = sum(a == b for a, b in zip(reference, result.digits))
+                rows.append({'image': os.path.basename(path_img), 'scaling': scaling,
+                             'ms': round(latency, 1), 'error': result.error,
+                             'agree': agree, 'solved': bool(result.solution and all(
+                                 d or s for d, s in zip(result.digits, result.solution)))})
+    return rows
+
+
+def compare_solvers(boards, repeats=3):
+    """
+    Compare the list of numpy rows path (as img_solver used to call solve) with the flat buffer solver
+    :param boards: list of 2d lists of ints (boards to solve)
+    :param repeats: number of timed runs per board and solver
+    :returns: list of dicts (one row per solver)
+    """
+
+    solvers = {
+        'rows (np.array_split)': lambda nums: solve(np.array_split(nums.copy(), 9)),
+        'lists': lambda nums: solve(nums.reshape(9, 9).tolist()),
+        'flat buffer': lambda nums: solve_flat(nums.copy())
+    }
+
+    rows = []
+    for name, func in solvers.items():
+        times = []
+        for board in boards:
+            nums = np.array(board, np.int64).reshape(81)
+            for _ in range(repeats):
+                start = time.perf_counter()
+                func(nums)
+                times.append((time.perf_counter() - start) * 1000)
+        rows.append({'solver': name, 'median_ms': round(statistics.median(times), 3),
+                     'max_ms': round(max(times), 3), 'total_ms': round(sum(times) / repeats, 1)})
+    return rows
+
+
+def render_putText(result):
+    """Solution and detected digits views drawn per cell with cv2.putText and two full size passes (reference)"""
+
+    blank_img = np.zeros((HEIGHT_IMG, WIDTH_IMG, 3), np.uint8)
+    detected = draw_grid(display_nums(blank_img, result.digits, color=(225, 144, 30)))
+
+    blank_img = np.zeros((HEIGHT_IMG, WIDTH_IMG, 3), np.uint8)
+    img_solved_digits = display_nums(blank_img, result.solution)
+    size = (result.image.shape[1], result.image.shape[0])
+    img_inverse_warp = cv2.warpPerspective(img_solved_digits, np.linalg.inv(result.matrix), size)
+    return cv2.addWeighted(img_inverse_warp, 1, result.image, 0.5, 1), detected
+
+
+def render_stamps(result):
+    """Solution and detected digits views from digit stamps, the grid template and a bounding box projection"""
+    return render_solution(result), render_detected_digits(result)
+
+
+def compare_render(paths, repeats=50, model=None):
+    """
+    Compare the per-image cost of drawing the overlays with cv2.putText against the digit stamps
+    :param paths: list of image files of sudoku boards
+    :param repeats: number of timed renders per image and renderer
+    :param model: (optional) digit classifier passed to display_image_solution, the CNN by default
+    :returns: list of dicts (one row per image and renderer)
+    """
+
+    rows = []
+    for path_img in paths:
+        result = display_image_solution(path_img, model=model)
+        if result.error:
+            continue
+        # Fill every space, so each renderer draws 81 digits
+        result.solution = [num or 1 + i % 9 for i, num in enumerate(result.solution)]
+
+        reference = render_putText(result)
+        for name, func in (('putText', render_putText), ('stamps', render_stamps)):
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                images = func(result)
+                times.append((time.perf_counter() - start) * 1000)
+            diff = max(int(np.abs(img.astype(np.int16) - ref).max()) for img, ref in zip(images, reference))
+            rows.append({'image': os.path.basename(path_img), 'renderer': name,
+                         'ms': round(statistics.median(times), 3), 'max_diff': diff})
+    return rows
+
+
+class PerCellModel():
+    def __init__(self, model):
+        """
+        Classifier called once per space instead of once per board (per-cell inference)
+        :param model: classifier with the keras predict interface
+        """
+
+        self.model = model
+
+    def predict(self, cells, verbose=0):
+        """Class probabilities of prepared spaces, one predict call each"""
+        return np.concatenate([self.model.predict(cells[i:i + 1], verbose=verbose) for i in range(len(cells))])
+
+
+# Classifier backends of the corpus benchmark
+BACKENDS = {
+    'cnn': initialize_prediction_model,
+    'template': TemplateClassifier
+}
+
+
+def load_backend(name):
+    """
+    Classifier of a backend, the template classifier if the CNN's weights can't be loaded
+    :param name: backend name (BACKENDS key)
+    :returns: classifier with the keras predict interface
+    """
+
+    try:
+        return BACKENDS[name]()
+    except (OSError, ImportError, ValueError) as error:
+        if name == 'template':
+            raise
+        print(f'{name} backend unavailable ({error}), using the template classifier', file=sys.stderr)
+        return TemplateClassifier()
+
+
+def load_corpus(folder='Boards'):
+    """
+    Board images that have a ground truth file next to them (puzzle_1.jpg and puzzle_1.txt)
+    :param folder: folder of the images
+    :returns: list of (image file, list of 81 digits, 0 for blanks)
+    """
+
+    corpus = []
+    for path_img in sorted(glob.glob(os.path.join(folder, '*.jpg')) + glob.glob(os.path.join(folder, '*.png'))):
+        path_truth = os.path.splitext(path_img)[0] + '.txt'
+        if os.path.exists(path_truth):
+            corpus.append((path_img, read_puzzles(path_truth)[0].tolist()))
+    return corpus
+
+
+def percentile(values, q):
+    """Nearest rank percentile of a list of numbers"""
+    values = sorted(values)
+    return values[max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))]
+
+
+def is_solved(result, truth):
+    """Whether the board was read exactly as the ground truth and its solution fills a valid board"""
+    if result.error or result.digits != truth or not result.solution:
+        return False
+    board = [d or s for d, s in zip(result.digits, result.solution)]
+    return all(board) and is_valid_board(np.reshape(board, (9, 9)).tolist())
+
+
+def run_corpus(corpus, model, scaling, repeats=1):
+    """
+    Run the pipeline over the corpus with one configuration
+    :param corpus: list of (image file, ground truth digits) from load_corpus
+    :param model: classifier with the keras predict interface
+    :param scaling: scaling strategy passed to display_image_solution
+    :param repeats: timed runs per image (accuracy from the last one)
+    :returns: dict of accuracy, solved rate and per-stage latency percentiles
+    """
+
+    stages = {}
+    correct = filled_correct = filled = solved = errors = corrected = 0
+    images = []
+
+    for path_img, truth in corpus:
+        display_image_solution(path_img, scaling=scaling, model=model)  # Warm up (file cache, first call)
+        for _ in range(repeats):
+            tracer = Tracer()
+            result = display_image_solution(path_img, tracer=tracer, scaling=scaling, model=model)
+            stages.setdefault('total', []).append(tracer.total_ms())
+            for record in tracer.records:
+                stages.setdefault(record['stage'], []).append(record['ms'])
+
+        digits = result.digits or [0] * 81
+        right = sum(a == b for a, b in zip(digits, truth))
+        right_filled = sum(a == b for a, b in zip(digits, truth) if b)
+        board_solved = is_solved(result, truth)
+        correct += right
+        filled_correct += right_filled
+        filled += sum(1 for num in truth if num)
+        solved += board_solved
+        errors += bool(result.error)
+        corrected += len(result.corrected or [])
+        images.append({'image': os.path.basename(path_img), 'accuracy': round(right / 81, 4),
+                       'solved': board_solved, 'error': result.error})
+
+    return {
+        'digit_accuracy': round(correct / (81 * len(corpus)), 4),
+        'filled_accuracy': round(filled_correct / max(filled, 1), 4),
+        'solved_rate': round(solved / len(corpus), 4),
+        'errors': errors,
+        'corrected_spaces': corrected,
+        'stages': {name: {'calls': len(times), 'p50_ms': round(percentile(times, 50), 3),
+                          'p95_ms': round(percentile(times, 95), 3)} for name, times in stages.items()},
+        'images': images
+    }
+
+
+def corpus_benchmark(corpus, backends=tuple(BACKENDS), inference=('batch', 'cell'), scalings=('proxy', 'resize'),
+                     repeats=3):
+    """
+    Compare classifier backends, batch vs. per-cell inference and scaling strategies over the corpus
+    :param corpus: list of (image file, ground truth digits) from load_corpus
+    :param backends: names of the classifier backends (BACKENDS keys)
+    :param inference: 'batch' (one call per board) and / or 'cell' (one call per space)
+    :param scalings: scaling strategies passed to display_image_solution
+    :param repeats: timed runs per image and configuration
+    :returns: report dict (one entry per configuration, backends that couldn't load under 'skipped')
+    """
+
+    report = {'images': len(corpus), 'repeats': repeats, 'configs': [], 'skipped': {}}
+    for backend in backends:
+        try:
+            model = BACKENDS[backend]()
+        except (OSError, ImportError, ValueError) as error:
+            # Ex. the .h5 weights or keras missing: the other backends still run
+            report['skipped'][backend] = str(error)
+            continue
+
+        for mode in inference:
+            for scaling in scalings:
+                config = {'backend': backend, 'inference': mode, 'scaling': scaling}
+                config.update(run_corpus(corpus, PerCellModel(model) if mode == 'cell' else model, scaling, repeats))
+                report['configs'].append(config)
+    return report
+
+
+def check_gates(report, min_accuracy=None, max_p95_ms=None):
+    """
+    Configurations failing the accuracy or latency gates
+    :param report: corpus_benchmark report
+    :param min_accuracy: (optional) lowest digit accuracy allowed
+    :param max_p95_ms: (optional) highest p95 end to end latency allowed (ms)
+    :returns: list of failure messages (empty if every gate passes)
+    """
+
+    failures = []
+    for config in report['configs']:
+        name = f"{config['backend']}/{config['inference']}/{config['scaling']}"
+        if min_accuracy is not None and config['digit_accuracy'] < min_accuracy:
+            failures.append(f"{name}: digit accuracy {config['digit_accuracy']} < {min_accuracy}")
+        p95 = config['stages'].get('total', {}).get('p95_ms', 0)
+        if max_p95_ms is not None and p95 > max_p95_ms:
+            failures.append(f'{name}: p95 latency {p95} ms > {max_p95_ms} ms')
+    return failures
+
+
+# Run benchmark
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmarks for the image pipeline')
+    parser.add_argument('benchmark', nargs='?', choices=['scaling', 'solver', 'render', 'corpus'], default='scaling')
+    parser.add_argument('--boards', type=int, default=20, help='hard boards for the solver benchmark')
+    parser.add_argument('--backend', choices=list(BACKENDS), default='cnn',
+                        help='classifier for the scaling and render benchmarks')
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS),
+                        help='classifier backends for the corpus benchmark')
+    parser.add_argument('--repeats', type=int, default=3, help='timed runs per image for the corpus benchmark')
+    parser.add_argument('--json', help='file to write the corpus report to (stdout by default)')
+    parser.add_argument('--min-accuracy', type=float, help='fail if a configuration reads fewer digits right')
+    parser.add_argument('--max-p95-ms', type=float, help='fail if a configuration is slower at p95 (ms)')
+    args = parser.parse_args()
+
+    if args.benchmark == 'corpus':
+        report = corpus_benchmark(load_corpus(), args.backends, repeats=args.repeats)
+        failures = check_gates(report, args.min_accuracy, args.max_p95_ms)
+        report['failures'] = failures
+        if args.json:
+            with open(args.json, 'w') as file:
+                json.dump(report, file, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+        for failure in failures:
+            print(f'FAIL {failure}', file=sys.stderr)
+        sys.exit(1 if failures else 0)
+    elif args.benchmark == 'render':
+        rows = compare_render(sorted(glob.glob('Boards/*.jpg')), model=load_backend(args.backend))
+        print(f"{'image':<16}{'renderer':<10}{'ms':>9}{'max diff':>10}")
+        for row in rows:
+            print(f"{row['image']:<16}{row['renderer']:<10}{row['ms']:>9}{row['max_diff']:>10}")
+    elif args.benchmark == 'solver':
+        rows = compare_solvers([random_sudoku_board(HARD_MODE) for _ in range(args.boards)])
+        print(f"{'solver':<24}{'median ms':>11}{'max ms':>10}{'total ms':>10}")
+        for row in rows:
+            print(f"{row['solver']:<24}{row['median_ms']:>11}{row['max_ms']:>10}{row['total_ms']:>10}")
+    else:
+        rows = compare_scaling(sorted(glob.glob('Boards/*.jpg')), model=load_backend(args.backend))
+        print(f"{'image':<16}{'scaling':<9}{'ms':>9}{'agree/81':>10}{'solved':>8}")
+        for row in rows:
+            print(f"{row['image']:<16}{row['scaling']:<9}{row['ms']:>9}{str(row['agree']):>10}{str(row['solved']):>8}")
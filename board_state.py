@@ -0,0 +1,152 @@
+"""
+File: board_state.py
+Description:
+    Incremental tracking of the digits shown on a Sudoku board. Keeps
+    row / column / box digit counts and bitmasks updated on every insert
+    and backspace, giving conflicts and candidate "pencil marks" for any
+    cell while only touching the changed cell's 20 peers.
+"""
+
+
+# Bitmask with bits 1-9 set (all digits possible)
+ALL_DIGITS = 0b1111111110
+
+
+def _build_units():
+    """Row, column and box number of each of the 81 cells"""
+    return [(i // 9, i % 9, (i // 27) * 3 + (i % 9) // 3) for i in range(81)]
+
+
+def _build_peers():
+    """Indices of the 20 cells sharing a row, column or box with each cell"""
+
+    peers = []
+    for i in range(81):
+        row, col, box = UNITS[i]
+        peers.append([j for j in range(81) if j != i and
+                      (UNITS[j][0] == row or UNITS[j][1] == col or UNITS[j][2] == box)])
+    return peers
+
+
+UNITS = _build_units()
+PEERS = _build_peers()
+
+
+class BoardState():
+    def __init__(self, board):
+        """
+        Track the digits shown on a board
+        :param board: 2d list of ints (given values, 0 for empty)
+        """
+
+        self.givens = [board[i // 9][i % 9] != 0 for i in range(81)]
+        self.values = [0] * 81
+
+        # Count of each digit (index 1-9) in every row, column and box
+        self.row_counts = [[0] * 10 for _ in range(9)]
+        self.col_counts = [[0] * 10 for _ in range(9)]
+        self.box_counts = [[0] * 10 for _ in range(9)]
+
+        # Bitmask of the digits present in every row, column and box
+        self.row_masks = [0] * 9
+        self.col_masks = [0] * 9
+        self.box_masks = [0] * 9
+
+        for i in range(81):
+            if board[i // 9][i % 9]:
+                self._place(i, board[i // 9][i % 9])
+
+    def _place(self, index, digit):
+        """Add a digit to a cell's units"""
+
+        row, col, box = UNITS[index]
+        bit = 1 << digit
+        self.values[index] = digit
+        self.row_counts[row][digit] += 1
+        self.col_counts[col][digit] += 1
+        self.box_counts[box][digit] += 1
+        self.row_masks[row] |= bit
+        self.col_masks[col] |= bit
+        self.box_masks[box] |= bit
+
+    def _remove(self, index):
+        """Remove a cell's digit from its units"""
+
+        digit = self.values[index]
+        row, col, box = UNITS[index]
+        bit = 1 << digit
+        self.values[index] = 0
+
+        self.row_counts[row][digit] -= 1
+        if not self.row_counts[row][digit]:
+            self.row_masks[row] &= ~bit
+        self.col_counts[col][digit] -= 1
+        if not self.col_counts[col][digit]:
+            self.col_masks[col] &= ~bit
+        self.box_counts[box][digit] -= 1
+        if not self.box_counts[box][digit]:
+            self.box_masks[box] &= ~bit
+
+    def candidates(self, index):
+        """
+        Digits that can still be placed in a cell
+        :param index: cell index (row * 9 + col)
+        :returns: bitmask of digits (bit n set = n possible), 0 if filled
+        """
+
+        if self.values[index]:
+            return 0
+        row, col, box = UNITS[index]
+        return ALL_DIGITS & ~(self.row_masks[row] | self.col_masks[col] | self.box_masks[box])
+
+    def conflict(self, index):
+        """
+        Whether a cell's digit also appears in its row, column or box
+        :param index: cell index (row * 9 + col)
+        :returns: bool conflict
+        """
+
+        digit = self.values[index]
+        if not digit:
+            return False
+        row, col, box = UNITS[index]
+        return (self.row_counts[row][digit] > 1 or self.col_counts[col][digit] > 1
+                or self.box_counts[box][digit] > 1)
+
+    def _cell_key(self, index, candidates):
+        """What is drawn in a cell (compared to find changed cells)"""
+        return (self.values[index], self.conflict(index),
+                self.candidates(index) if candidates else 0)
+
+    def set_value(self, index, digit, candidates=False):
+        """
+        Show a digit in a cell (0 to clear), updating only its peers
+        :param index: cell index (row * 9 + col)
+        :param digit: digit entered (0 = backspace)
+        :param candidates: whether candidate changes count as changes (pencil marks shown)
+        :returns: list of cell indices whose display changed
+        """
+
+        if self.givens[index] or self.values[index] == digit:
+            return []
+
+        # Cells that could change: the cell and its 20 peers
+        cells = [index] + PEERS[index]
+        before = [self._cell_key(i, candidates) for i in cells]
+
+        if self.values[index]:
+            self._remove(index)
+        if digit:
+            self._place(index, digit)
+
+        return [i for i, key in zip(cells, before) if self._cell_key(i, candidates) != key]
+
+
+def digits_of(mask):
+    """
+    List the digits in a candidate bitmask
+    :param mask: bitmask of digits
+    :returns: list of ints (1-9)
+    """
+
+    return [digit for digit in range(1, 10) if mask >> digit & 1]
@@ -3,6 +3,8 @@ File: button.py
 Description:
     Button class used in pygame GUIs
     for creating functional buttons.
+    Buttons can poll the mouse themselves, or be added to a ButtonManager
+    which dispatches mouse events to them through a grid of their rects.
 """
 
 import pygame
@@ -10,18 +12,30 @@ import pygame
 
 class Button():
     def __init__(self, x, y, image, scale):
-        self.image = pygame.transform.scale(image, scale)
+        if image.get_size() == tuple(scale):
+            self.image = image  # Already at size (shared surface)
+        else:
+            self.image = pygame.transform.scale(image, scale)
         self.rect = self.image.get_rect()
         self.rect.topleft = (x, y)
         self.clicked = False
 
-    def draw(self, surface):
+        # State of buttons added to a ButtonManager
+        self.manager = None
+        self.hovered = False
+        self.pressed = False
+        self.variants = {}  # Hover / pressed images, made when first shown
+
+    def update(self):
         """
-        Draw button on screen
+        Check mouse conditions for click (without drawing)
         :param self: button object
-        :param surface: surface to blit onto (screen)
         """
 
+        if self.manager:
+            # Clicks come from the manager's events
+            return
+
         # Check mouse conditions for click
         mouse_pos = pygame.mouse.get_pos()
         if self.rect.collidepoint(mouse_pos):
@@ -32,9 +46,183 @@ class Button():
         if pygame.mouse.get_pressed()[0] == 0:
             self.clicked = False
 
+    def set_image(self, image):
+        """
+        Change the button's image (ex. toggled on), redrawn by its manager
+        :param image: new image (scaled to the button's size)
+        """
+
+        if image.get_size() != self.rect.size:
+            image = pygame.transform.scale(image, self.rect.size)
+        if image is self.image:
+            return
+        self.image = image
+        self.variants.clear()
+        if self.manager:
+            self.manager.queue_redraw(self)
+
+    def appearance(self):
+        """Image for the button's state (lighter when hovered, darker when pressed)"""
+
+        if self.pressed:
+            state, blend, color = 'pressed', pygame.BLEND_RGB_MULT, (200, 200, 200)
+        elif self.hovered:
+            state, blend, color = 'hovered', pygame.BLEND_RGB_ADD, (25, 25, 25)
+        else:
+            return self.image
+
+        image = self.variants.get(state)
+        if image is None:
+            image = self.image.copy()
+            image.fill(color, special_flags=blend)
+            self.variants[state] = image
+        return image
+
+    def draw(self, surface):
+        """
+        Draw button on screen
+        :param self: button object
+        :param surface: surface to blit onto (screen)
+        :returns: region drawn to
+        """
+
+        self.update()
+
         # Draw button on screen
-        surface.blit(self.image, (self.rect.x, self.rect.y))
+        return surface.blit(self.appearance(), (self.rect.x, self.rect.y))
 
     def get_clicked(self):
         """Assess clicks"""
-        return self.clicked
\ No newline at end of file
+
+        if self.manager:
+            # Each managed click is reported once
+            clicked, self.clicked = self.clicked, False
+            return clicked
+        return self.clicked
+
+
+class ButtonManager():
+    def __init__(self, buttons=(), cell_size=100):
+        """
+        Dispatches mouse events to buttons, found through a grid of their rects
+        :param buttons: buttons of the screen
+        :param cell_size: size of the grid's cells in pixels
+        """
+
+        self.cell_size = cell_size
+        self.grid = {}  # (column, row): buttons overlapping the cell
+        self.hovered = None
+        self.pressed = None
+        self.changed = []  # Buttons to redraw (hover / press state changed)
+        for btn in buttons:
+            self.add(btn)
+
+    def add(self, btn):
+        """
+        Manage a button (no longer polls the mouse)
+        :param btn: Button
+        :returns: the button
+        """
+
+        btn.manager = self
+        btn.clicked = False
+        size = self.cell_size
+        for col in range(btn.rect.left // size, (btn.rect.right - 1) // size + 1):
+            for row in range(btn.rect.top // size, (btn.rect.bottom - 1) // size + 1):
+                self.grid.setdefault((col, row), []).append(btn)
+        return btn
+
+    def remove(self, btn):
+        """
+        Stop managing a button (ex. no longer shown)
+        :param btn: Button
+        """
+
+        for buttons in self.grid.values():
+            if btn in buttons:
+                buttons.remove(btn)
+        if btn in self.changed:
+            self.changed.remove(btn)
+        if self.hovered is btn:
+            self.hovered = None
+        if self.pressed is btn:
+            self.pressed = None
+        btn.manager = None
+        btn.hovered = btn.pressed = False
+
+    def queue_redraw(self, btn):
+        """Redraw a button on the next draw"""
+        if btn not in self.changed:
+            self.changed.append(btn)
+
+    def button_at(self, pos):
+        """
+        Find the button under a position
+        :param pos: (x, y) position
+        :returns: Button or None (last added wins on overlaps)
+        """
+
+        for btn in reversed(self.grid.get((pos[0] // self.cell_size, pos[1] // self.cell_size), ())):
+            if btn.rect.collidepoint(pos):
+                return btn
+        return None
+
+    def _set_state(self, btn, hovered=None, pressed=None):
+        """Change a button's state, queueing a redraw if it changed"""
+
+        before = (btn.hovered, btn.pressed)
+        if hovered is not None:
+            btn.hovered = hovered
+        if pressed is not None:
+            btn.pressed = pressed
+        if (btn.hovered, btn.pressed) != before:
+            self.queue_redraw(btn)
+
+    def handle_event(self, event):
+        """
+        Update the buttons from a mouse event
+        :param event: pygame event
+        :returns: Button clicked (pressed and released over it), or None
+        """
+
+        if event.type not in (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP):
+            return None
+
+        btn = self.button_at(event.pos)
+        if btn is not self.hovered:
+            if self.hovered:
+                self._set_state(self.hovered, hovered=False)
+            if btn:
+                self._set_state(btn, hovered=True)
+            self.hovered = btn
+
+        if getattr(event, 'button', None) != 1:
+            return None
+
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            self.pressed = btn
+            if btn:
+                self._set_state(btn, pressed=True)
+            return None
+
+        # Released: a click if over the button that was pressed
+        pressed, self.pressed = self.pressed, None
+        if pressed:
+            self._set_state(pressed, pressed=False)
+        if btn is not None and btn is pressed:
+            btn.clicked = True
+            return btn
+        return None
+
+    def draw(self, surface, dirty=None):
+        """
+        Redraw only the buttons whose state changed
+        :param surface: surface to blit onto (screen)
+        :param dirty: (optional) DirtyRects to mark the redrawn regions
+        """
+
+        for btn in self.changed:
+            drawn = btn.draw(surface)
+            if dirty:
+                dirty.mark(drawn)
+        self.changed.clear()
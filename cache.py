@@ -0,0 +1,238 @@
+"""
+File: cache.py
+Description:
+    Persistent cache of image solves in SQLite. Entries are keyed by a hash
+    of the image bytes, with a perceptual hash (dHash) of the warped board
+    as a second level, so a re-uploaded or re-encoded photo of a board is
+    read from the cache instead of going through the classifier and solver.
+    The least recently used entries are evicted past a size limit.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+# Database file of the default cache
+CACHE_PATH = os.path.join('Cache', 'solves.sqlite')
+
+# Largest total size of the stored entries (bytes)
+MAX_BYTES = 4 * 1024 * 1024
+
+# Most differing bits for two board hashes to count as the same board
+MAX_DISTANCE = 6
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS solves (
+    key TEXT PRIMARY KEY,
+    phash INTEGER NOT NULL,
+    layout BLOB NOT NULL,
+    digits BLOB NOT NULL,
+    confidences BLOB NOT NULL,
+    corners BLOB NOT NULL,
+    solution BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS solves_used ON solves (used);
+"""
+
+
+def image_key(data, scaling='proxy'):
+    """
+    Content address of an image
+    :param data: bytes of the image file
+    :param scaling: scaling strategy (corners are stored in its coordinates)
+    :returns: str key
+    """
+    return f'{scaling}:{hashlib.blake2b(data, digest_size=16).hexdigest()}'
+
+
+def board_hash(warp):
+    """
+    Perceptual hash (dHash) of a warped board, stable across re-encodes and small shifts
+    :param warp: grayscale image of the warped board
+    :returns: 64 bit int
+    """
+
+    small = cv2.resize(warp, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def to_signed(value):
+    """64 bit hash as a signed int (SQLite INTEGER)"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class CachedSolve():
+    def __init__(self, digits, confidences, corners, solution):
+        """
+        Stored result of an image solve
+        :param digits: list of 81 detected digits
+        :param confidences: list of 81 classifier probabilities
+        :param corners: board corners in the image (4x1x2 array)
+        :param solution: list of 81 solved digits for the blank spaces
+        """
+
+        self.digits = digits
+        self.confidences = confidences
+        self.corners = corners
+        self.solution = solution
+
+    @classmethod
+    def from_row(cls, row):
+        """Entry from a (digits, confidences, corners, solution) row of blobs"""
+        digits, confidences, corners, solution = row
+        return cls(list(digits), np.frombuffer(confidences, np.float32).tolist(),
+                   np.frombuffer(corners, np.int32).reshape(4, 1, 2).copy(), list(solution))
+
+    def apply(self, result, corners=True):
+        """
+        Fill an ImageResult with the stored readings
+        :param result: ImageResult
+        :param corners: whether to also take the stored corners (same image only)
+        """
+
+        result.digits = list(self.digits)
+        result.confidences = list(self.confidences)
+        result.solution = list(self.solution)
+        if corners:
+            result.corners = self.corners.copy()
+
+
+class SolveCache():
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES, max_distance=MAX_DISTANCE):
+        """
+        SQLite backed cache of image solves (safe to share between threads)
+        :param path: database file (':memory:' for a temporary cache)
+        :param max_bytes: largest total size of the entries before evicting
+        :param max_distance: most differing hash bits for a similar board to match
+        """
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_distance = max_distance
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        columns = [row[1] for row in self.db.execute('PRAGMA table_info(solves)')]
+        if columns and 'layout' not in columns:
+            self.db.execute('DROP TABLE solves')  # Written by an older version (no layout), start over
+        self.db.executescript(SCHEMA)
+        self.hits = self.misses = 0  # Exact key lookups
+        self.similar_hits = self.similar_misses = 0  # Board hash lookups
+
+    def get(self, key):
+        """
+        Entry for exactly these image bytes
+        :param key: image_key of the image
+        :returns: CachedSolve or None
+        """
+
+        with self.lock:
+            row = self.db.execute('SELECT digits, confidences, corners, solution FROM solves WHERE key = ?',
+                                  (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.db.execute('UPDATE solves SET used = ? WHERE key = ?', (time.time(), key))
+            self.db.commit()
+            self.hits += 1
+        return CachedSolve.from_row(row)
+
+    def similar(self, phash, layout):
+        """
+        Entry for the closest stored board to a perceptual hash with the same filled spaces
+        (grid lines dominate the hash, so different puzzles printed alike can be close)
+        :param phash: board_hash of the warped board
+        :param layout: list of 81 bools, which spaces of the board hold a digit (process.filled_layout)
+        :returns: CachedSolve or None (no matching board within max_distance bits)
+        """
+
+        layout = bytes(layout)
+        with self.lock:
+            best, best_distance = None, self.max_distance + 1
+            for key, stored, stored_layout in self.db.execute('SELECT key, phash, layout FROM solves'):
+                distance = ((stored ^ to_signed(phash)) & 0xFFFFFFFFFFFFFFFF).bit_count()
+                if distance < best_distance and stored_layout == layout:
+                    best, best_distance = key, distance
+            if best is None:
+                self.similar_misses += 1
+                return None
+
+            row = self.db.execute('SELECT digits, confidences, corners, solution FROM solves WHERE key = ?',
+                                  (best,)).fetchone()
+            self.db.execute('UPDATE solves SET used = ? WHERE key = ?', (time.time(), best))
+            self.db.commit()
+            self.similar_hits += 1
+        return CachedSolve.from_row(row)
+
+    def put(self, key, phash, layout, result):
+        """
+        Store a solved image, then evict the least recently used entries past max_bytes
+        :param key: image_key of the image
+        :param phash: board_hash of the warped board
+        :param layout: list of 81 bools, which spaces of the board hold a digit (process.filled_layout)
+        :param result: ImageResult with digits, confidences, corners and solution
+        """
+
+        layout = bytes(layout)
+        digits = bytes(result.digits)
+        confidences = np.asarray(result.confidences, np.float32).tobytes()
+        corners = np.asarray(result.corners, np.int32).tobytes()
+        solution = bytes(result.solution)
+        size = len(key) + 8 + len(layout) + len(digits) + len(confidences) + len(corners) + len(solution)
+
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO solves VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                            (key, to_signed(phash), layout, digits, confidences, corners, solution, size,
+                             time.time()))
+            self.db.execute("""
+                DELETE FROM solves WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(size) OVER (ORDER BY used DESC, key) AS total FROM solves
+                    ) WHERE total > ?
+                )""", (self.max_bytes,))
+            self.db.commit()
+
+    def stats(self):
+        """Counters and size of the cache"""
+
+        with self.lock:
+            entries, size = self.db.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM solves').fetchone()
+        return {'entries': entries, 'bytes': size, 'hits': self.hits, 'misses': self.misses,
+                'similar_hits': self.similar_hits, 'similar_misses': self.similar_misses}
+
+    def close(self):
+        """Close the database"""
+        with self.lock:
+            self.db.close()
+
+
+# Shared cache, opened on first use
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def default_cache():
+    """Cache at CACHE_PATH (opened once, then reused)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SolveCache(CACHE_PATH)  # Read at first use, so callers can redirect it
+        return _cache
+
+
+def close_default_cache():
+    """Close the shared cache (the next default_cache call opens CACHE_PATH again)"""
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
@@ -0,0 +1,171 @@
+"""
+File: correction.py
+Description:
+    Confidence aware correction of the digits read from a board image.
+    When the classifier's reading repeats a digit or doesn't give a unique
+    solution, a best-first search tries the next most likely classes of the
+    least confident spaces, pruned with row / column / box checks, and
+    returns the most probable reading with exactly one solution within a
+    time budget.
+"""
+
+import heapq
+import math
+import time
+
+import numpy as np
+
+from algorithm import ROW_OF, COL_OF, BOX_OF, count_solutions
+
+
+# Classes kept per space
+TOP_K = 3
+
+# Probability under which a space is read as blank (as process.read_digits)
+BLANK_BELOW = 0.8
+
+# Least confident spaces the search may change
+MAX_CELLS = 8
+
+# Longest time (seconds) spent searching
+BUDGET = 0.1
+
+# Smallest probability used in the costs (avoids log(0))
+MIN_PROBABILITY = 1e-6
+
+
+def read_top_k(predictions, k=TOP_K):
+    """
+    Most likely classes of each space
+    :param predictions: array of shape (n, 10), class probabilities from the CNN
+    :param k: classes kept per space
+    :returns: (classes, probabilities), arrays of shape (n, k) in decreasing probability
+    """
+
+    predictions = np.asarray(predictions)
+    classes = np.argsort(-predictions, axis=-1, kind='stable')[:, :k]
+    return classes, np.take_along_axis(predictions, classes, axis=-1)
+
+
+def cell_options(classes, probabilities):
+    """
+    Readings of one space, the classifier's reading (as read_digits) first, then most likely first
+    :param classes: the space's top classes
+    :param probabilities: their probabilities
+    :returns: list of (cost, digit), cost = -log(probability) over the first reading's (0 for it,
+        never negative), digit 0 = blank
+    """
+
+    # Blank is as likely as the top class being wrong
+    top = float(probabilities[0])
+    options = {0: -math.log(max(1 - top, MIN_PROBABILITY))}
+    for num, prob in zip(classes, probabilities):
+        cost = -math.log(max(float(prob), MIN_PROBABILITY))
+        num = int(num)
+        if cost < options.get(num, math.inf):
+            options[num] = cost
+
+    # Thresholded reading: blank at or below BLANK_BELOW even when the digit is more likely
+    first = int(classes[0]) if top > BLANK_BELOW else 0
+    base = options[first]
+    rest = sorted((max(cost - base, 0.0), num) for num, cost in options.items() if num != first)
+    return [(0.0, first)] + rest
+
+
+def conflicts(values):
+    """
+    Pairs of filled cells repeating a digit in a row, column or box
+    :param values: list of 81 ints
+    :returns: list of (cell, cell)
+    """
+
+    seen = {}
+    pairs = []
+    for i, num in enumerate(values):
+        if num:
+            for unit in (('r', ROW_OF[i]), ('c', COL_OF[i]), ('b', BOX_OF[i])):
+                other = seen.setdefault((unit, num), i)
+                if other != i:
+                    pairs.append((other, i))
+    return pairs
+
+
+class Correction():
+    def __init__(self, digits, changed, probability, explored, elapsed):
+        """
+        Corrected reading of a board
+        :param digits: list of 81 ints with exactly one solution
+        :param changed: cells read differently from the classifier's first reading
+        :param probability: joint probability of the searched spaces' readings, relative to the
+            classifier's first reading (1 if unchanged)
+        :param explored: readings checked
+        :param elapsed: seconds spent searching
+        """
+
+        self.digits = digits
+        self.changed = changed
+        self.probability = probability
+        self.explored = explored
+        self.elapsed = elapsed
+
+
+def correct_digits(classes, probabilities, budget=BUDGET, max_cells=MAX_CELLS):
+    """
+    Find the most probable reading with exactly one solution
+    :param classes: (81, k) array of the top classes of each space
+    :param probabilities: (81, k) array of their probabilities
+    :param budget: (optional) longest time (seconds) to search
+    :param max_cells: (optional) least confident spaces that may be read differently
+    :returns: Correction, or None if none found within the budget
+    """
+
+    start = time.perf_counter()
+    deadline = start + budget
+
+    # First reading (as read_digits), kept for every space except the least confident
+    first = [int(num) if prob > BLANK_BELOW else 0 for num, prob in zip(classes[:, 0], probabilities[:, 0])]
+    order = np.argsort(probabilities[:, 0], kind='stable')[:max_cells].tolist()
+    options = [cell_options(classes[cell], probabilities[cell]) for cell in order]
+    start_choice = (0,) * len(order)  # Most likely reading of each space
+
+    def cost_of(choice):
+        return sum(options[k][index][0] for k, index in enumerate(choice))
+
+    def reading(choice):
+        values = list(first)
+        for k, index in enumerate(choice):
+            values[order[k]] = options[k][index][1]
+        return values
+
+    # Lazy best-first enumeration: successors change only positions from `last` on,
+    # so each combination is reached once
+    heap = [(cost_of(start_choice), start_choice, 0)]
+    seen = {start_choice}
+    position = {cell: k for k, cell in enumerate(order)}
+    explored = 0
+
+    while heap and time.perf_counter() < deadline:
+        cost, choice, last = heapq.heappop(heap)
+        values = reading(choice)
+        explored += 1
+
+        pairs = conflicts(values)
+        try:
+            unique = not pairs and count_solutions(list(values), limit=2, deadline=deadline) == 1
+        except TimeoutError:
+            break
+        if unique:
+            changed = [cell for cell in range(81) if values[cell] != first[cell]]
+            return Correction(values, changed, math.exp(-cost), explored, time.perf_counter() - start)
+
+        # Prune: a repeat between cells the successors can't change stays
+        if any(position.get(a, -1) < last and position.get(b, -1) < last for a, b in pairs):
+            continue
+
+        for k in range(last, len(choice)):
+            if choice[k] + 1 < len(options[k]):
+                successor = choice[:k] + (choice[k] + 1,) + choice[k + 1:]
+                if successor not in seen:
+                    seen.add(successor)
+                    heapq.heappush(heap, (cost_of(successor), successor, k))
+    return None
@@ -0,0 +1,282 @@
+"""
+File: formats.py
+Description:
+    Bulk parsing and serialization of puzzle files. 81 char lines, SDK
+    grids and JSONL are read straight from their bytes with np.frombuffer
+    into (N, 81) uint8 arrays (0 = empty), and written back with array
+    operations, without per-cell Python work.
+"""
+
+import argparse
+import json
+import os
+import re
+import tempfile
+import time
+
+import numpy as np
+
+
+# Byte value to digit ('.' and '0' are blanks), INVALID for anything else
+INVALID = 255
+DIGITS = np.full(256, INVALID, np.uint8)
+DIGITS[ord('0'):ord('9') + 1] = np.arange(10)
+DIGITS[ord('.')] = 0
+
+NEWLINE = ord('\n')
+WHITESPACE = b' \t\r\n'
+
+# Decorations allowed in SDK grids (ex. '---+---+---' lines and '|' columns)
+SDK_DECORATIONS = b'|-+'
+
+
+def byte_mask(chars):
+    """Lookup table of the byte values in chars (indexed by a uint8 array)"""
+    mask = np.zeros(256, bool)
+    mask[list(chars)] = True
+    return mask
+
+
+LINE_SKIP = byte_mask(b' \t\r')
+SDK_SKIP = byte_mask(WHITESPACE + SDK_DECORATIONS)
+
+# String values under a JSONL key (fast path, 9x9 lists go through json)
+JSONL_VALUE = r'"{key}"\s*:\s*"([0-9.]{{81}})"'
+
+
+def decode(raw, context='puzzle'):
+    """
+    Turn cell characters into digits
+    :param raw: uint8 array of cell bytes (0-9 or .)
+    :param context: name used in the error message
+    :returns: uint8 array of digits
+    """
+
+    digits = DIGITS[raw]
+    bad = np.flatnonzero(digits == INVALID)
+    if bad.size:
+        raise ValueError(f'{context}: invalid character {chr(raw.flat[bad[0]])!r}')
+    return digits
+
+
+def parse_lines(data):
+    """
+    Parse puzzles given as one 81 char line each (blank lines and whitespace skipped)
+    :param data: bytes of the file
+    :returns: (N, 81) uint8 array
+    """
+
+    raw = np.frombuffer(data, np.uint8)
+
+    # Fast path: every line exactly 81 chars with '\n' endings
+    if raw.size % 82 == 0 and np.all(raw[81::82] == NEWLINE):
+        return decode(raw.reshape(-1, 82)[:, :81], 'lines')
+
+    # Drop '\r' and spaces, then find the line boundaries
+    raw = raw[~LINE_SKIP[raw]]
+    ends = np.flatnonzero(raw == NEWLINE)
+    if raw.size and raw[-1] != NEWLINE:
+        ends = np.append(ends, raw.size)
+    starts = np.concatenate(([0], ends[:-1] + 1)).astype(ends.dtype)
+    lengths = ends - starts
+
+    keep = lengths > 0
+    wrong = np.flatnonzero(keep & (lengths != 81))
+    if wrong.size:
+        raise ValueError(f'line {wrong[0] + 1}: expected 81 characters, got {lengths[wrong[0]]}')
+
+    cells = starts[keep, None] + np.arange(81)
+    return decode(raw[cells], 'lines')
+
+
+def parse_sdk(data):
+    """
+    Parse puzzles in the SDK grid format (9 rows of 9 chars, '#' comment lines,
+    any whitespace or |-+ decorations between cells)
+    :param data: bytes of the file
+    :returns: (N, 81) uint8 array
+    """
+
+    data = re.sub(rb'(?m)^#.*$', b'', data)
+    raw = np.frombuffer(data, np.uint8)
+    cells = raw[~SDK_SKIP[raw]]
+    if cells.size % 81:
+        raise ValueError(f'sdk: {cells.size} cells is not a whole number of puzzles')
+    return decode(cells, 'sdk').reshape(-1, 81)
+
+
+def parse_jsonl(data, key='puzzle'):
+    """
+    Parse puzzles from JSON lines ({"puzzle": "81 chars"} or a 9x9 list of ints)
+    :param data: bytes of the file
+    :param key: field holding the puzzle
+    :returns: (N, 81) uint8 array
+    """
+
+    lines = len(re.findall(rb'(?m)^[ \t\r]*\S', data))  # Non-blank lines
+    values = re.findall(JSONL_VALUE.format(key=re.escape(key)).encode(), data)
+    if len(values) == lines:
+        return decode(np.frombuffer(b''.join(values), np.uint8), 'jsonl').reshape(-1, 81)
+
+    # Lines that aren't a plain string value
+    boards = []
+    for number, line in enumerate(data.splitlines(), 1):
+        if not line.strip():
+            continue
+        value = json.loads(line)[key]
+        if isinstance(value, str):
+            boards.append(decode(np.frombuffer(value.encode(), np.uint8), f'line {number}'))
+        else:
+            boards.append(np.asarray(value, np.uint8).reshape(81))
+        if boards[-1].size != 81 or boards[-1].max(initial=0) > 9:
+            raise ValueError(f'line {number}: not a 9x9 board')
+    return np.array(boards, np.uint8).reshape(-1, 81)
+
+
+def encode(boards, blank='0'):
+    """
+    Turn digits into cell characters
+    :param boards: array of digits (0 = empty)
+    :param blank: character for empty cells
+    :returns: uint8 array of the same shape
+    """
+
+    boards = np.asarray(boards, np.uint8)
+    chars = boards + np.uint8(ord('0'))
+    if blank != '0':
+        chars[boards == 0] = ord(blank)
+    return chars
+
+
+def to_lines(boards, blank='0'):
+    """
+    Serialize puzzles as 81 char lines
+    :param boards: (N, 81) array of digits (0 = empty)
+    :param blank: character for empty cells ('0' or '.')
+    :returns: bytes
+    """
+
+    boards = np.asarray(boards, np.uint8).reshape(-1, 81)
+    out = np.empty((len(boards), 82), np.uint8)
+    out[:, :81] = encode(boards, blank)
+    out[:, 81] = NEWLINE
+    return out.tobytes()
+
+
+def to_sdk(boards, blank='.'):
+    """
+    Serialize puzzles as SDK grids (9 rows of 9, blank line between puzzles)
+    :param boards: (N, 81) array of digits (0 = empty)
+    :param blank: character for empty cells
+    :returns: bytes
+    """
+
+    boards = np.asarray(boards, np.uint8).reshape(-1, 9, 9)
+    out = np.full((len(boards), 91), NEWLINE, np.uint8)
+    out[:, :90].reshape(-1, 9, 10)[:, :, :9] = encode(boards, blank)
+    return out.tobytes()
+
+
+def to_jsonl(boards, key='puzzle', blank='0'):
+    """
+    Serialize puzzles as JSON lines ({"puzzle": "81 chars"})
+    :param boards: (N, 81) array of digits (0 = empty)
+    :param key: field holding the puzzle
+    :param blank: character for empty cells
+    :returns: bytes
+    """
+
+    prefix = np.frombuffer(json.dumps({key: ''})[:-2].encode(), np.uint8)  # {"key": "
+    suffix = np.frombuffer(b'"}\n', np.uint8)
+    boards = np.asarray(boards, np.uint8).reshape(-1, 81)
+    out = np.empty((len(boards), prefix.size + 81 + suffix.size), np.uint8)
+    out[:, :prefix.size] = prefix
+    out[:, prefix.size:prefix.size + 81] = encode(boards, blank)
+    out[:, prefix.size + 81:] = suffix
+    return out.tobytes()
+
+
+PARSERS = {'.txt': parse_lines, '.sdk': parse_sdk, '.jsonl': parse_jsonl}
+
+
+def read_puzzles(path, parser=None):
+    """
+    Read a puzzle file (format from its extension, 81 char lines by default)
+    :param path: path of the file
+    :param parser: (optional) parsing function to use instead
+    :returns: (N, 81) uint8 array
+    """
+
+    with open(path, 'rb') as file:
+        data = file.read()
+    parser = parser or PARSERS.get(os.path.splitext(path)[1].lower(), parse_lines)
+    return parser(data)
+
+
+def to_board(puzzle):
+    """
+    :param puzzle: 81 digits (row of an (N, 81) array)
+    :returns: 2d list of ints (board)
+    """
+    return np.asarray(puzzle).reshape(9, 9).tolist()
+
+
+def from_board(board):
+    """
+    :param board: 2d list of ints (board)
+    :returns: (81,) uint8 array
+    """
+    return np.asarray(board, np.uint8).reshape(81)
+
+
+def parse_per_char(data):
+    """Reference parser with per-character Python work (for the benchmark)"""
+    return [[0 if char == '.' else int(char) for char in line.strip()]
+            for line in data.decode().splitlines() if line.strip()]
+
+
+def benchmark(count=1_000_000, seed=0):
+    """
+    Time parsing and serializing a file of puzzles in each format
+    :param count: number of puzzles in the file
+    :param seed: random seed for the puzzles
+    :returns: list of dicts (one row per format and operation)
+    """
+
+    rng = np.random.default_rng(seed)
+    boards = rng.integers(0, 10, (count, 81), np.uint8)
+    rows = []
+
+    def timed(fmt, operation, func):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        rows.append({'format': fmt, 'operation': operation, 's': round(seconds, 3),
+                     'per_second': round(count / seconds)})
+        return result
+
+    with tempfile.TemporaryDirectory() as folder:
+        for fmt, write in (('.txt', to_lines), ('.sdk', to_sdk), ('.jsonl', to_jsonl)):
+            data = timed(fmt, 'serialize', lambda: write(boards))
+            path = os.path.join(folder, 'puzzles' + fmt)
+            with open(path, 'wb') as file:
+                file.write(data)
+            parsed = timed(fmt, 'parse', lambda: read_puzzles(path))
+            assert np.array_equal(parsed, boards), f'{fmt} round trip changed the puzzles'
+
+        # Per-character baseline on the same lines (as randomize / img_solver did)
+        with open(os.path.join(folder, 'puzzles.txt'), 'rb') as file:
+            data = file.read()
+        timed('.txt', 'parse (per char)', lambda: parse_per_char(data))
+    return rows
+
+
+# Run benchmark
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark bulk puzzle parsing and serialization')
+    parser.add_argument('--count', type=int, default=1_000_000, help='puzzles per file')
+    args = parser.parse_args()
+
+    print(f"{'format':<8}{'operation':<18}{'s':>8}{'puzzles/s':>14}")
+    for row in benchmark(args.count):
+        print(f"{row['format']:<8}{row['operation']:<18}{row['s']:>8}{row['per_second']:>14,}")
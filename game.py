@@ -14,10 +14,24 @@ import time
 import sys
 
 import button
+from assets import assets
+from render import DirtyRects, FrameClock
+from overlay import overlay
+from glyphs import glyphs, get_font
+from board_state import BoardState, digits_of
+from hints import Hint, HintWorker
+from session import SessionRecorder, SELECT, DIGIT, BACKSPACE, ENTER, CANCEL, HINT
 from randomize import *
 from algorithm import solve
 
 
+# Game states
+IDLE = 'IDLE'  # No cell selected
+EDITING = 'EDITING'  # Entering a guess into the selected cell
+COMPLETED = 'COMPLETED'  # Board solved, showing stats
+MENU = 'MENU'  # Returning to the menu
+
+
 def run_game(screen, difficulty):
     """
     Function called in player.py to run the game funcionality
@@ -26,99 +40,113 @@ def run_game(screen, difficulty):
     :returns: state if returning to menu within player.py
     """
 
-    # Fonts
-    err_font = pygame.font.SysFont('Veener Solid', 50)
-    given_font = pygame.font.SysFont('Veener Solid', 40)
-    final_font = pygame.font.SysFont('Veener Solid', 40)
-    timer_font = pygame.font.SysFont('Veener Solid', 50)
+    # Fonts (name, size), drawn through the shared glyph cache
+    err_font = ('Veener Solid', 50)
+    given_font = ('Veener Solid', 40)
+    final_font = ('Veener Solid', 40)
+    timer_font = ('Veener Solid', 50)
     menu_color = (47, 54, 153)
     given_color = (0, 68, 129)
     final_color = (0, 0, 0)
+    pencil_font = ('Veener Solid', 18)
+    pencil_color = (120, 120, 120)
+    conflict_color = (200, 30, 30)
+    hint_color = (30, 140, 60)
+    hint_font = ('Veener Solid', 26)
+    glyphs.preload(given_font, given_color)
+    glyphs.preload(final_font, final_color)
+    glyphs.preload(final_font, conflict_color)
+    glyphs.preload(pencil_font, pencil_color)
+    glyphs.preload(timer_font, menu_color)
+    glyphs.preload(final_font, hint_color)
+
+    # Bounds of the Sudoku board region
+    board_region = pygame.Rect(220, 80, 450, 450)
+    hint_region = pygame.Rect(150, 22, 600, 56)  # Hint text, between the top buttons
+
+    # Buttons
+    menu_img = assets.get('Assets/Other/menu_img.jpg', (110, 60))
+    new_game_img = assets.get('Assets/Game/new_game.jpg', (150, 75))
+    menu_btn = button.Button(765, 25, menu_img, (110, 60))
+    new_game_btn = button.Button(700, 600, new_game_img, (150, 75))
+
+    # Hint button (no image asset, text drawn onto a plain surface)
+    hint_img = pygame.Surface((110, 60))
+    hint_img.fill(menu_color)
+    hint_label = get_font('Veener Solid', 40).render('HINT', True, 'White')
+    hint_img.blit(hint_label, hint_label.get_rect(center=(55, 30)))
+    hint_btn = button.Button(25, 25, hint_img, (110, 60))
+    buttons = button.ButtonManager([menu_btn, new_game_btn, hint_btn])  # Clicks from mouse events
+
+
+    def new_game():
+        """Generate a new board, reset the tracking variables and draw the game screen"""
+
+        nonlocal board, original_board, hard_values, solved_board, shown, remaining
+        nonlocal incorrect_counter, start_time, shown_time, selected, str_value
+        nonlocal hinted, hint_pending, recorder
+
+        if recorder:
+            # Previous game left unfinished
+            recorder.close(incorrect_counter, completed=False)
+
+        # Boards (replacing the previous game's)
+        board = random_sudoku_board(difficulty)
+        original_board = copy.deepcopy(board)
+        hard_values = [[True if board[i][j] != 0 else False for j in range(9)] for i in range(9)]
+        solved_board = copy.deepcopy(board)
+        solve(solved_board)
+        shown = BoardState(board)  # Digits shown (conflicts and candidates)
+        remaining = sum(row.count(0) for row in board)  # Cells left to finalize
+        recorder = SessionRecorder(board, difficulty)  # Session events (saved in batches)
+
+        # Tracking variables
+        incorrect_counter = 0
+        start_time = time.time()  # Start timer
+        shown_time = None  # Second currently shown on the timer
+        selected = None  # Selected cell (col, row), 1 based
+        str_value = ''  # User guess str
+        hinted = None  # Hint shown on the board
+        hint_pending = False  # Hint requested before the worker finished
+
+        draw_game()
+        hint_worker.prepare(board)  # Next hint ready before it's asked for
 
-    # Tracking variables
-    incorrect_counter = 0
 
-    def main():
-        """Main display for the game (main function)"""
+    def draw_game():
+        """Main display for the game"""
 
         screen.fill((154, 182, 217))
 
         # Images
-        board_bg = pygame.image.load('Assets/Game/white_bg.jpg').convert_alpha()
-        menu_bg = pygame.image.load('Assets/Game/cream_bg.jpeg').convert_alpha()
-        border_img = pygame.image.load('Assets/Game/border_img.jpg').convert_alpha()
-        mistakes_img = pygame.image.load('Assets/Game/mistakes_img.jpg').convert_alpha()
-        border_line = pygame.image.load('Assets/Game/seper_line.jpg').convert_alpha()
-        timer_img = pygame.image.load('Assets/Game/timer_img.jpg').convert_alpha()
-        board_bg = pygame.transform.scale(board_bg, (450, 450))
-        menu_bg = pygame.transform.scale(menu_bg, (900, 125))
-        border_img = pygame.transform.scale(border_img, (5, 75))
-        mistakes_img = pygame.transform.scale(mistakes_img, (180, 35))
-        border_line = pygame.transform.scale(border_line, (900, 5))
-        timer_img = pygame.transform.scale(timer_img, (120, 35))
-
-        # Buttons
-        menu_img = pygame.image.load('Assets/Other/menu_img.jpg').convert_alpha()
-        new_game_img = pygame.image.load('Assets/Game/new_game.jpg').convert_alpha()
-        menu_btn = button.Button(765, 25, menu_img, (110, 60))
-        new_game_btn = button.Button(700, 600, new_game_img, (150, 75))
+        board_bg = assets.get('Assets/Game/white_bg.jpg', (450, 450))
+        menu_bg = assets.get('Assets/Game/cream_bg.jpeg', (900, 125))
+        border_img = assets.get('Assets/Game/border_img.jpg', (5, 75))
+        mistakes_img = assets.get('Assets/Game/mistakes_img.jpg', (180, 35))
+        border_line = assets.get('Assets/Game/seper_line.jpg', (900, 5))
+        timer_img = assets.get('Assets/Game/timer_img.jpg', (120, 35))
 
         # Construct and draw starting board
         screen.blit(board_bg, (220, 80))
         draw_grid()
-        draw_original_values()
-
-        # Bounds of the Sudoku board region
-        board_region = pygame.Rect(220, 80, 450, 450)
-
-        while True:
+        draw_values()
 
-            # Images
-            screen.blit(menu_bg, (0, 575))
-            screen.blit(border_line, (0, 570))
-            screen.blit(timer_img, (50, 618))
-            screen.blit(border_img, (320, 600))
-            screen.blit(border_img, (640, 600))
-            screen.blit(mistakes_img, (370, 618))
+        # Images (static, drawn once)
+        screen.blit(menu_bg, (0, 575))
+        screen.blit(border_line, (0, 570))
+        screen.blit(timer_img, (50, 618))
+        screen.blit(border_img, (320, 600))
+        screen.blit(border_img, (640, 600))
+        screen.blit(mistakes_img, (370, 618))
 
-            # Buttons
-            menu_btn.draw(screen)
-            new_game_btn.draw(screen)
-            
-            # Display incorrect count
-            error_count = err_font.render(str(incorrect_counter), True, menu_color)
-            screen.blit(error_count, (565, 620))
-
-            # Timer
-            current_time = time.time()
-            elapsed_time = current_time - start_time
-            draw_timer(elapsed_time)
+        # Buttons
+        menu_btn.draw(screen)
+        new_game_btn.draw(screen)
+        hint_btn.draw(screen)
 
-            for event in pygame.event.get():
-                if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
-                    pos = pygame.mouse.get_pos()
-
-                    if board_region.collidepoint(pos):
-                        # Cell selected and user guess prompted
-                        cell = ((pos[0] - 174) // 50, (pos[1] - 34) // 50)
-                        indicate(cell)
-                        poss_nav = insert(cell)
-
-                        if poss_nav == 'MENU':
-                            return 'MENU'
-                    
-                    elif menu_btn.get_clicked():
-                        return 'MENU'
-                    elif new_game_btn.get_clicked():
-                        # Restart screen with new board (new game)
-                        run_game(screen, difficulty)    
-
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-        
-            pygame.display.update()
-            clock.tick(60)
+        # Display incorrect count
+        draw_incorrect_count()
+        dirty.mark_all()
 
 
     def draw_grid():
@@ -136,146 +164,152 @@ def run_game(screen, difficulty):
             pygame.draw.line(screen, (0, 0, 0), (220, 80 + 50*i), (670, 80 + 50*i), line_width)
 
 
-    def draw_original_values():
-        """Draw given board values onto screen"""
+    def draw_values():
+        """Draw all board values (and pencil marks) onto screen"""
+
+        for index in range(81):
+            draw_cell(index)
 
-        for i in range(0, len(board[0])):
-            for j in range(0, len(board[0])):
-                if (0 < board[i][j] < 10):
-                    # Valid number (1 - 9)
-                    given = given_font.render(str(board[i][j]), True, given_color)
-                    screen.blit(given, ((j+1)*50 + 188, (i+1)*50 + 45))
-    
 
-    def insert(position):
+    def draw_cell(index):
         """
-        Inserts user guess into board variable and displays if valid
-        :param position: currently selected cell
-        :returns: board for testing purposes
+        Redraw a single cell: indicator, value (red if conflicting) or pencil marks
+        :param index: cell index (row * 9 + col)
         """
 
-        # Bounds of the Sudoku board region
-        board_region = pygame.Rect(220, 80, 450, 450)
+        position = (index % 9 + 1, index // 9 + 1)
+        if position == selected:
+            # Indicator squares
+            format_cells(position, 'Red', 'cover')
+            format_cells(position, 'White', 'inside')
+        else:
+            format_cells(position, 'White', 'cover')
+
+        value = shown.values[index]
+        if hinted and hinted.index == index and not value:
+            # Hinted placement (not entered into the board)
+            dirty.mark(glyphs.blit(screen, str(hinted.digit), final_font, hint_color,
+                                   (position[0]*50 + 188, position[1]*50 + 45)))
+
+        elif value:
+            # Valid number (1 - 9)
+            if shown.conflict(index):
+                color = conflict_color
+            elif shown.givens[index]:
+                color = given_color
+            else:
+                color = final_color
+            dirty.mark(glyphs.blit(screen, str(value), final_font, color,
+                                   (position[0]*50 + 188, position[1]*50 + 45)))
+
+        elif pencil:
+            # Candidates in a 3x3 grid within the cell
+            for digit in digits_of(shown.candidates(index)):
+                x = position[0]*50 + 176 + ((digit - 1) % 3) * 15
+                y = position[1]*50 + 34 + ((digit - 1) // 3) * 15
+                dirty.mark(glyphs.blit(screen, str(digit), pencil_font, pencil_color, (x, y)))
+
+
+    def show_digit(index, digit):
+        """Show (or clear) a digit and redraw only the cells that changed"""
+        for changed in shown.set_value(index, digit, candidates=pencil):
+            draw_cell(changed)
+
+
+    def select(position):
+        """
+        Display an indicator for the clicked cell and start editing it
+        :param position: clicked cell (col, row)
+        :returns: new state
+        """
 
-        # Images
-        cover_img = pygame.image.load('Assets/Game/cream_bg.jpeg').convert_alpha()
-        cover_img = pygame.transform.scale(cover_img, (50, 50))
+        nonlocal selected, str_value
 
-        i,j = position[1], position[0]
-        value = ''  # User guess for render
-        str_value = ''  # User guess str
+        i, j = position[1], position[0]
+        if original_board[i-1][j-1] != 0 or hard_values[i-1][j-1]:
+            # Already taken position, do nothing
+            return IDLE
 
-        while True:
+        selected = position
+        str_value = ''
+        recorder.record(SELECT, (i-1)*9 + (j-1))
+        draw_cell((i-1)*9 + (j-1))
+        return EDITING
 
-            # Update the timer display
-            pygame.display.update()
-            current_time = time.time()
-            elapsed_time = current_time - start_time
-            draw_timer(elapsed_time)
 
-            for event in pygame.event.get():
-                if event.type == pygame.KEYDOWN:
+    def edit(event):
+        """
+        Inserts user guess into board variable and displays if valid
+        :param event: key pressed while the cell is selected
+        :returns: new state
+        """
 
-                    if hard_values[i - 1][j - 1]:
-                        # Already taken position, do nothing
-                        return
-
-                    if original_board[i-1][j-1] != 0:
-                        # Not empty & not being changed
-                        return
-
-                    if event.key == pygame.K_BACKSPACE:
-                        # Set to to zero
-                        str_value = ''
-                        board[i-1][j-1] = 0
-                        format_cells(position, 'White', 'inside')
-
-                        pygame.display.update()
-                        clock.tick(60)
-
-                    if 0 < event.key - 48 < 10:
-                        # Check for valid input & update
-                        str_value = str(event.key - 48)
-                        value = final_font.render(str_value, True, final_color)
-                        format_cells(position, 'White', 'inside')
-                        screen.blit(value, (position[0]*50 + 188, position[1]*50 + 45))
-
-                        if event.key - 48 == solved_board[i-1][j-1]:
-                            # Update board with input value
-                            board[i-1][j-1] = event.key - 48
-
-                        pygame.display.update()
-                        clock.tick(60)
-
-                    if event.key == pygame.K_RETURN:
-                        # Update cell visually
-                        format_cells(position, 'White', 'cover')
-
-                        if board[i-1][j-1] != 0:
-                            # Finalize input onto display
-                            hard_values[i - 1][j - 1] = True  # Update finalized board values boolean
-                            screen.blit(value, (position[0]*50 + 188, position[1]*50 + 45))
-
-                        if board[i-1][j-1] != solved_board[i-1][j-1]:
-                            # Incorrect input
-                            nonlocal incorrect_counter
-                            incorrect_counter += 1
-                            clear_incorrect_count()  # Cover previous count
-
-                        if check_solved() == 'MENU':
-                            return 'MENU'
-                        
-                        pygame.display.update()
-                        clock.tick(60)
-                        return board
-                
-                if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
-                        
-                        if hard_values[i - 1][j - 1]:
-                            # Already taken position, do nothing
-                            return
-
-                        # Clicked elsewhere on the screen
-                        pos = pygame.mouse.get_pos()
-
-                        # Negate input if clicked elsewhere
-                        if original_board[i-1][j-1] == 0:
-                            format_cells(position, 'White', 'cover')
-                            board[i-1][j-1] = 0
-
-                            # Recursively insert for next click
-                            if board_region.collidepoint(pos):
-                                cell = ((pos[0] - 174) // 50, (pos[1] - 34) // 50)
-                                indicate(cell)
-                                insert(cell)
-    
-                            pygame.display.update()
-                            clock.tick(60)
-                            return board
-                
-                if event.type == pygame.QUIT:
-                        pygame.quit()
-                        sys.exit()
-
-
-    def indicate(position):
-        """Display an indicator for the currently selected cell"""
+        nonlocal str_value, incorrect_counter, selected, remaining
 
-        i, j = position[1], position[0]
-        input_font = pygame.font.SysFont('Veener Solid', 40)
+        i, j = selected[1], selected[0]
+        index = (i-1)*9 + (j-1)
 
-        if original_board[i-1][j-1] == 0 and not hard_values[i-1][j-1]:
-            # Draw squares
-            format_cells(position, 'Red', 'cover')
-            format_cells(position, 'White', 'inside')
+        if event.key == pygame.K_BACKSPACE:
+            # Set to to zero
+            overlay.input_received()
+            recorder.record(BACKSPACE, index)
+            str_value = ''
+            board[i-1][j-1] = 0
+            show_digit(index, 0)
+
+        elif 0 < event.key - 48 < 10:
+            # Check for valid input & update
+            overlay.input_received()
+            recorder.record(DIGIT, index, event.key - 48)
+            str_value = str(event.key - 48)
+            show_digit(index, event.key - 48)
+
+            # Update board with input value (kept only if correct)
+            board[i-1][j-1] = event.key - 48 if event.key - 48 == solved_board[i-1][j-1] else 0
+
+        elif event.key == pygame.K_RETURN:
+            selected = None
+            recorder.record(ENTER, index, int(board[i-1][j-1] != 0))
 
             if board[i-1][j-1] != 0:
-                # Place value on top of squares
-                value = input_font.render(str(board[i-1][j-1]), True, final_color)
-                screen.blit(value, (position[0]*50 + 188, position[1]*50 + 45))
+                # Finalize input onto display
+                hard_values[i - 1][j - 1] = True  # Update finalized board values boolean
+                remaining -= 1
+                clear_hint()
+                hint_worker.prepare(board)  # Board changed, find the next hint
+            else:
+                # Incorrect input, clear the cell
+                show_digit(index, 0)
+
+            if board[i-1][j-1] != solved_board[i-1][j-1]:
+                # Incorrect input
+                incorrect_counter += 1
+                draw_incorrect_count()  # Cover previous count
+
+            # Update cell visually
+            draw_cell(index)
+
+            if remaining == 0:
+                recorder.close(incorrect_counter, completed=True)
+                show_completed()
+                return COMPLETED
+            return IDLE
+
+        return EDITING
 
-            pygame.display.update()
-            clock.tick(60)
+
+    def cancel_edit():
+        """Negate input of the selected cell (clicked elsewhere)"""
+
+        nonlocal selected
+
+        i, j = selected[1], selected[0]
+        index = (i-1)*9 + (j-1)
+        board[i-1][j-1] = 0
+        selected = None
+        recorder.record(CANCEL, index)
+        show_digit(index, 0)
+        draw_cell(index)
 
 
     def format_cells(position, color, function):
@@ -306,115 +340,226 @@ def run_game(screen, difficulty):
             elif function == 'inside':
                 pos = (position[0]*50 + 174 + left, position[1]*50 + 35, 43 - left - right, 43 - (2*bottom))
 
-            pygame.draw.rect(screen, color, pos)
+            dirty.mark(pygame.draw.rect(screen, color, pos))
 
 
-    def check_solved():
+    def show_completed():
         """Displays solution page and stats after completion of the game"""
 
-        if board == solved_board:
-            
-            # Stop and the timer
-            end_time = time.time()
-            elapsed_time = int(end_time - start_time)
-            minutes = int(elapsed_time // 60)
-            seconds = int(elapsed_time % 60)
-            timer_text = timer_font.render(f"{minutes:02}:{seconds:02}", True, menu_color)
-
-            # Get incorrect count
-            error_count = err_font.render(str(incorrect_counter), True, menu_color)
-
-            time.sleep(1)
-            screen.fill((154, 182, 217))
-
-            # Images
-            solved_img = pygame.image.load('Assets/Game/solved_img.jpg').convert_alpha()
-            stats_box = pygame.image.load('Assets/Game/cream_bg.jpeg').convert_alpha()
-            horizontal_border = pygame.image.load('Assets/Game/seper_line.jpg').convert_alpha()
-            vertical_border = pygame.image.load('Assets/Game/border_img_dark.jpg').convert_alpha()
-            x_img = pygame.image.load('Assets/Game/x_img.jpg').convert_alpha()
-            clock_img = pygame.image.load('Assets/Game/clock_img.jpg').convert_alpha()
-            solved_img = pygame.transform.scale(solved_img, (400, 125))
-            stats_box = pygame.transform.scale(stats_box, (500, 400))
-            horizontal_border = pygame.transform.scale(horizontal_border, (500, 5))
-            vertical_border = pygame.transform.scale(vertical_border, (5, 400))
-            x_img = pygame.transform.scale(x_img, (75, 70))
-            clock_img = pygame.transform.scale(clock_img, (75, 75))
-
-            # Buttons
-            menu_img = pygame.image.load('Assets/Other/menu_img.jpg').convert_alpha()
-            menu_btn = button.Button(765, 25, menu_img, (110, 60))
-
-            while True:
-                
-                menu_btn.draw(screen)
-                screen.blit(solved_img, (250, 35))
-
-                # Sats box
-                screen.blit(stats_box, (200, 200))
-                screen.blit(horizontal_border, (200, 200))
-                screen.blit(horizontal_border, (200, 600))
-                screen.blit(vertical_border, (200, 200))
-                screen.blit(vertical_border, (700, 200))
-
-                # Stats
-                screen.blit(clock_img, (335, 300))
-                screen.blit(timer_text, (450, 320))
-                screen.blit(x_img, (335, 425))
-                screen.blit(error_count, (485, 445))
-
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        pygame.quit()
-                        sys.exit()
-
-                    if menu_btn.get_clicked():
-                        return 'MENU'
-                
-                pygame.display.update()
-                clock.tick(60)
-
-
-    def clear_incorrect_count():
+        # Stop and the timer
+        end_time = time.time()
+        elapsed_time = int(end_time - start_time)
+        minutes = int(elapsed_time // 60)
+        seconds = int(elapsed_time % 60)
+        timer_text = f"{minutes:02}:{seconds:02}"
+
+        # Get incorrect count
+        error_count = str(incorrect_counter)
+
+        dirty.update()
+        time.sleep(1)
+        screen.fill((154, 182, 217))
+
+        # Images
+        solved_img = assets.get('Assets/Game/solved_img.jpg', (400, 125))
+        stats_box = assets.get('Assets/Game/cream_bg.jpeg', (500, 400))
+        horizontal_border = assets.get('Assets/Game/seper_line.jpg', (500, 5))
+        vertical_border = assets.get('Assets/Game/border_img_dark.jpg', (5, 400))
+        x_img = assets.get('Assets/Game/x_img.jpg', (75, 70))
+        clock_img = assets.get('Assets/Game/clock_img.jpg', (75, 75))
+
+        # Stats page (static, drawn once)
+        buttons.remove(new_game_btn)
+        buttons.remove(hint_btn)
+        menu_btn.draw(screen)
+        screen.blit(solved_img, (250, 35))
+
+        # Sats box
+        screen.blit(stats_box, (200, 200))
+        screen.blit(horizontal_border, (200, 200))
+        screen.blit(horizontal_border, (200, 600))
+        screen.blit(vertical_border, (200, 200))
+        screen.blit(vertical_border, (700, 200))
+
+        # Stats
+        screen.blit(clock_img, (335, 300))
+        glyphs.blit(screen, timer_text, timer_font, menu_color, (450, 320))
+        screen.blit(x_img, (335, 425))
+        glyphs.blit(screen, error_count, err_font, menu_color, (485, 445))
+        dirty.mark_all()
+
+
+    def draw_incorrect_count():
         """Covers and replaces mistake counter when updated"""
 
-        cover_img = pygame.image.load('Assets/Game/cream_bg.jpeg').convert_alpha()
-        cover_img = pygame.transform.scale(cover_img, (50, 50))
-        screen.blit(cover_img, (565, 620))
-        pygame.display.update()
+        cover_img = assets.get('Assets/Game/cream_bg.jpeg', (50, 50))
+        dirty.blit(cover_img, (565, 620))
+        dirty.mark(glyphs.blit(screen, str(incorrect_counter), err_font, menu_color, (565, 620)))
 
 
     def draw_timer(elapsed_time):
-        """Draws and updates the game timer"""
+        """Draws and updates the game timer (only when the shown second changes)"""
+
+        nonlocal shown_time
+        if int(elapsed_time) == shown_time:
+            return
+        shown_time = int(elapsed_time)
 
-        cover_img = pygame.image.load('Assets/Game/cream_bg.jpeg').convert_alpha()
-        cover_img = pygame.transform.scale(cover_img, (100, 40))
+        cover_img = assets.get('Assets/Game/cream_bg.jpeg', (100, 40))
         minutes = int(elapsed_time // 60)
         seconds = int(elapsed_time % 60)
-        timer_text = timer_font.render(f"{minutes:02}:{seconds:02}", True, menu_color)
-        screen.blit(cover_img, (185, 620))
-        screen.blit(timer_text, (185, 620))
+        dirty.blit(cover_img, (185, 620))
+        dirty.mark(glyphs.blit(screen, f"{minutes:02}:{seconds:02}", timer_font, menu_color, (185, 620)))
+
+
+    def show_hint():
+        """Show the prepared hint: its digit in the cell and the technique above the board"""
+
+        nonlocal hinted, hint_pending
+
+        hint_pending = False
+        hint = hint_worker.hint()
+        if hint is None:
+            # No step from the logical techniques, reveal a cell from the solution
+            index = next(i for i in range(81) if not hard_values[i // 9][i % 9])
+            hint = Hint(index, solved_board[index // 9][index % 9], 'Revealed from the solution')
+
+        clear_hint()
+        hinted = hint
+        recorder.record(HINT, hint.index, hint.digit)
+        draw_cell(hint.index)
+
+        # Hint text
+        font = get_font(*hint_font)
+        dirty.blit(font.render('Hint: ' + hint.placement(), True, hint_color), hint_region.topleft)
+        dirty.blit(font.render(hint.reason(), True, menu_color), (hint_region.x, hint_region.y + 28))
+
+
+    def request_hint():
+        """Show the hint now if prepared, otherwise as soon as the worker finishes"""
+
+        nonlocal hint_pending
+        if hint_worker.ready():
+            show_hint()
+        else:
+            hint_pending = True
+
+
+    def clear_hint():
+        """Remove the shown hint (board changed)"""
+
+        nonlocal hinted
+        if hinted is None:
+            return
+        index = hinted.index
+        hinted = None
+        draw_cell(index)
+        dirty.mark(pygame.draw.rect(screen, (154, 182, 217), hint_region))
+
+
+    def on_click(pos):
+        """
+        Handle a left click while no cell is being edited
+        :param pos: (x, y) position of the click
+        :returns: new state
+        """
+
+        if board_region.collidepoint(pos):
+            # Cell selected and user guess prompted
+            cell = ((pos[0] - 174) // 50, (pos[1] - 34) // 50)
+            return select(cell)
+        elif menu_btn.get_clicked():
+            return MENU
+        elif new_game_btn.get_clicked():
+            # Restart screen with new board (new game, replaces the old one)
+            new_game()
+        elif hint_btn.get_clicked():
+            request_hint()
+        return IDLE
 
 
     """RUN MAIN (MAIN VARIABLES)"""
 
-    # Boards
-    board = random_sudoku_board(difficulty)
-    original_board = copy.deepcopy(board)
-    hard_values = [[True if board[i][j] != 0 else False for j in range(9)] for i in range(9)]
-    solved_board = copy.deepcopy(board)
-    solve(solved_board)
+    # Game variables (set by new_game)
+    board = original_board = hard_values = solved_board = None
+    shown = None
+    remaining = 0
+    pencil = False  # Whether candidates are shown in empty cells
+    incorrect_counter = 0
+    start_time = shown_time = None
+    selected = None
+    str_value = ''
+    hinted = None
+    hint_pending = False
+    recorder = None
+
+    clock = FrameClock()
+    dirty = DirtyRects(screen)  # Regions of the screen to update
+    hint_worker = HintWorker()  # Finds hints in the background
+    new_game()
+    state = IDLE
+
+    # Main loop (one frame per iteration, constant stack depth)
+    while state != MENU:
+
+        if state != COMPLETED:
+            # Hint asked for before it was ready
+            if hint_pending and hint_worker.ready():
+                show_hint()
+
+            # Timer
+            current_time = time.time()
+            elapsed_time = current_time - start_time
+            draw_timer(elapsed_time)
+
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                recorder.close(incorrect_counter, completed=False)
+                pygame.quit()
+                sys.exit()
+
+            if overlay.handle_event(event):
+                # Toggle the performance overlay (F3)
+                continue
+
+            # Button clicks (read with get_clicked when handling the event)
+            buttons.handle_event(event)
+
+            if state != COMPLETED and event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                # Toggle pencil marks
+                pencil = not pencil
+                draw_values()
+                continue
+
+            if state == IDLE:
+                if event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                    state = on_click(event.pos)
+
+            elif state == EDITING:
+                if event.type == pygame.KEYDOWN:
+                    state = edit(event)
+                elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+                    # Clicked elsewhere on the screen, negate input then handle the click
+                    cancel_edit()
+                    state = on_click(event.pos)
 
+            elif state == COMPLETED:
+                if menu_btn.get_clicked():
+                    state = MENU
 
-    clock = pygame.time.Clock()
-    start_time = time.time()  # Start timer
+            if state == MENU:
+                break
 
-    # Run code
-    state = main()
+        clock.events_done()
+        buttons.draw(screen, dirty)  # Only buttons whose hover / press state changed
+        overlay.draw(screen, dirty)
+        dirty.update()
+        clock.tick()
 
     # Returning to player.py (menu)
-    if state is not None:
-        return state
+    recorder.close(incorrect_counter, completed=False)  # Nothing added if completed
+    hint_worker.shutdown()
+    return MENU
 
 
 # Test code
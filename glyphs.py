@@ -0,0 +1,85 @@
+"""
+File: glyphs.py
+Description:
+    Font and glyph cache for the pygame screens. Fonts are created once per
+    process and digits / timer characters are rendered once per font and
+    color, with numbers drawn by blitting the cached glyphs side by side.
+"""
+
+import pygame
+
+
+# Characters pre-rendered for numbers and the timer
+NUMBER_CHARS = '0123456789:'
+
+# Created fonts: (name, size): font
+_fonts = {}
+
+
+def get_font(name, size):
+    """
+    Get a system font, creating it only once
+    :param name: system font name (None for pygame's default font)
+    :param size: font size
+    :returns: shared pygame font
+    """
+
+    key = (name, size)
+    font = _fonts.get(key)
+    if font is None:
+        if name is None:
+            font = pygame.font.Font(None, size)
+        else:
+            font = pygame.font.SysFont(name, size)
+        _fonts[key] = font
+    return font
+
+
+class GlyphCache():
+    def __init__(self):
+        """Cache of rendered characters keyed by (font name, size, color, char)"""
+        self.glyphs = {}
+
+    def glyph(self, font_key, color, char):
+        """
+        Get a single rendered character
+        :param font_key: (font name, size)
+        :param color: text color
+        :param char: character to render
+        :returns: shared surface (do not draw onto it)
+        """
+
+        key = (font_key, pygame.Color(color).normalize(), char)
+        surface = self.glyphs.get(key)
+        if surface is None:
+            surface = get_font(*font_key).render(char, True, color)
+            self.glyphs[key] = surface
+        return surface
+
+    def preload(self, font_key, color, chars=NUMBER_CHARS):
+        """Render a set of characters ahead of time"""
+        for char in chars:
+            self.glyph(font_key, color, char)
+
+    def blit(self, surface, text, font_key, color, pos):
+        """
+        Draw text by blitting cached glyphs side by side
+        :param surface: surface to draw onto (screen)
+        :param text: text to draw (ex. '05:32')
+        :param font_key: (font name, size)
+        :param color: text color
+        :param pos: (x, y) position of the text
+        :returns: region drawn to (pygame.Rect)
+        """
+
+        x, y = pos
+        drawn = pygame.Rect(x, y, 0, 0)
+        for char in text:
+            glyph = self.glyph(font_key, color, char)
+            drawn.union_ip(surface.blit(glyph, (x, y)))
+            x += glyph.get_width()
+        return drawn
+
+
+# Shared glyph cache for all screens
+glyphs = GlyphCache()
@@ -0,0 +1,270 @@
+"""
+File: headless.py
+Description:
+    Headless benchmark of the pygame screens. Runs the game and menu loops
+    under SDL's dummy video driver, driven by a scripted stream of clicks
+    and key presses, and reports frame time percentiles, allocations per
+    frame and image loads from disk (which should all happen at startup).
+"""
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import glob
+import statistics
+import sys
+import tempfile
+import time
+
+import pygame
+
+import cache
+import render
+import session
+from assets import assets
+from render import FrameClock
+
+
+def cell_pos(col, row):
+    """Center of a board cell on the game screen (col, row are 1 based)"""
+    return (220 + 50*(col - 1) + 25, 80 + 50*(row - 1) + 25)
+
+
+def click(pos):
+    """Script steps for a left click"""
+    return [('press', pos), ('release', pos)]
+
+
+def key(code, char=''):
+    """Script steps for a key press"""
+    return [('key', code, char)]
+
+
+def typed(text):
+    """Script steps for typing text"""
+    return [step for char in text for step in key(ord(char), char)]
+
+
+def wait(frames):
+    """Script step doing nothing for a number of frames"""
+    return [('wait', frames)]
+
+
+def game_script(cells=20):
+    """
+    Play a game: enter digits into cells, use pencil marks and hints, start a new game, go to the menu
+    :param cells: number of cells to enter a digit into
+    :returns: list of script steps
+    """
+
+    steps = wait(5)
+    for n in range(cells):
+        col, row = n % 9 + 1, (n * 4) // 9 % 9 + 1
+        steps += click(cell_pos(col, row)) + key(pygame.K_1 + n % 9) + key(pygame.K_RETURN) + wait(2)
+    steps += key(pygame.K_p) + wait(5) + key(pygame.K_p)
+    steps += click((80, 55)) + wait(10)  # Hint
+    steps += click((775, 640)) + wait(10)  # New game
+    steps += click((820, 55))  # Menu
+    return steps
+
+
+def menu_script():
+    """
+    Navigate the menu screens: settings, difficulty setup, a short game and the image uploader
+    :returns: list of script steps
+    """
+
+    steps = wait(5)
+    steps += click((50, 50)) + wait(5) + click((820, 55)) + wait(5)  # Settings and back
+    steps += click((355, 630)) + wait(5)  # Play
+    steps += click((440, 150)) + wait(5) + click((440, 270)) + wait(5)  # Difficulties
+    steps += click((440, 550)) + wait(5)  # Play game
+    for n in range(5):
+        steps += click(cell_pos(n + 1, 5)) + key(pygame.K_1 + n) + key(pygame.K_RETURN)
+    steps += click((820, 55)) + wait(5)  # Menu
+    steps += click((545, 630)) + wait(5)  # Image uploader
+    steps += typed('missing.jpg') + click((450, 540)) + wait(30)  # Upload (path error)
+    steps += click((820, 55)) + wait(5)  # Back
+    return steps
+
+
+class ScriptedInput():
+    def __init__(self, steps):
+        """
+        Feeds scripted steps to the screen loops, one step per frame
+        :param steps: list of script steps (see click, key, typed, wait)
+        """
+
+        self.steps = list(steps)
+        self.pos = (0, 0)
+        self.pressed = False
+        self.release = False  # Release the button on the next frame
+        self.waiting = 0
+
+    def install(self):
+        """Replace pygame's mouse state with the scripted one"""
+
+        self.saved = (pygame.mouse.get_pos, pygame.mouse.get_pressed)
+        pygame.mouse.get_pos = lambda: self.pos
+        pygame.mouse.get_pressed = lambda num_buttons=3: (self.pressed,) + (False,) * (num_buttons - 1)
+
+    def uninstall(self):
+        """Restore pygame's mouse state"""
+        pygame.mouse.get_pos, pygame.mouse.get_pressed = self.saved
+
+    def next_frame(self):
+        """Run the next step (posted as events for the next frame)"""
+
+        if self.release:
+            self.pressed = False
+            self.release = False
+        if self.waiting:
+            self.waiting -= 1
+            return
+        if not self.steps:
+            # Script finished, close the screens
+            pygame.event.post(pygame.event.Event(pygame.QUIT))
+            return
+
+        step = self.steps.pop(0)
+        if step[0] == 'press':
+            self.pos, self.pressed = step[1], True
+            pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=self.pos, rel=(0, 0), buttons=(0, 0, 0)))
+            pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=self.pos, button=1))
+        elif step[0] == 'release':
+            # Button kept pressed for a frame, so polled buttons see the click
+            self.pos, self.release = step[1], True
+            pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONUP, pos=self.pos, button=1))
+        elif step[0] == 'key':
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=step[1], unicode=step[2], mod=0))
+            pygame.event.post(pygame.event.Event(pygame.KEYUP, key=step[1], unicode=step[2], mod=0))
+        elif step[0] == 'wait':
+            self.waiting = step[1] - 1
+
+
+class FrameRecorder():
+    def __init__(self, script):
+        """
+        Records every frame's work time, allocations and disk loads while driving a script
+        :param script: ScriptedInput fed at the end of each frame
+        """
+
+        self.script = script
+        self.times = []  # ms
+        self.blocks = []  # Net allocated memory blocks
+        self.disk_loads = []  # Images loaded from disk
+        self.last_blocks = sys.getallocatedblocks()
+        self.last_loads = assets.disk_loads
+
+    def __call__(self, clock):
+        """Frame listener (see render.FrameClock)"""
+
+        self.times.append(clock.work * 1000)
+        self.blocks.append(sys.getallocatedblocks() - self.last_blocks)
+        self.disk_loads.append(assets.disk_loads - self.last_loads)
+        self.last_loads = assets.disk_loads
+
+        self.script.next_frame()
+        self.last_blocks = sys.getallocatedblocks()  # Exclude the script's own allocations
+
+    def report(self, name):
+        """
+        Summary of the recorded frames
+        :param name: scenario name
+        :returns: dict of stats
+        """
+
+        times = sorted(self.times)
+        cuts = statistics.quantiles(times, n=100, method='inclusive') if len(times) > 1 else times * 99
+        return {'scenario': name, 'frames': len(times),
+                'p50_ms': round(cuts[49], 2), 'p90_ms': round(cuts[89], 2),
+                'p99_ms': round(cuts[98], 2), 'max_ms': round(times[-1], 2),
+                'blocks_per_frame': round(statistics.mean(self.blocks), 1),
+                'max_blocks': max(self.blocks),
+                'disk_loads': sum(self.disk_loads),
+                'frames_loading': sum(1 for loads in self.disk_loads if loads)}
+
+
+def run_scenario(name, steps, start):
+    """
+    Run screens uncapped with a script, recording their frames
+    :param name: scenario name
+    :param steps: list of script steps
+    :param start: function starting the screen loop
+    :returns: dict of stats
+    """
+
+    script = ScriptedInput(steps)
+    recorder = FrameRecorder(script)
+    fps, render.FPS = render.FPS, 0
+    script.install()
+    pygame.event.clear()  # Events left by the previous scenario
+    FrameClock.listeners.append(recorder)
+    try:
+        start()
+    except SystemExit:
+        pass  # Screens closed by the scripted quit
+    finally:
+        FrameClock.listeners.remove(recorder)
+        script.uninstall()
+        render.FPS = fps
+    return recorder.report(name)
+
+
+def replay_sessions(folder):
+    """
+    Replay the sessions recorded during the scenarios (no rendering)
+    :param folder: folder of .slv session files
+    :returns: dict of stats
+    """
+
+    paths = sorted(glob.glob(f'{folder}/*.slv'))
+    sessions = [session.read_session(path) for path in paths]
+    start = time.perf_counter()
+    states = [session.replay(recorded) for recorded in sessions]
+    replay_ms = (time.perf_counter() - start) * 1000
+    return {'sessions': len(sessions), 'events': sum(len(recorded.events) for recorded in sessions),
+            'ended': sum(state.ended for state in states), 'replay_ms': round(replay_ms, 2)}
+
+
+def benchmark(difficulty=600):
+    """
+    Run the game and menu scenarios
+    :param difficulty: difficulty of the game scenario's boards
+    :returns: list of dicts (one row per scenario), dict of replayed session stats
+    """
+
+    pygame.init()
+    pygame.font.init()
+    screen = pygame.display.set_mode((900, 700))
+    assets.preload()  # Images are loaded once at startup, as in player.py
+
+    with tempfile.TemporaryDirectory() as folder:
+        session.SESSION_FOLDER = folder  # Keep recorded sessions out of the project
+        cache.CACHE_PATH = os.path.join(folder, 'solves.sqlite')  # Same for the image upload's solve cache
+
+        try:
+            import game
+            rows = [run_scenario('game', game_script(), lambda: game.run_game(screen, difficulty))]
+
+            import player  # Sets up its own screen (menu started by the script)
+            rows.append(run_scenario('menu', menu_script(), player.run))
+            return rows, replay_sessions(folder)
+        finally:
+            cache.close_default_cache()
+
+
+# Run benchmark
+if __name__ == '__main__':
+    rows, replays = benchmark()
+    print(f"{'scenario':<10}{'frames':>7}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'blocks/frame':>14}{'disk loads':>12}")
+    for row in rows:
+        print(f"{row['scenario']:<10}{row['frames']:>7}{row['p50_ms']:>9}{row['p90_ms']:>9}"
+              f"{row['p99_ms']:>9}{row['max_ms']:>9}{row['blocks_per_frame']:>14}{row['disk_loads']:>12}")
+    print(f"replayed {replays['sessions']} sessions ({replays['events']} events, "
+          f"{replays['ended']} ended) in {replays['replay_ms']} ms")
+
+    # Images loaded from disk during play are a regression
+    sys.exit(1 if any(row['disk_loads'] for row in rows) else 0)
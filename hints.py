@@ -0,0 +1,216 @@
+"""
+File: hints.py
+Description:
+    Logical hint engine for the game module. Finds the next placement that
+    can be deduced from the current board (naked / hidden singles, helped by
+    locked candidate and naked pair eliminations), computed ahead of time
+    on a background thread so hints are ready when requested.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from board_state import UNITS, PEERS, ALL_DIGITS
+
+
+def _build_unit_cells():
+    """Cells and name of each of the 27 units (rows, columns, boxes)"""
+
+    units = []
+    for kind, position in (('row', 0), ('column', 1), ('box', 2)):
+        for n in range(9):
+            units.append(([i for i in range(81) if UNITS[i][position] == n], f'{kind} {n + 1}'))
+    return units
+
+
+UNIT_CELLS = _build_unit_cells()
+BOXES = UNIT_CELLS[18:]
+LINES = UNIT_CELLS[:18]
+
+
+class Hint():
+    def __init__(self, index, digit, technique, unit=None):
+        """
+        A placement that follows logically from the board
+        :param index: cell index (row * 9 + col)
+        :param digit: digit to place
+        :param technique: name of the technique that justifies it
+        :param unit: (optional) name of the unit the technique used
+        """
+
+        self.index = index
+        self.digit = digit
+        self.technique = technique
+        self.unit = unit
+        self.eliminations = []  # Techniques used to remove candidates first
+
+    def placement(self):
+        """Where the digit goes (ex. '5 at r3c4')"""
+        return f'{self.digit} at r{self.index // 9 + 1}c{self.index % 9 + 1}'
+
+    def reason(self):
+        """Why the digit goes there (ex. 'Hidden single in box 2 (after naked pairs)')"""
+
+        reason = self.technique
+        if self.unit:
+            reason += f' in {self.unit}'
+        if self.eliminations:
+            reason += ' (after ' + ' and '.join(self.eliminations) + ')'
+        return reason
+
+    def text(self):
+        """Readable description (ex. '5 at r3c4: Hidden single in box 2')"""
+        return f'{self.placement()}: {self.reason()}'
+
+
+def candidate_masks(values):
+    """
+    Candidates of every cell
+    :param values: flat list of 81 ints (0 = empty)
+    :returns: list of 81 bitmasks (0 for filled cells)
+    """
+
+    masks = []
+    for i in range(81):
+        if values[i]:
+            masks.append(0)
+            continue
+        used = 0
+        for peer in PEERS[i]:
+            used |= 1 << values[peer]
+        masks.append(ALL_DIGITS & ~used)
+    return masks
+
+
+def find_single(masks):
+    """
+    Find a naked single (one candidate in a cell) or hidden single (one place in a unit)
+    :param masks: candidate bitmasks of the 81 cells
+    :returns: Hint or None
+    """
+
+    for i in range(81):
+        mask = masks[i]
+        if mask and not mask & (mask - 1):
+            return Hint(i, mask.bit_length() - 1, 'Naked single')
+
+    for cells, name in UNIT_CELLS:
+        for digit in range(1, 10):
+            bit = 1 << digit
+            places = [i for i in cells if masks[i] & bit]
+            if len(places) == 1:
+                return Hint(places[0], digit, 'Hidden single', name)
+    return None
+
+
+def eliminate_locked(masks):
+    """
+    Locked candidates: a digit confined to one line within a box (or one box within a line)
+    can be removed from the rest of that line (or box)
+    :param masks: candidate bitmasks (updated in place)
+    :returns: bool whether any candidate was removed
+    """
+
+    removed = False
+    for region, others in ((BOXES, LINES), (LINES, BOXES)):
+        for cells, _ in region:
+            for digit in range(1, 10):
+                bit = 1 << digit
+                places = set(i for i in cells if masks[i] & bit)
+                if len(places) < 2:
+                    continue
+                for other, _ in others:
+                    other = set(other)
+                    if places <= other:
+                        for i in other - set(cells):
+                            if masks[i] & bit:
+                                masks[i] &= ~bit
+                                removed = True
+    return removed
+
+
+def eliminate_pairs(masks):
+    """
+    Naked pairs: two cells of a unit with the same two candidates
+    remove those candidates from the rest of the unit
+    :param masks: candidate bitmasks (updated in place)
+    :returns: bool whether any candidate was removed
+    """
+
+    removed = False
+    for cells, _ in UNIT_CELLS:
+        pairs = {}
+        for i in cells:
+            if bin(masks[i]).count('1') == 2:
+                pairs.setdefault(masks[i], []).append(i)
+        for pair, owners in pairs.items():
+            if len(owners) != 2:
+                continue
+            for i in cells:
+                if i not in owners and masks[i] & pair:
+                    masks[i] &= ~pair
+                    removed = True
+    return removed
+
+
+def next_hint(board):
+    """
+    Find the next logical placement for a board
+    :param board: 2d list of ints (0 = empty)
+    :returns: Hint, or None if no step follows from the techniques
+    """
+
+    values = [board[i // 9][i % 9] for i in range(81)]
+    masks = candidate_masks(values)
+    used = []  # Eliminations needed before the single appears
+
+    while True:
+        hint = find_single(masks)
+        if hint:
+            hint.eliminations = used
+            return hint
+
+        # No single yet, remove candidates and look again
+        if eliminate_locked(masks):
+            if 'locked candidates' not in used:
+                used.append('locked candidates')
+        elif eliminate_pairs(masks):
+            if 'naked pairs' not in used:
+                used.append('naked pairs')
+        else:
+            return None
+
+
+class HintWorker():
+    def __init__(self):
+        """Computes hints on a background thread ahead of being requested"""
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='hints')
+        self._future = None
+
+    def prepare(self, board):
+        """
+        Start finding the hint for a board (call whenever the board changes)
+        :param board: 2d list of ints (copied, so the game can keep changing it)
+        """
+
+        if self._future is not None:
+            self._future.cancel()
+        self._future = self._executor.submit(next_hint, [row[:] for row in board])
+
+    def ready(self):
+        """Whether the hint for the latest board is computed"""
+        return self._future is not None and self._future.done()
+
+    def hint(self):
+        """
+        Hint for the latest board
+        :returns: Hint or None (not ready or no logical step)
+        """
+
+        if not self.ready():
+            return None
+        return self._future.result()
+
+    def shutdown(self):
+        """Stop the background thread"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -6,137 +6,607 @@ Description:
 """
 
 import os
+from concurrent.futures import ProcessPoolExecutor
+
 from process import *
-from algorithm import solve
+from algorithm import count_solutions
+from correction import read_top_k, correct_digits
+from cache import image_key, board_hash
+from tracing import Tracer, NULL_TRACER, summary_table
+
+
+# Size of the warped (square) board
+WIDTH_IMG, HEIGHT_IMG = 450, 450
+
+# Longest side of the downscaled copy used to find the board
+PROXY_SIZE = 450
+
+# Longest side of the downscaled copy used to find several boards on a page
+PAGE_PROXY_SIZE = 1200
+
+# Most boards read from one page
+MAX_BOARDS = 12
+
+# File saved for each view when not testing
+SAVE_FOLDER = 'Solutions'
+SAVE_FILES = {
+    'Board': 'board_image.jpg',
+    'Solution': 'solution_image.jpg',
+    'Process': 'process_image.jpg'
+}
+
+
+class ImageResult():
+    def __init__(self, path_img):
+        """
+        Result of running the pipeline on one image
+        :param path_img: image file of a sudoku board
+        """
+
+        self.path = path_img
+        self.error = None  # Error message (None if successful)
+        self.digits = None  # Detected digits (list of 81 ints)
+        self.confidences = None  # Classifier probability of each detected digit (list of 81 floats)
+        self.solution = None  # Solved digits for the blank spaces (list of 81 ints)
+        self.corrected = []  # Spaces whose reading was corrected to make the board solvable
+        self.corners = None  # Board corners in the image (4x1x2 array)
+        self.matrix = None  # Homography from the image to the warped board
+        self.timings = []  # Per-stage timing records (empty if untraced)
+        self.cache = None  # 'exact' / 'similar' when read from a SolveCache
+        self.images = {}  # Rendered views (only those requested)
+
+        # Intermediate images kept for the renderers
+        self.image = None
+        self.threshold = None
+        self.contours = None
+        self.warp = None
+
+
+# Corners of the warped board
+BOARD_CORNERS = [[0, 0], [WIDTH_IMG, 0], [0, HEIGHT_IMG], [WIDTH_IMG, HEIGHT_IMG]]
+
+
+def board_matrix(corners):
+    """
+    Homography from the image to the warped board
+    :param corners: board corners in the image (4x1x2 array, reordered)
+    :returns: 3x3 matrix
+    """
+    return cv2.getPerspectiveTransform(np.float32(corners), np.float32(BOARD_CORNERS))
+
+
+class PageResult():
+    def __init__(self, path_img):
+        """
+        Result of running the pipeline on an image with several boards
+        :param path_img: image file (ex. newspaper page or puzzle book scan)
+        """
+
+        self.path = path_img
+        self.error = None  # Error message (None if successful)
+        self.boards = []  # ImageResult of each board, largest first
+        self.timings = []  # Per-stage timing records (empty if untraced)
+        self.overlay = None  # Every solution overlayed onto the page
+
+        # Intermediate images shared by the boards
+        self.image = None
+        self.threshold = None
+        self.contours = None
+
+
+def locate_board(result, image, tracer=NULL_TRACER, source=None):
+    """
+    Find the board in an image and warp it to a square (grayscale) image
+    :param result: ImageResult to fill in
+    :param image: resized BGR image of a sudoku board (board detected on this image)
+    :param tracer: (optional) Tracer recording per-stage durations
+    :param source: (optional) full resolution image to warp the board from
+    :returns: bool whether the board was found (error set if not)
+    """
+
+    result.image = image
+    with tracer.stage('pre_process'):
+        result.threshold = pre_process(image)
+
+    # Find all (outer) contours
+    with tracer.stage('findContours'):
+        result.contours, hierarchy = cv2.findContours(result.threshold, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    # Find the largest contour and use it as the board
+    with tracer.stage('largest_contour'):
+        largest, max_area = largest_contour(result.contours)
+    if largest.size == 0:
+        # No board found
+        result.error = 'Error: board not found'
+        return False
+
+    result.corners = reorder(largest)
+    with tracer.stage('warp'):
+        warp_board(result, image, source)
+
+    return True
+
+
+def warp_board(result, image, source=None):
+    """
+    Warp a located board to a square (grayscale) image
+    :param result: ImageResult with the board's corners (matrix and warp filled in)
+    :param image: image the corners were found in
+    :param source: (optional) full resolution image to warp the board from
+    """
+
+    # Prepare biggest points for warp
+    points_1 = np.float32(result.corners)
+    points_2 = np.float32(BOARD_CORNERS)
+
+    # Get warp perspective
+    result.matrix = board_matrix(result.corners)
+    if source is None:
+        img_warp = cv2.warpPerspective(image, result.matrix, (WIDTH_IMG, HEIGHT_IMG))
+    else:
+        # Scale corners back to full resolution and warp straight to the OCR size
+        scale = np.float32([source.shape[1] / image.shape[1], source.shape[0] / image.shape[0]])
+        matrix = cv2.getPerspectiveTransform(points_1.reshape(4, 2) * scale, points_2)
+        img_warp = cv2.warpPerspective(source, matrix, (WIDTH_IMG, HEIGHT_IMG))
+
+    result.warp = cv2.cvtColor(img_warp, cv2.COLOR_BGR2GRAY)
+
+
+def solve_digits(result, nums, tracer=NULL_TRACER, top_k=None):
+    """
+    Solve the board from its detected digits
+    :param result: ImageResult to fill in (digits and solution)
+    :param nums: list of 81 detected digits (0 for blank spaces)
+    :param tracer: (optional) Tracer recording per-stage durations
+    :param top_k: (optional) (classes, probabilities) of each space, to correct misreadings
+        when the board has no unique solution
+    :returns: ImageResult
+    """
+
+    nums = np.asarray(nums, np.uint8).reshape(81)
+
+    # Find solution for the board (solved in place on a flat copy)
+    board = nums.copy()
+    with tracer.stage('solve'):
+        solutions = count_solutions(board, limit=2)
+
+    if solutions != 1 and top_k is not None:
+        # Repeated digit or several solutions: try the next most likely readings
+        with tracer.stage('correct'):
+            correction = correct_digits(*top_k)
+        if correction:
+            nums = np.asarray(correction.digits, np.uint8)
+            board = nums.copy()
+            count_solutions(board, limit=1)
+            result.corrected = correction.changed
+
+    # Only the places that needed to be filled
+    result.digits = nums.tolist()
+    result.solution = np.where(nums > 0, 0, board).tolist()
+
+    return result
+
+
+def solve_board_image(result, image, model=None, tracer=NULL_TRACER, source=None, cache=None, key=None):
+    """
+    Compute core of the pipeline: detect, read and solve the board (no drawing)
+    :param result: ImageResult to fill in
+    :param image: resized BGR image of a sudoku board (board detected on this image)
+    :param model: (optional) CNN model for digit prediction, loaded when first needed
+    :param tracer: (optional) Tracer recording per-stage durations
+    :param source: (optional) full resolution image to warp the board from
+    :param cache: (optional) SolveCache checked for a similar board before reading the digits
+    :param key: (optional) image_key the result is stored under in the cache
+    :returns: ImageResult (error set if board not found)
+    """
+
+    if not locate_board(result, image, tracer, source):
+        return result
+
+    # Split the image and find each digit / space
+    with tracer.stage('split_spaces'):
+        cells = prepare_cells(split_spaces(result.warp))
+
+    if cache:
+        # Same board from another image (ex. re-encoded or re-cropped photo), with the same spaces filled
+        with tracer.stage('cache'):
+            phash = board_hash(result.warp)
+            layout = filled_layout(cells)
+            entry = cache.similar(phash, layout)
+        if entry:
+            entry.apply(result, corners=False)
+            result.cache = 'similar'
+            if key:
+                cache.put(key, phash, layout, result)
+            return result
+
+    if model is None:
+        with tracer.stage('load_model'):
+            model = initialize_prediction_model()  # Load CNN model
+
+    with tracer.stage('predict'):
+        predictions = model.predict(cells, verbose=0)
+    result.confidences = read_confidences(predictions)
+
+    solve_digits(result, read_digits(predictions), tracer, read_top_k(predictions))
+    if cache and key:
+        cache.put(key, phash, layout, result)
+    return result
+
+
+def prepare_image_cells(data):
+    """
+    Decode an encoded image (ex. JPEG bytes) and prepare its board's spaces for the CNN,
+    so the classifier can run separately (batched with other boards)
+    :param data: bytes of an encoded image
+    :returns: (cells array of shape (81, 28, 28, 1) or None, error or None)
+    """
+
+    image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None, 'Error: image not found'
+
+    result = ImageResult(None)
+    proxy, scale = resize_proxy(image, PROXY_SIZE)
+    if not locate_board(result, proxy, source=image):
+        return None, result.error
+    return prepare_cells(split_spaces(result.warp)), None
+
+
+def locate_boards(page, image, tracer=NULL_TRACER, source=None, max_boards=MAX_BOARDS):
+    """
+    Find every board in an image (area, aspect ratio and grid line checks) and warp each one
+    :param page: PageResult to fill in (one ImageResult per board)
+    :param image: resized BGR image (boards detected on this image)
+    :param tracer: (optional) Tracer recording per-stage durations
+    :param source: (optional) full resolution image to warp the boards from
+    :param max_boards: (optional) most boards kept
+    :returns: bool whether any board was found (error set if not)
+    """
+
+    page.image = image
+    with tracer.stage('pre_process'):
+        page.threshold = pre_process(image)
+
+    # Every contour, so boards inside a page frame are found too
+    with tracer.stage('findContours'):
+        page.contours, hierarchy = cv2.findContours(page.threshold, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+    with tracer.stage('board_quads'):
+        found = []
+        for area, corners in board_quads(page.contours, page.threshold.size):
+            # Skip the inner outline of a board already found
+            center = tuple(map(float, corners.reshape(4, 2).mean(axis=0)))
+            if any(cv2.pointPolygonTest(other[[0, 1, 3, 2]], center, False) >= 0 for other in found):
+                continue
+            if has_grid_lines(page.threshold, corners):
+                found.append(corners)
+                if len(found) == max_boards:
+                    break
+
+    if not found:
+        page.error = 'Error: board not found'
+        return False
+
+    with tracer.stage('warp'):
+        for corners in found:
+            board = ImageResult(page.path)
+            board.image = image
+            board.corners = corners
+            warp_board(board, image, source)
+            page.boards.append(board)
+    return True
+
+
+def read_board_predictions(predictions):
+    """
+    Read and solve one board from its spaces' class probabilities (run in a process pool)
+    :param predictions: array of shape (81, 10)
+    :returns: (list of 81 digits, list of 81 solved digits for the blanks, list of corrected spaces)
+    """
+
+    result = solve_digits(ImageResult(None), read_digits(predictions), top_k=read_top_k(predictions))
+    return result.digits, result.solution, result.corrected
+
+
+# Processes solving the boards of a page, started on first use
+_solve_pool = None
+
+
+def solve_boards(predictions):
+    """
+    Solve several boards concurrently
+    :param predictions: list of arrays of shape (81, 10), one per board
+    :returns: list of read_board_predictions results
+    """
+
+    global _solve_pool
+    if len(predictions) < 2:
+        return [read_board_predictions(board) for board in predictions]
+    if _solve_pool is None:
+        _solve_pool = ProcessPoolExecutor(max_workers=min(MAX_BOARDS, os.cpu_count() or 1))
+    return list(_solve_pool.map(read_board_predictions, predictions))
+
+
+def render_board(result):
+    """Render the 'Board' view (original resized image)"""
+    return result.image
+
+
+def render_detected_digits(result):
+    """Render the detected digits onto a blank board with grid"""
+    blank_img = np.zeros((HEIGHT_IMG, WIDTH_IMG, 3), np.uint8)
+    img_detect_digits = stamp_nums(blank_img, result.digits, color=(225, 144, 30))
+    return overlay_grid(img_detect_digits)
+
+
+def render_solved_digits(result, grid=True):
+    """Render the solved digits onto a blank board (with grid optionally)"""
+    blank_img = np.zeros((HEIGHT_IMG, WIDTH_IMG, 3), np.uint8)
+    img_solved_digits = stamp_nums(blank_img, result.solution)
+    if grid:
+        img_solved_digits = overlay_grid(img_solved_digits)
+    return img_solved_digits
+
+
+def add_board_layer(img, board_img, matrix):
+    """
+    Project a rendered board back onto the image, only inside the board's bounding box
+    :param img: image to add onto (updated in place)
+    :param board_img: rendered board (WIDTH_IMG x HEIGHT_IMG)
+    :param matrix: homography from the image to the warped board
+    """
+
+    inverse = np.linalg.inv(matrix)  # Board back to image
+    corners = cv2.perspectiveTransform(np.float32(BOARD_CORNERS).reshape(-1, 1, 2), inverse).reshape(4, 2)
+    x0, y0 = np.maximum(np.floor(corners.min(axis=0)).astype(int), 0)
+    x1, y1 = np.minimum(np.ceil(corners.max(axis=0)).astype(int) + 1, (img.shape[1], img.shape[0]))
+    if x1 <= x0 or y1 <= y0:
+        return
+
+    # Same projection, shifted to the box
+    shift = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], np.float64)
+    layer = cv2.warpPerspective(board_img, shift @ inverse, (int(x1 - x0), int(y1 - y0)))
+    box = img[y0:y1, x0:x1]
+    cv2.add(box, layer, dst=box)
+
+
+def render_solution(result):
+    """Render the 'Solution' view (solved digits overlayed onto the original image)"""
+
+    # Dimmed image (as blending with weight 0.5), then the digits added inside the board
+    img = cv2.convertScaleAbs(result.image, alpha=0.5, beta=1)
+    add_board_layer(img, render_solved_digits(result, grid=False), result.matrix)
+    return img
+
+
+def render_page_solution(page):
+    """Render every board's solved digits onto the page in one pass"""
+
+    img = cv2.convertScaleAbs(page.image, alpha=0.5, beta=1)
+    for board in page.boards:
+        add_board_layer(img, render_solved_digits(board, grid=False), board.matrix)
+    return img
+
+
+def render_process(result):
+    """Render the 'Process' view (every step of the pipeline stacked)"""
+
+    # Draw all detected contours and the largest contour
+    img_contours = result.image.copy()
+    cv2.drawContours(img_contours, result.contours, -1, (0, 255, 0), 3)
+    img_large_contour = result.image.copy()
+    cv2.drawContours(img_large_contour, result.corners, -1, (0, 0, 255), 15)
+
+    img_arr = ([result.image, result.threshold, img_contours, img_large_contour],
+               [result.warp, render_detected_digits(result), render_solved_digits(result), render_solution(result)])
+
+    # Match the board size so the rows line up (proxy keeps the photo's aspect ratio)
+    img_arr = [[cv2.resize(img, (WIDTH_IMG, HEIGHT_IMG)) for img in row] for row in img_arr]
+    return stack_images(img_arr, 1)
+
+
+# Renderer for each view (called only when requested)
+RENDERERS = {
+    'Board': render_board,
+    'Solution': render_solution,
+    'Process': render_process
+}
+
+
+def export_images(result, folder=SAVE_FOLDER, tracer=NULL_TRACER):
+    """
+    Save the rendered views of a result as image files
+    :param result: ImageResult with rendered views
+    :param folder: (optional) folder to save the files to
+    :param tracer: (optional) Tracer recording per-stage durations
+    """
+
+    os.makedirs(folder, exist_ok=True)
+    for view, img in result.images.items():
+        with tracer.stage('imwrite'):
+            cv2.imwrite(os.path.join(folder, SAVE_FILES[view]), img)
 
 
-def display_image_solution(path_img, operation, test=False):
+def display_image_solution(path_img, operation=None, test=False, tracer=None, export=False, scaling='proxy',
+                           cache=None, model=None):
     """
     Display the solution of a Sudoku board on an image
     :param path_img: image file of a soduku board
-    :param operation: specifies the type of display
+    :param operation: (optional) view or list of views to render ('Board', 'Solution', 'Process'),
+        None computes the digits and solution only
     :param test: (optional) whether to display image for testing
-    :returns: image window or file
+    :param tracer: (optional) Tracer recording per-stage durations
+    :param export: (optional) whether to also save the rendered views to the solutions folder
+    :param scaling: (optional) 'proxy' finds the board on a downscaled copy and warps from full resolution,
+        'resize' squashes the whole image to the board size first
+    :param cache: (optional) SolveCache, a hit skips the classifier and solver
+    :param model: (optional) digit classifier with the keras predict interface, the CNN by default
+    :returns: ImageResult with rendered views in memory (error set if image or board not found)
     """
 
-    width_img, height_img = 450, 450  # Board should be a square
-    model = initialize_prediction_model()  # Load CNN model
+    tracer = tracer or NULL_TRACER
+    result = ImageResult(path_img)
+    result.timings = tracer.records
+
+    # Render only the requested views
+    if operation is None:
+        views = []
+    elif isinstance(operation, str):
+        views = [operation]
+    else:
+        views = list(operation)
 
     # Prepare the image
-    image = cv2.imread(path_img)
-    cont = True
+    with tracer.stage('imread'):
+        if cache:
+            # Bytes kept for the cache key
+            try:
+                with open(path_img, 'rb') as file:
+                    data = file.read()
+            except OSError:
+                data = b''
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) if data else None
+        else:
+            image = cv2.imread(path_img)
 
-    try:
-        image = cv2.resize(image, (width_img, height_img))  # Resize image to square
-    except cv2.error:
+    if image is None:
         # No / wrong image path
-        cont = False
-
-    # Image upload successful
-    if cont:
-        blank_img = np.zeros((height_img, width_img, 3), np.uint8)  # Create blank image for constructing
-        threshold_img = pre_process(image)
-
-        # Find all countours
-        img_contours = image.copy()  # Copy for display purposes
-        img_large_contour = image.copy()  # Copy for display purposes
-        contours, hierarchy = cv2.findContours(threshold_img, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)  # Find all contours (outer contours)
-        cv2.drawContours(img_contours, contours, -1, (0, 255, 0), 3)  # Draw all dected contours
-
-        # Find the largest contour and use it as the board
-        largest, max_area = largest_contour(contours)
-        if largest.size != 0:
-            # Draw the largest contour
-            largest = reorder(largest)
-            cv2.drawContours(img_large_contour, largest, -1, (0, 0, 255), 15)
-
-            # Prepare biggest points for warp
-            points_1 = np.float32(largest)
-            points_2 = np.float32([[0, 0],[width_img, 0], [0, height_img],[width_img, height_img]])
-
-            # Get warp perspective
-            matrix = cv2.getPerspectiveTransform(points_1, points_2)
-            img_warp = cv2.warpPerspective(image, matrix, (width_img, height_img))
-            img_detect_digits = blank_img.copy()
-            img_warp = cv2.cvtColor(img_warp,cv2.COLOR_BGR2GRAY)
-
-            # Split the image and find each digit / space
-            img_solved_digits = blank_img.copy()  # Copy for display purposes
-            spaces = split_spaces(img_warp)
-            nums = predict(spaces, model)
-            img_detect_digits = display_nums(img_detect_digits, nums, color=(225, 144, 30))
-            nums = np.asarray(nums)
-            pos_arr = np.where(nums > 0, 0, 1)  # 1: places that need to be filled
-
-            # Find solution for the board
-            board = np.array_split(nums, 9)  # Split array into list of 9 rows
-            try:
-                solve(board)
-            except:
-                # Ignore error of calculating solution and continue (when there is not solution)
-                pass
-
-            # Format solution back to a 1D list
-            board_lst = []
-            for sub_lst in board:
-                for item in sub_lst:
-                    board_lst.append(item)
-
-            solved_nums = board_lst * pos_arr
-            img_solved_digits = display_nums(img_solved_digits, solved_nums)
-
-            
-            # Overlay solution onto original image
-            points_2 = np.float32(largest)
-            points_1 = np.float32([[0, 0], [width_img, 0], [0, height_img], [width_img, height_img]])
-            matrix = cv2.getPerspectiveTransform(points_1, points_2)
-            img_inverse_warp = image.copy()
-            img_inverse_warp = cv2.warpPerspective(img_solved_digits, matrix, (width_img, height_img))
-            img_inverse_perspective = cv2.addWeighted(img_inverse_warp, 1, image, 0.5, 1)
-
-            # Overlay grid to base number and solution images
-            img_detect_digits = draw_grid(img_detect_digits)
-            img_solved_digits = draw_grid(img_solved_digits)
-
-            # Return solution(s)
-            if operation == 'Board':
-                img_arr = ([[image]])
-            elif operation == 'Solution':
-                img_arr = ([[img_inverse_perspective]])
-            elif operation == 'Process':
-                img_arr = ([image, threshold_img, img_contours, img_large_contour],
-                            [img_warp, img_detect_digits, img_solved_digits, img_inverse_perspective])
-
-            # Save image to variable
-            stacked_img = stack_images(img_arr, 1)
-
-            if test:
-                # Display image for testing
-                cv2.imshow(operation, stacked_img)
-                cv2.waitKey(0)
-            else:
-
-                # Save image to solutions folder
-                save_folder = 'Solutions'
-
-                if operation == 'Board':
-                    save_path = os.path.join(save_folder, 'board_image.jpg')
-                elif operation == 'Solution':
-                    save_path = os.path.join(save_folder, 'solution_image.jpg')
-                elif operation == 'Process':
-                    save_path = os.path.join(save_folder, 'process_image.jpg')
-
-                # Write file to folder
-                cv2.imwrite(save_path, stacked_img)
+        result.error = 'Error: image not found'
+        return result
+
+    key = entry = None
+    if cache:
+        with tracer.stage('cache'):
+            key = image_key(data, scaling)
+            entry = cache.get(key)
 
+    source = None
+    with tracer.stage('resize'):
+        if scaling == 'proxy':
+            source = image
+            image, scale = resize_proxy(image, PROXY_SIZE)
         else:
-            # No board found
-            print('Error: board not found')
+            image = cv2.resize(image, (WIDTH_IMG, HEIGHT_IMG))  # Resize image to square
+
+    if entry is None:
+        solve_board_image(result, image, model, tracer, source, cache, key)
+    elif 'Process' in views:
+        # Same image: find the board again for the process view's steps, readings from the cache
+        locate_board(result, image, tracer, source)
+        entry.apply(result)
+        result.cache = 'exact'
     else:
-        # Path of image not found
-        return 'Error: image not found'
+        # Same image: render straight from the cached readings and corners
+        result.image = image
+        entry.apply(result)
+        result.matrix = board_matrix(result.corners)
+        result.cache = 'exact'
+    if result.error:
+        return result
+
+    for view in views:
+        with tracer.stage('render'):
+            result.images[view] = RENDERERS[view](result)
+
+        if test:
+            # Display image for testing
+            cv2.imshow(view, result.images[view])
+            cv2.waitKey(0)
+
+    if export:
+        # Save images to solutions folder
+        export_images(result, tracer=tracer)
+
+    return result
+
+
+def solve_page(path_img, overlay=True, test=False, tracer=None, model=None):
+    """
+    Read and solve every board in an image (ex. newspaper page with several grids)
+    :param path_img: image file
+    :param overlay: (optional) whether to render every solution onto the page
+    :param test: (optional) whether to display the overlay for testing
+    :param tracer: (optional) Tracer recording per-stage durations
+    :param model: (optional) CNN model for digit prediction, loaded when first needed
+    :returns: PageResult (error set if image or no board found)
+    """
+
+    tracer = tracer or NULL_TRACER
+    page = PageResult(path_img)
+    page.timings = tracer.records
+
+    with tracer.stage('imread'):
+        source = cv2.imread(path_img)
+    if source is None:
+        page.error = 'Error: image not found'
+        return page
+
+    with tracer.stage('resize'):
+        image, scale = resize_proxy(source, PAGE_PROXY_SIZE)
+    if not locate_boards(page, image, tracer, source):
+        return page
+
+    if model is None:
+        with tracer.stage('load_model'):
+            model = initialize_prediction_model()
+
+    # Every board's spaces in one classifier call
+    with tracer.stage('split_spaces'):
+        cells = np.concatenate([prepare_cells(split_spaces(board.warp)) for board in page.boards])
+    with tracer.stage('predict'):
+        predictions = model.predict(cells, verbose=0)
+
+    boards = [predictions[i*81:(i + 1)*81] for i in range(len(page.boards))]
+    with tracer.stage('solve'):
+        solved = solve_boards(boards)
+    for board, board_predictions, (digits, solution, corrected) in zip(page.boards, boards, solved):
+        board.confidences = read_confidences(board_predictions)
+        board.digits, board.solution, board.corrected = digits, solution, corrected
+
+    if overlay:
+        with tracer.stage('render'):
+            page.overlay = render_page_solution(page)
+        if test:
+            cv2.imshow('Page', page.overlay)
+            cv2.waitKey(0)
+
+    return page
+
+
+def trace_batch(paths, operation=None, jsonl_path=None, memory=False, summary=False):
+    """
+    Run the pipeline over several images, tracing every stage
+    :param paths: list of image files of sudoku boards
+    :param operation: (optional) view or list of views to render
+    :param jsonl_path: (optional) file to write one JSON line of timings per image
+    :param memory: (optional) whether to record memory deltas
+    :param summary: (optional) whether to print a per-stage summary table
+    :returns: list of ImageResult
+    """
+
+    results, tracers = [], []
+    out = open(jsonl_path, 'w') if jsonl_path else None
+
+    try:
+        for path_img in paths:
+            tracer = Tracer(memory=memory)
+            result = display_image_solution(path_img, operation, tracer=tracer)
+            results.append(result)
+            tracers.append(tracer)
+
+            if out:
+                out.write(tracer.to_json(path=path_img, error=result.error) + '\n')
+    finally:
+        if out:
+            out.close()
+
+    if summary:
+        print(summary_table(tracers))
+
+    return results
 
     
 # Test:
 if __name__ == '__main__':
-    display_image_solution('Boards/puzzle_4.jpg', 'Process', test=True)
\ No newline at end of file
+    display_image_solution('Boards/puzzle_4.jpg', 'Process', test=True)
@@ -0,0 +1,111 @@
+"""
+File: overlay.py
+Description:
+    Toggleable performance overlay for the pygame screens (F3). Shows the
+    frame rate, average and worst frame time over the last second, the
+    time spent handling events vs. rendering, and the latency from a cell
+    entry to it reaching the display. Hidden, it only checks for its key.
+"""
+
+import time
+from collections import deque
+
+import pygame
+
+from glyphs import get_font
+from render import FrameClock
+
+
+class PerfOverlay():
+    # Key showing / hiding the overlay
+    TOGGLE_KEY = pygame.K_F3
+
+    def __init__(self):
+        """Frame statistics drawn in a strip at the top of the screen (free on every screen)"""
+
+        self.visible = False
+        self.rect = pygame.Rect(150, 0, 600, 20)
+        self.color = (20, 20, 60)
+        self.background = (154, 182, 217)
+        self.refresh = 0.25  # Seconds between redraws of the text
+        self.frames = deque(maxlen=60)  # (work, events) of the last frames, seconds
+        self.fps = 0
+        self.input_start = None  # Time of the input waiting to be displayed
+        self.latency = None  # Last input to display latency, seconds
+        self.drawn_at = 0
+        self.cleared = False  # Strip needs covering after hiding
+
+    def handle_event(self, event):
+        """
+        Toggle the overlay on its key
+        :param event: pygame event
+        :returns: bool whether the event was used
+        """
+
+        if event.type != pygame.KEYDOWN or event.key != self.TOGGLE_KEY:
+            return False
+
+        self.visible = not self.visible
+        if self.visible:
+            # Only measure frames while shown
+            self.frames.clear()
+            self.latency = None
+            self.drawn_at = 0
+            FrameClock.listeners.append(self.on_frame)
+        else:
+            FrameClock.listeners.remove(self.on_frame)
+            self.cleared = True
+        return True
+
+    def input_received(self):
+        """Start timing an input (ex. digit entered in a cell) until it is displayed"""
+        if self.visible:
+            self.input_start = time.perf_counter()
+
+    def on_frame(self, clock):
+        """Frame listener (see render.FrameClock), called after the display update"""
+
+        self.frames.append((clock.work, clock.events))
+        self.fps = clock.clock.get_fps()
+        if self.input_start is not None:
+            self.latency = time.perf_counter() - self.input_start
+            self.input_start = None
+            self.drawn_at = 0  # Show it on the next frame
+
+    def text(self):
+        """Statistics line shown on the overlay"""
+
+        works = [work for work, _ in self.frames] or [0]
+        events = sum(event for _, event in self.frames) / max(len(self.frames), 1)
+        average = sum(works) / len(works)
+        latency = f'{self.latency * 1000:.1f} ms' if self.latency is not None else '-'
+        return (f'FPS {self.fps:.0f}  frame {average * 1000:.1f} / {max(works) * 1000:.1f} ms  '
+                f'events {events * 1000:.1f} ms  render {(average - events) * 1000:.1f} ms  '
+                f'input {latency}')
+
+    def draw(self, screen, dirty):
+        """
+        Draw the overlay (a few times per second) before the display update
+        :param screen: screen to draw onto
+        :param dirty: the screen's DirtyRects
+        """
+
+        if not self.visible:
+            if self.cleared:
+                dirty.mark(screen.fill(self.background, self.rect))
+                self.cleared = False
+            return
+
+        now = time.perf_counter()
+        if now - self.drawn_at < self.refresh:
+            return
+        self.drawn_at = now
+
+        screen.fill(self.background, self.rect)
+        screen.blit(get_font(None, 20).render(self.text(), True, self.color), (self.rect.x + 4, 3),
+                    pygame.Rect(0, 0, self.rect.width - 4, self.rect.height))
+        dirty.mark(self.rect)
+
+
+# Shared overlay for all screens
+overlay = PerfOverlay()
@@ -0,0 +1,354 @@
+"""
+File: pipeline.py
+Description:
+    Streaming pipeline for batches of board images. Decoding and board
+    detection run on threads (OpenCV releases the GIL), spaces are
+    classified in micro-batches across images and boards are solved in a
+    process pool, with bounded queues between the stages so they overlap.
+    Predictions reach the solver processes through shared memory, and
+    each stage's utilization is reported to show the bottleneck.
+"""
+
+import argparse
+import glob
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from process import *
+from img_solver import ImageResult, locate_board, read_board_predictions, PROXY_SIZE, WIDTH_IMG, HEIGHT_IMG
+
+
+# Images waiting between two stages (backpressure on the earlier stage)
+QUEUE_SIZE = 8
+
+# Most boards classified in one model call
+MAX_BATCH = 8
+
+# Longest wait for a batch to fill once its first board arrives (ms)
+MAX_WAIT_MS = 10
+
+# Shape of one board's predictions in shared memory
+SLOT_SHAPE = (81, 10)
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class StageStats():
+    def __init__(self, name, workers):
+        """
+        Busy time of one stage of the pipeline
+        :param name: name of the stage
+        :param workers: threads or processes running the stage
+        """
+
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0  # Seconds spent working, summed over the workers
+        self.lock = threading.Lock()
+
+    def add(self, seconds, items=1):
+        """Record work done by one worker"""
+        with self.lock:
+            self.busy += seconds
+            self.items += items
+
+    def report(self, wall):
+        """
+        :param wall: seconds the pipeline ran
+        :returns: dict of the stage's counters, utilization = busy time / (wall time * workers)
+        """
+        return {'stage': self.name, 'workers': self.workers, 'items': self.items,
+                'busy_s': round(self.busy, 3), 'utilization': round(self.busy / (wall * self.workers), 3)}
+
+
+class SharedSlots():
+    def __init__(self, slots, shape=SLOT_SHAPE, dtype=np.float32):
+        """
+        Fixed size arrays in one shared memory block, handed out and returned
+        :param slots: number of arrays (acquire blocks while all are in use)
+        :param shape: shape of each array
+        :param dtype: type of the values
+        """
+
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * int(np.prod(shape)) * self.dtype.itemsize)
+        self.arrays = np.ndarray((slots, *shape), self.dtype, buffer=self.shm.buf)
+        self.free = queue.Queue()
+        for index in range(slots):
+            self.free.put(index)
+
+    @property
+    def name(self):
+        """Name the worker processes attach to"""
+        return self.shm.name
+
+    def acquire(self):
+        """Index of a free slot (waits for one to be released)"""
+        return self.free.get()
+
+    def release(self, index):
+        """Return a slot once its reader is done"""
+        self.free.put(index)
+
+    def close(self):
+        """Free the shared memory"""
+        del self.arrays
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Shared memory blocks attached in a solver process (by name)
+_attached = {}
+
+
+def solve_slot(name, slots, index):
+    """
+    Solve the board whose predictions are in a shared slot (run in a solver process)
+    :param name: name of the SharedSlots block
+    :param slots: number of slots in the block
+    :param index: slot holding the board's predictions
+    :returns: (read_board_predictions result, seconds spent)
+    """
+
+    start = time.perf_counter()
+    if name not in _attached:
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = (shm, np.ndarray((slots, *SLOT_SHAPE), np.float32, buffer=shm.buf))
+    predictions = _attached[name][1][index].copy()  # Slot is reused as soon as this returns
+    return read_board_predictions(predictions), time.perf_counter() - start
+
+
+class _Item():
+    def __init__(self, index, path_img):
+        """Image moving through the pipeline"""
+        self.index = index
+        self.result = ImageResult(path_img)
+        self.source = None  # Full resolution image (proxy scaling)
+        self.cells = None  # Prepared spaces, shape (81, 28, 28, 1)
+
+
+def _run_threads(func, stats, inq, outq):
+    """
+    Start a stage's threads: each takes items from inq, calls func and passes them to outq
+    (items with an error skip func), the last thread to finish marks the end of outq
+    :returns: list of threads
+    """
+
+    remaining = [stats.workers]
+    lock = threading.Lock()
+
+    def loop():
+        while True:
+            item = inq.get()
+            if item is _DONE:
+                inq.put(_DONE)  # Let the stage's other threads see it
+                break
+            if item.result.error is None:
+                start = time.perf_counter()
+                try:
+                    func(item)
+                except Exception as error:
+                    item.result.error = f'Error: {error}'
+                stats.add(time.perf_counter() - start)
+            outq.put(item)
+
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0:
+                outq.put(_DONE)
+
+    threads = [threading.Thread(target=loop, name=f'{stats.name}-{i}', daemon=True) for i in range(stats.workers)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def decode_image(item, scaling='proxy'):
+    """Decode stage: read the image and scale it for detection"""
+
+    image = cv2.imread(item.result.path)
+    if image is None:
+        item.result.error = 'Error: image not found'
+    elif scaling == 'proxy':
+        item.source = image
+        item.result.image, scale = resize_proxy(image, PROXY_SIZE)
+    else:
+        item.result.image = cv2.resize(image, (WIDTH_IMG, HEIGHT_IMG))
+
+
+def detect_board(item):
+    """Detect stage: find and warp the board, then prepare its spaces for the classifier"""
+
+    if locate_board(item.result, item.result.image, source=item.source):
+        item.cells = prepare_cells(split_spaces(item.result.warp))
+    item.source = None  # Full resolution image no longer needed
+
+
+def run_pipeline(paths, model=None, decode_threads=2, detect_threads=2, solve_workers=None, scaling='proxy',
+                 max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, queue_size=QUEUE_SIZE):
+    """
+    Read and solve a batch of board images with the stages overlapping across images
+    :param paths: list of image files of sudoku boards
+    :param model: (optional) digit classifier with the keras predict interface, the CNN by default
+    :param decode_threads: (optional) threads reading the images
+    :param detect_threads: (optional) threads finding the boards and preparing their spaces
+    :param solve_workers: (optional) solver processes (cpu count by default)
+    :param scaling: (optional) 'proxy' or 'resize', as display_image_solution
+    :param max_batch: (optional) most boards per classifier call
+    :param max_wait_ms: (optional) longest wait for a batch to fill
+    :param queue_size: (optional) images waiting between two stages
+    :returns: (list of ImageResult in the order of paths, report dict of wall time and per-stage utilization)
+    """
+
+    model = model or initialize_prediction_model()
+    solve_workers = solve_workers or os.cpu_count() or 1
+    stats = {name: StageStats(name, workers) for name, workers in
+             (('decode', decode_threads), ('detect', detect_threads), ('ocr', 1), ('solve', solve_workers))}
+
+    # Unbounded input (paths only), bounded queues between the stages
+    paths_q = queue.Queue()
+    decoded_q, detected_q, done_q = queue.Queue(queue_size), queue.Queue(queue_size), queue.Queue()
+    for index, path_img in enumerate(paths):
+        paths_q.put(_Item(index, path_img))
+    paths_q.put(_DONE)
+
+    # One slot per board the solvers may hold, so the classifier waits when they fall behind
+    slots = SharedSlots(2 * solve_workers + max_batch)
+    pool = ProcessPoolExecutor(max_workers=solve_workers)
+    start = time.perf_counter()
+
+    def solved(item, index, future):
+        slots.release(index)
+        try:
+            (digits, solution, corrected), seconds = future.result()
+            item.result.digits, item.result.solution, item.result.corrected = digits, solution, corrected
+            stats['solve'].add(seconds)
+        except Exception as error:
+            item.result.error = f'Error: {error}'
+        done_q.put(item)
+
+    def classify():
+        # Gather boards from several images into one model call
+        finished = False
+        while not finished:
+            batch = []
+            item = detected_q.get()
+            deadline = time.perf_counter() + max_wait_ms / 1000
+            while True:
+                if item is _DONE:
+                    finished = True
+                    break
+                batch.append(item)
+                timeout = deadline - time.perf_counter()
+                if len(batch) >= max_batch or timeout <= 0:
+                    break
+                try:
+                    item = detected_q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+
+            boards = [item for item in batch if item.cells is not None]
+            for item in batch:
+                if item.cells is None:
+                    if item.result.error is None:
+                        item.result.error = 'Error: board not found'
+                    done_q.put(item)
+            if not boards:
+                continue
+
+            submitted, index = 0, None
+            try:
+                begin = time.perf_counter()
+                predictions = model.predict(np.concatenate([item.cells for item in boards]), verbose=0)
+                stats['ocr'].add(time.perf_counter() - begin, len(boards))
+
+                for i, item in enumerate(boards):
+                    board_predictions = predictions[i*81:(i + 1)*81]
+                    item.result.confidences = read_confidences(board_predictions)
+                    index = slots.acquire()
+                    slots.arrays[index] = board_predictions
+                    future = pool.submit(solve_slot, slots.name, len(slots.arrays), index)
+                    item.cells = None
+                    slot, submitted, index = index, i + 1, None  # The callback releases the slot from now on
+                    future.add_done_callback(lambda future, item=item, slot=slot: solved(item, slot, future))
+            except Exception as error:
+                # Fail the boards not handed to the solvers yet, so the batch doesn't stall the pipeline
+                if index is not None:
+                    slots.release(index)
+                for item in boards[submitted:]:
+                    item.cells = None
+                    item.result.error = f'Error: {error}'
+                    done_q.put(item)
+
+    try:
+        threads = _run_threads(lambda item: decode_image(item, scaling), stats['decode'], paths_q, decoded_q)
+        threads += _run_threads(detect_board, stats['detect'], decoded_q, detected_q)
+        ocr = threading.Thread(target=classify, name='ocr', daemon=True)
+        ocr.start()
+
+        results = [None] * len(paths)
+        for _ in paths:
+            item = done_q.get()
+            results[item.index] = item.result
+        wall = time.perf_counter() - start
+
+        ocr.join()
+        for thread in threads:
+            thread.join()
+    finally:
+        pool.shutdown()
+        slots.close()
+
+    stages = [stage.report(wall) for stage in stats.values()]
+    report = {'images': len(paths), 'wall_s': round(wall, 3), 'images_per_s': round(len(paths) / wall, 2),
+              'stages': stages, 'bottleneck': max(stages, key=lambda stage: stage['utilization'])['stage']}
+    return results, report
+
+
+def utilization_table(report):
+    """
+    Build a table of the per-stage utilization of a pipeline run
+    :param report: report dict from run_pipeline
+    :returns: table as a str
+    """
+
+    lines = [f"{'stage':<10}{'workers':>8}{'items':>7}{'busy s':>9}{'util':>7}"]
+    for stage in report['stages']:
+        mark = '  <- bottleneck' if stage['stage'] == report['bottleneck'] else ''
+        lines.append(f"{stage['stage']:<10}{stage['workers']:>8}{stage['items']:>7}"
+                     f"{stage['busy_s']:>9.3f}{stage['utilization']:>7.0%}{mark}")
+    lines.append(f"{report['images']} images in {report['wall_s']} s ({report['images_per_s']} images/s)")
+    return '\n'.join(lines)
+
+
+# Run pipeline
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Solve a batch of board images with a staged pipeline')
+    parser.add_argument('paths', nargs='*', help='image files (Boards/*.jpg by default)')
+    parser.add_argument('--repeat', type=int, default=1, help='times each image is queued')
+    parser.add_argument('--decode-threads', type=int, default=2)
+    parser.add_argument('--detect-threads', type=int, default=2)
+    parser.add_argument('--solve-workers', type=int, default=None)
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--template', action='store_true', help='use the template classifier instead of the CNN')
+    args = parser.parse_args()
+
+    paths = (args.paths or sorted(glob.glob('Boards/*.jpg'))) * args.repeat
+    model = None
+    if args.template:
+        from template_classifier import TemplateClassifier
+        model = TemplateClassifier()
+
+    results, report = run_pipeline(paths, model, args.decode_threads, args.detect_threads, args.solve_workers,
+                                   max_batch=args.max_batch)
+    errors = sum(1 for result in results if result.error)
+    print(utilization_table(report))
+    if errors:
+        print(f'{errors} images failed')
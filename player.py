@@ -10,33 +10,57 @@ Description:
 """
 
 import pygame
+import numpy as np
 import sys
 import os
 
 import button
+from assets import assets
+from render import DirtyRects, FrameClock
+from overlay import overlay
+from glyphs import get_font
 from game import *
 from img_solver import *
+from worker import SolveJob
 
 
 # Setup screen
 pygame.init()
 pygame.font.init()
 screen = pygame.display.set_mode((900, 700))
-new_icon = pygame.image.load('Assets/Other/sudoku_icon.png')
+assets.preload()  # Load all images once
+new_icon = assets.get('Assets/Other/sudoku_icon.png')
 pygame.display.set_icon(new_icon)
-clock = pygame.time.Clock()
+clock = FrameClock()
+
+# Solved image shown by the solution and process screens
+last_result = None
 
 
 def draw_text(text, font, color, x, y):
-    """Renders text onto the screen"""
+    """Renders text onto the screen (returns the region drawn to)"""
     img = font.render(text, True, color)
-    screen.blit(img, (x, y))
+    return screen.blit(img, (x, y))
+
+
+def to_surface(img):
+    """
+    Wrap a BGR image from img_solver as a pygame surface (no copy)
+    :param img: 3 channel image (numpy array)
+    :returns: surface sharing the image's memory
+    """
+
+    img = np.ascontiguousarray(img)
+    return pygame.image.frombuffer(img, (img.shape[1], img.shape[0]), 'BGR')
+
 
 def delete_solutions():
-    """Deletes (resets) all files in Solutions folder"""
+    """Deletes (resets) all files in Solutions folder (only created when exporting images)"""
 
     # Specify folder path
     folder_path = 'Solutions'
+    if not os.path.isdir(folder_path):
+        return
     file_list = os.listdir(folder_path)
 
     # Loop through files and delete them
@@ -47,90 +71,97 @@ def delete_solutions():
 
 
 def menu():
-    """Starting menu page for the GUI"""
+    """Starting menu page for the GUI (returns the next screen)"""
+
+    global last_result
+    last_result = None  # Solution screens left, free their images
 
     screen.fill((154, 182, 217))
     pygame.display.set_caption('Solvoku')
 
     # Images
-    board_img = pygame.image.load('Assets/Menu/board_art_img.jpg').convert_alpha()
-    board_img = pygame.transform.scale(board_img, (500, 500))
-    esc_img = pygame.image.load('Assets/Menu/escape_img.jpg').convert_alpha()
-    esc_img = pygame.transform.scale(esc_img, (110, 60))
+    board_img = assets.get('Assets/Menu/board_art_img.jpg', (500, 500))
+    esc_img = assets.get('Assets/Menu/escape_img.jpg', (110, 60))
 
     # Buttons
-    play_img = pygame.image.load('Assets/Menu/play_img.jpg').convert_alpha()
-    solve_img = pygame.image.load('Assets/Menu/solve_img.jpg').convert_alpha()
-    settings_img = pygame.image.load('Assets/Menu/settings_img.jpg').convert_alpha()
+    play_img = assets.get('Assets/Menu/play_img.jpg', (110, 60))
+    solve_img = assets.get('Assets/Menu/solve_img.jpg', (110, 60))
+    settings_img = assets.get('Assets/Menu/settings_img.jpg', (60, 60))
     play_btn = button.Button(300, 600, play_img, (110, 60))
     solve_btn = button.Button(490, 600, solve_img, (110, 60))
     settings_btn = button.Button(20, 20, settings_img, (60, 60))
 
+    # Draw on screen (static, drawn once)
+    dirty = DirtyRects(screen)
+    screen.blit(board_img, (200, 60))
+    play_btn.draw(screen)
+    solve_btn.draw(screen)
+    settings_btn.draw(screen)
+    screen.blit(esc_img, (765, 25))
+    buttons = button.ButtonManager([play_btn, solve_btn, settings_btn])
+
     while True:
 
-        # Draw on screen
-        screen.blit(board_img, (200, 60))
-        play_btn.draw(screen)
-        solve_btn.draw(screen)
-        settings_btn.draw(screen)
-        screen.blit(esc_img, (765, 25))
+        # Exit and close all code
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                delete_solutions()
+                pygame.quit()
+                sys.exit()
+            overlay.handle_event(event)  # Performance overlay (F3)
+            buttons.handle_event(event)  # Button clicks
 
+        # Check buttons
         if play_btn.get_clicked():
-            play()
+            return 'PLAY'
 
         if solve_btn.get_clicked():
-            solve_image()
+            return 'SOLVE'
 
         if settings_btn.get_clicked():
-            settings()
+            return 'SETTINGS'
 
-        # Exit and close all code
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                delete_solutions()
-                pygame.quit()
-                sys.exit()
+        clock.events_done()
 
         # Draw and update
-        pygame.display.update()
-        clock.tick(60)
+        buttons.draw(screen, dirty)
+        overlay.draw(screen, dirty)
+        dirty.update()
+        clock.tick()
 
 
 def settings():
-    """Settings page navigated to from menu"""
+    """Settings page navigated to from menu (returns the next screen)"""
 
     screen.fill((154, 182, 217))
 
     # Images
-    border_img = pygame.image.load('Assets/Settings/settings_box_img.jpg').convert_alpha()
-    settings_title = pygame.image.load('Assets/Settings/settings_title_img.jpg').convert_alpha()
-    about_title = pygame.image.load('Assets/Settings/about_title.jpg').convert_alpha()
-    border_img = pygame.transform.scale(border_img, (600, 450))
-    settings_title = pygame.transform.scale(settings_title, (350, 80))
-    about_title = pygame.transform.scale(about_title, (150, 50))
+    border_img = assets.get('Assets/Settings/settings_box_img.jpg', (600, 450))
+    settings_title = assets.get('Assets/Settings/settings_title_img.jpg', (350, 80))
+    about_title = assets.get('Assets/Settings/about_title.jpg', (150, 50))
 
     # Buttons
-    back_img = pygame.image.load('Assets/Other/back_img.jpg').convert_alpha()
+    back_img = assets.get('Assets/Other/back_img.jpg', (110, 60))
     back_btn = button.Button(765, 25, back_img, (110, 60))
 
-    while True:
-        
-        screen.blit(border_img, (150, 150))
-        screen.blit(settings_title, (20, 20))
-        screen.blit(about_title, (375, 220))
-        back_btn.draw(screen)
-
-        draw_text('Sudoku solver and player using', 
-                  pygame.font.SysFont('DroidSans', 35), 'White', 265, 310)
-        draw_text('backtracking and image processing',
-                  pygame.font.SysFont('DroidSans', 35), 'White', 240, 360)
-        draw_text('to efficiently and quickly solve',
-                  pygame.font.SysFont('DroidSans', 35), 'White', 265, 410)
-        draw_text('any puzzle',
-                  pygame.font.SysFont('DroidSans', 35), 'White', 380, 460)
+    # Draw on screen (static, drawn once)
+    dirty = DirtyRects(screen)
+    screen.blit(border_img, (150, 150))
+    screen.blit(settings_title, (20, 20))
+    screen.blit(about_title, (375, 220))
+    back_btn.draw(screen)
+
+    draw_text('Sudoku solver and player using', 
+              get_font('DroidSans', 35), 'White', 265, 310)
+    draw_text('backtracking and image processing',
+              get_font('DroidSans', 35), 'White', 240, 360)
+    draw_text('to efficiently and quickly solve',
+              get_font('DroidSans', 35), 'White', 265, 410)
+    draw_text('any puzzle',
+              get_font('DroidSans', 35), 'White', 380, 460)
+    buttons = button.ButtonManager([back_btn])
 
-        if back_btn.get_clicked():
-            menu()
+    while True:
 
         # Exit and close all code
         for event in pygame.event.get():
@@ -138,65 +169,72 @@ def settings():
                 delete_solutions()
                 pygame.quit()
                 sys.exit()
+            overlay.handle_event(event)  # Performance overlay (F3)
+            buttons.handle_event(event)  # Button clicks
+
+        if back_btn.get_clicked():
+            return 'MENU'
 
-        pygame.display.update()
-        clock.tick(60)
+        clock.events_done()
+
+        buttons.draw(screen, dirty)
+        overlay.draw(screen, dirty)
+        dirty.update()
+        clock.tick()
 
 
 def play():
-    """Setup page for playing Sudoku"""
+    """Setup page for playing Sudoku (returns the next screen)"""
 
     screen.fill((154, 182, 217))
     clicked = False
 
     # Buttons
-    back_img = pygame.image.load('Assets/Other/back_img.jpg').convert_alpha()
-    play_img = pygame.image.load('Assets/Setup/play_game_img.jpg').convert_alpha()
-    easy_img = pygame.image.load('Assets/Setup/easy_img.jpg').convert_alpha()
-    medium_img = pygame.image.load('Assets/Setup/medium_img.jpg').convert_alpha()
-    hard_img = pygame.image.load('Assets/Setup/hard_img.jpg').convert_alpha()
-    easy_on_img = pygame.image.load('Assets/Setup/easy_on_img.jpg').convert_alpha()
-    medium_on_img = pygame.image.load('Assets/Setup/medium_on_img.jpg').convert_alpha()
-    hard_on_img = pygame.image.load('Assets/Setup/hard_on_img.jpg').convert_alpha()
+    back_img = assets.get('Assets/Other/back_img.jpg', (110, 60))
+    play_img = assets.get('Assets/Setup/play_game_img.jpg', (300, 100))
+    easy_img = assets.get('Assets/Setup/easy_img.jpg', (180, 100))
+    medium_img = assets.get('Assets/Setup/medium_img.jpg', (280, 100))
+    hard_img = assets.get('Assets/Setup/hard_img.jpg', (180, 100))
+    easy_on_img = assets.get('Assets/Setup/easy_on_img.jpg', (180, 100))
+    medium_on_img = assets.get('Assets/Setup/medium_on_img.jpg', (280, 100))
+    hard_on_img = assets.get('Assets/Setup/hard_on_img.jpg', (180, 100))
     back_btn = button.Button(765, 25, back_img, (110, 60))
     play_btn = button.Button(290, 500, play_img, (300, 100))
     easy_btn = button.Button(350, 100, easy_img, (180, 100))
     medium_btn = button.Button(300, 220, medium_img, (280, 100))
     hard_btn  = button.Button(350, 340, hard_img, (180, 100))
-    easy_on_btn = button.Button(350, 100, easy_on_img, (180, 100))
-    medium_on_btn = button.Button(300, 220, medium_on_img, (280, 100))
-    hard_on_btn = button.Button(350, 340, hard_on_img, (180, 100))
 
-    # Hashmap to store button states and images
+    # Hashmap to store button states and images (off, on)
     button_states = {
         'easy': False,
         'medium': False,
         'hard': False
     }
+    button_images = {
+        'easy': (easy_btn, easy_img, easy_on_img),
+        'medium': (medium_btn, medium_img, medium_on_img),
+        'hard': (hard_btn, hard_img, hard_on_img)
+    }
 
-    while True:
-
-        back_btn.draw(screen)
-        play_btn.draw(screen)
-        easy_btn.draw(screen)
-        medium_btn.draw(screen)
-        hard_btn.draw(screen)
-
-        # Draw difficulty buttons based on their states
-        if button_states['easy']:
-            easy_on_btn.draw(screen)
-        else:
-            easy_btn.draw(screen)
+    # Draw on screen (static, drawn once)
+    dirty = DirtyRects(screen)
+    back_btn.draw(screen)
+    play_btn.draw(screen)
+    easy_btn.draw(screen)
+    medium_btn.draw(screen)
+    hard_btn.draw(screen)
+    buttons = button.ButtonManager([back_btn, play_btn, easy_btn, medium_btn, hard_btn])
 
-        if button_states['medium']:
-            medium_on_btn.draw(screen)
-        else:
-            medium_btn.draw(screen)
+    while True:
 
-        if button_states['hard']:
-            hard_on_btn.draw(screen)
-        else:
-            hard_btn.draw(screen)
+        # Exit and close all code
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                delete_solutions()
+                pygame.quit()
+                sys.exit()
+            overlay.handle_event(event)  # Performance overlay (F3)
+            buttons.handle_event(event)  # Button clicks
 
         # Check for button clicks and update button states
         if easy_btn.get_clicked():
@@ -217,156 +255,193 @@ def play():
         if not clicked:
             difficulty = 20
 
+        # Difficulty buttons show their states (redrawn by the manager when changed)
+        for name, (btn, off_img, on_img) in button_images.items():
+            btn.set_image(on_img if button_states[name] else off_img)
+
         # Change screen
         if back_btn.get_clicked():
-            menu()
+            return 'MENU'
 
         # Call game module
         if play_btn.get_clicked():
-            state = run_game(screen, difficulty)
-            if state == 'MENU':
-                menu()
+            return run_game(screen, difficulty)  # MENU once the game is left
 
-        # Exit and close all code
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                delete_solutions()
-                pygame.quit()
-                sys.exit()
+        clock.events_done()
 
-        pygame.display.update()
-        clock.tick(60)
+        buttons.draw(screen, dirty)
+        overlay.draw(screen, dirty)
+        dirty.update()
+        clock.tick()
 
 
 def solve_image():
-    """Image path entry page: uses img_solver module on user uploaded image of board"""
+    """
+    Image path entry page: uses img_solver module on user uploaded image of board
+    (returns the next screen)
+    """
+
+    global last_result
 
     screen.fill((154, 182, 217))
-    upload_clicked = False  # Track if images uploaded
+    job = None  # Background solve (None when not solving)
 
     # Images
-    path_img = pygame.image.load('Assets/Solve/file_path_img.jpg').convert_alpha()
-    path_img = pygame.transform.scale(path_img, (200, 80))
-    loading_img = pygame.image.load('Assets/Solve/loading_img.jpg').convert_alpha()
-    loading_img = pygame.transform.scale(loading_img, (180, 50))
+    path_img = assets.get('Assets/Solve/file_path_img.jpg', (200, 80))
+    loading_img = assets.get('Assets/Solve/loading_img.jpg', (180, 50))
 
     # Buttons
-    back_img = pygame.image.load('Assets/Other/back_img.jpg').convert_alpha()
-    upload_img = pygame.image.load('Assets/Solve/upload_img.jpg').convert_alpha()
+    back_img = assets.get('Assets/Other/back_img.jpg', (110, 60))
+    upload_img = assets.get('Assets/Solve/upload_img.jpg', (180, 80))
     back_btn = button.Button(765, 25, back_img, (110, 60))
     upload_btn = button.Button(360, 500, upload_img, (180, 80))
 
     # Entrybox
-    base_font = pygame.font.Font(None, 40)
+    base_font = get_font(None, 40)
     user_text = ''
     entry_rect = pygame.Rect(315, 312, 550, 50)
     entry_color = (60, 82, 145)
+    status_rect = pygame.Rect(150, 615, 720, 60)  # Progress text and loading image
+
+    # Draw on screen (static, drawn once)
+    dirty = DirtyRects(screen)
+    back_btn.draw(screen)
+    upload_btn.draw(screen)
+    screen.blit(path_img, (60, 300))
+
+    # Directions text
+    draw_text('Write your file name in text below:', 
+              get_font('DroidSans', 50), 'White', 150, 150)
+
+    drawn_text = None  # Entrybox text currently drawn
+    drawn_status = None  # Progress text currently drawn
+    buttons = button.ButtonManager([back_btn, upload_btn])
 
     while True:
 
         # Exit / check for Entrybox input
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                if job:
+                    job.cancel()
                 delete_solutions()
                 pygame.quit()
                 sys.exit()
+            if overlay.handle_event(event):
+                # Performance overlay (F3)
+                continue
+            buttons.handle_event(event)  # Button clicks
             if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_BACKSPACE:
+                if job:
+                    if event.key == pygame.K_ESCAPE:
+                        # Cancel the running solve
+                        job.cancel()
+                        job = None
+                elif event.key == pygame.K_BACKSPACE:
                     # Remove the last character from user_text
                     user_text = user_text[:-1]
                 elif event.unicode:
                     # Valid input
                     user_text += event.unicode
 
-        screen.fill((154, 182, 217))
-
-        # Create Entrybox
-        text_surface = base_font.render(user_text, True, 'White')
-        screen.blit(text_surface, (325, 325))
+        clock.events_done()
 
-        # Draw on screen
-        back_btn.draw(screen)
-        upload_btn.draw(screen)
-        screen.blit(path_img, (60, 300))
-        pygame.draw.rect(screen, entry_color, entry_rect, 3)
-
-        # Directions text
-        draw_text('Write your file name in text below:', 
-                  pygame.font.SysFont('DroidSans', 50), 'White', 150, 150)
+        # Create Entrybox (redrawn only when the text changes)
+        if user_text != drawn_text:
+            screen.fill((154, 182, 217), entry_rect)
+            text_surface = base_font.render(user_text, True, 'White')
+            screen.blit(text_surface, (325, 325), pygame.Rect(0, 0, entry_rect.right - 325, entry_rect.height))
+            pygame.draw.rect(screen, entry_color, entry_rect, 3)
+            dirty.mark(entry_rect)
+            drawn_text = user_text
 
         if back_btn.get_clicked():
-            menu()
-
-        if upload_btn.get_clicked():
-
-            upload_clicked = True
+            if job:
+                job.cancel()
+            return 'MENU'
 
-            # Load user input file and store img_solver.py files
-            user_text = f'Boards/{user_text}'
-            error = display_image_solution(user_text, 'Board')
-            display_image_solution(user_text, 'Solution')
-            display_image_solution(user_text, 'Process')
-
-            # Errors in img_solver.py or no input
-            if error or user_text == '':
-                cont = False
+        if upload_btn.get_clicked() and not job:
+            if user_text == '':
                 user_text = 'ERROR - path not found'
             else:
-                # Indicate succes & load
+                # Solve user input file in the background (images kept in memory)
+                user_text = f'Boards/{user_text}'
+                job = SolveJob(user_text, ['Board', 'Solution', 'Process'])
+
+        # Show progress of the solve (esc to cancel), redrawn only when the stage changes
+        status = job.label() if job else None
+        if status != drawn_status:
+            screen.fill((154, 182, 217), status_rect)
+            if job:
                 screen.blit(loading_img, (680, 620))
-                cont = True
-
-            if upload_clicked and cont:
-                is_valid = show_solution()
-                if not is_valid:
+                draw_text(status + ' (esc to cancel)', base_font, 'White', 150, 630)
+            dirty.mark(status_rect)
+            drawn_status = status
+
+        if job:
+            if job.done():
+                try:
+                    result = job.result()
+                    error = None
+                except Exception as exc:
+                    # Solve failed in the worker (ex. missing model weights, OpenCV error)
+                    result, error = None, exc
+                job = None
+
+                # Errors in img_solver.py
+                if error is not None:
+                    user_text = f'ERROR - {type(error).__name__}'
+                elif result is None:
+                    pass  # Cancelled
+                elif result.error == 'Error: image not found':
+                    user_text = 'ERROR - path not found'
+                elif result.error:
+                    # Images were not valid
                     user_text = 'ERROR - image not of a board'
+                else:
+                    last_result = result
+                    return 'SOLUTION'
 
-        pygame.display.flip()
-        clock.tick(60)
+        buttons.draw(screen, dirty)
+        overlay.draw(screen, dirty)
+        dirty.update()
+        clock.tick()
 
 
 def show_solution():
-    """Next page after uploading, shows the original image and solution"""
+    """Next page after uploading, shows the original image and solution (returns the next screen)"""
 
+    result = last_result
     screen.fill((154, 182, 217))
 
     # Images
-    solution_title = pygame.image.load('Assets/Solve/solution_title.jpg').convert_alpha()
-
-    try:
-        # Created solution image files
-        board_img = pygame.image.load('Solutions/board_image.jpg').convert_alpha()
-        solution_img = pygame.image.load('Solutions/solution_image.jpg').convert_alpha()
-    except FileNotFoundError:
-        # Images were not valid
-        return False
-
-    arrow_img = pygame.image.load('Assets/Solve/arrow_img.jpg').convert_alpha()
-    arrow_img = pygame.transform.scale(arrow_img, (60, 50))
-    solution_title = pygame.transform.scale(solution_title, (400, 80))
+    solution_title = assets.get('Assets/Solve/solution_title.jpg', (400, 80))
+
+    # Solution images rendered by img_solver.py
+    board_img = to_surface(result.images['Board'])
+    solution_img = to_surface(result.images['Solution'])
+
+    arrow_img = assets.get('Assets/Solve/arrow_img.jpg', (60, 50))
     board_img = pygame.transform.scale(board_img, (350, 350))
     solution_img = pygame.transform.scale(solution_img, (350, 350))
 
     # Buttons
-    menu_img = pygame.image.load('Assets/Other/menu_img.jpg').convert_alpha()
-    show_process_img = pygame.image.load('Assets/Solve/show_process_img.jpg').convert_alpha()
+    menu_img = assets.get('Assets/Other/menu_img.jpg', (110, 60))
+    show_process_img = assets.get('Assets/Solve/show_process_img.jpg', (300, 100))
     menu_btn = button.Button(765, 25, menu_img, (110, 60))
     show_process_btn = button.Button(525, 550, show_process_img, (300, 100))
 
-    while True:
-
-        menu_btn.draw(screen)
-        show_process_btn.draw(screen)
-        screen.blit(solution_title, (250, 35))
-        screen.blit(arrow_img, (425, 300))
-        screen.blit(board_img, (50, 150))
-        screen.blit(solution_img, (500, 150))
-
-        if menu_btn.get_clicked():
-            menu()
+    # Draw on screen (static, drawn once)
+    dirty = DirtyRects(screen)
+    menu_btn.draw(screen)
+    show_process_btn.draw(screen)
+    screen.blit(solution_title, (250, 35))
+    screen.blit(arrow_img, (425, 300))
+    screen.blit(board_img, (50, 150))
+    screen.blit(solution_img, (500, 150))
+    buttons = button.ButtonManager([menu_btn, show_process_btn])
 
-        if show_process_btn.get_clicked():
-            show_process()
+    while True:
 
         # Exit and close all code
         for event in pygame.event.get():
@@ -374,36 +449,47 @@ def show_solution():
                 delete_solutions()
                 pygame.quit()
                 sys.exit()
+            overlay.handle_event(event)  # Performance overlay (F3)
+            buttons.handle_event(event)  # Button clicks
 
-            # Draw and update
-            pygame.display.update()
-            clock.tick(60)
+        if menu_btn.get_clicked():
+            return 'MENU'
+
+        if show_process_btn.get_clicked():
+            return 'PROCESS'
+
+        clock.events_done()
+
+        # Draw and update
+        buttons.draw(screen, dirty)
+        overlay.draw(screen, dirty)
+        dirty.update()
+        clock.tick()
 
 
 def show_process():
-    """Page showing OpenCV image processing, navigated to optionally on solution page"""
+    """Page showing OpenCV image processing, navigated to optionally on solution page (returns the next screen)"""
+
+    result = last_result
 
     # Images
-    process_image = pygame.image.load('Solutions/process_image.jpg').convert_alpha()
-    process_title = pygame.image.load('Assets/Solve/process_title.jpg')
+    process_image = to_surface(result.images['Process'])
+    process_title = assets.get('Assets/Solve/process_title.jpg', (400, 80))
     process_image = pygame.transform.scale(process_image, (600, 300))
-    process_title = pygame.transform.scale(process_title, (400, 80))
 
     # Buttons
-    menu_img = pygame.image.load('Assets/Other/menu_img.jpg').convert_alpha()
+    menu_img = assets.get('Assets/Other/menu_img.jpg', (110, 60))
     menu_btn = button.Button(765, 600, menu_img, (110, 60))
 
-    while True:
-
-        screen.fill((154, 182, 217))
-
-        # Images
-        menu_btn.draw(screen)
-        screen.blit(process_title, (250, 50))
-        screen.blit(process_image, (150, 200))
+    # Images (static, drawn once)
+    dirty = DirtyRects(screen)
+    screen.fill((154, 182, 217))
+    menu_btn.draw(screen)
+    screen.blit(process_title, (250, 50))
+    screen.blit(process_image, (150, 200))
+    buttons = button.ButtonManager([menu_btn])
 
-        if menu_btn.get_clicked():
-            menu()
+    while True:
 
         # Exit and close all code
         for event in pygame.event.get():
@@ -411,11 +497,42 @@ def show_process():
                 delete_solutions()
                 pygame.quit()
                 sys.exit()
+            overlay.handle_event(event)  # Performance overlay (F3)
+            buttons.handle_event(event)  # Button clicks
+
+        if menu_btn.get_clicked():
+            return 'MENU'
+
+        clock.events_done()
+
+        # Draw and update
+        buttons.draw(screen, dirty)
+        overlay.draw(screen, dirty)
+        dirty.update()
+        clock.tick()
+
+
+# Screen function for each state (each runs until it returns the next state)
+SCREENS = {
+    'MENU': menu,
+    'SETTINGS': settings,
+    'PLAY': play,
+    'SOLVE': solve_image,
+    'SOLUTION': show_solution,
+    'PROCESS': show_process
+}
+
+
+def run(state='MENU'):
+    """
+    Drive the screens from one loop, so leaving a screen frees it instead of nesting the next one
+    :param state: (optional) first screen
+    """
 
-            # Draw and update
-            pygame.display.update()
-            clock.tick(60)
+    while state:
+        state = SCREENS[state]()
 
 
 # Start program from menu
-menu()
\ No newline at end of file
+if __name__ == '__main__':
+    run()
\ No newline at end of file
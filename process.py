@@ -10,10 +10,16 @@ import numpy as np
 from keras.models import load_model
 
 
+# Loaded CNN model (shared between solves)
+_model = None
+
+
 def initialize_prediction_model():
-    """Read model weights from CNN"""
-    model = load_model('Resources/num_model.h5')
-    return model
+    """Read model weights from CNN (loaded once, then reused)"""
+    global _model
+    if _model is None:
+        _model = load_model('Resources/num_model.h5')
+    return _model
 
 
 def pre_process(img):
@@ -30,6 +36,27 @@ def pre_process(img):
     return img_threshold
 
 
+def resize_proxy(img, size):
+    """
+    Downscale an image (keeping its aspect ratio) for fast board detection
+    :param img: full resolution image
+    :param size: length of the longest side of the proxy
+    :returns: proxy image, (x, y) scale from proxy to full resolution
+    """
+
+    height, width = img.shape[:2]
+    ratio = size / max(height, width)
+    proxy_size = (max(1, round(width * ratio)), max(1, round(height * ratio)))
+
+    # Reduce by a whole factor first (fast area averaging), then to the exact size
+    factor = max(height, width) // size
+    if factor > 1:
+        img = cv2.resize(img, (width // factor, height // factor), interpolation=cv2.INTER_AREA)
+    proxy = cv2.resize(img, proxy_size, interpolation=cv2.INTER_AREA)
+
+    return proxy, (width / proxy_size[0], height / proxy_size[1])
+
+
 def reorder(points):
     """
     Reorder points for the warp perspective
@@ -79,6 +106,64 @@ def largest_contour(contours):
     return largest_c, max_area
 
 
+def board_quads(contours, image_area, min_area=0.01, max_aspect=1.4):
+    """
+    Find every quadrilateral contour that could be a board
+    :param contours: list of contours (ex. from cv2.RETR_LIST)
+    :param image_area: area of the image the contours were found in (pixels)
+    :param min_area: smallest area as a fraction of the image
+    :param max_aspect: largest ratio between the longer and shorter side
+    :returns: list of (area, reordered corners), largest first
+    """
+
+    quads = []
+    for c in contours:
+        area = cv2.contourArea(c)
+        if area < min_area * image_area:
+            continue
+        perimeter = cv2.arcLength(c, True)
+        corners_approx = cv2.approxPolyDP(c, 0.02 * perimeter, True)
+        if len(corners_approx) != 4 or not cv2.isContourConvex(corners_approx):
+            continue
+
+        # Mean width and height of the quadrilateral
+        top_left, top_right, bottom_left, bottom_right = reorder(corners_approx).reshape(4, 2).astype(np.float32)
+        width = (np.linalg.norm(top_right - top_left) + np.linalg.norm(bottom_right - bottom_left)) / 2
+        height = (np.linalg.norm(bottom_left - top_left) + np.linalg.norm(bottom_right - top_right)) / 2
+        if min(width, height) == 0 or max(width, height) / min(width, height) > max_aspect:
+            continue
+        quads.append((area, reorder(corners_approx)))
+
+    quads.sort(key=lambda quad: -quad[0])
+    return quads
+
+
+def has_grid_lines(threshold, corners, size=180, min_lines=6):
+    """
+    Check for the 8 inner lines of a 9x9 grid inside a quadrilateral
+    :param threshold: thresholded image (lines white)
+    :param corners: reordered corners of the quadrilateral
+    :param size: side of the square the quadrilateral is warped to for the check
+    :param min_lines: fewest inner lines found in each direction
+    :returns: bool whether the quadrilateral holds a grid
+    """
+
+    square = np.float32([[0, 0], [size, 0], [0, size], [size, size]])
+    matrix = cv2.getPerspectiveTransform(np.float32(corners), square)
+    warp = cv2.warpPerspective(threshold, matrix, (size, size))
+
+    step = size / 9
+    window = max(1, int(step / 6))
+    for profile in (warp.mean(axis=0), warp.mean(axis=1)):
+        # A line is a peak near a ninth of the side, well above the space between lines
+        background = np.median(profile)
+        lines = sum(profile[max(0, int(k * step) - window):int(k * step) + window + 1].max() > 2 * background + 20
+                    for k in range(1, 9))
+        if lines < min_lines:
+            return False
+    return True
+
+
 def split_spaces(img):
     """
     Split the image into array of images of the spaces (81 spaces)
@@ -97,35 +182,97 @@ def split_spaces(img):
     return spaces
 
 
-def predict(spaces, model):
+def prepare_cells(spaces):
     """
-    Get prediction for the number in all 81 spaces on the board
-    :param spaces:
-    :param model:
-    :returns: 
+    Prepare the spaces' images for the CNN (crop the borders, resize, scale to 0-1)
+    :param spaces: list of images of the spaces
+    :returns: float32 array of shape (len(spaces), 28, 28, 1)
     """
 
-    result = []
-    for num_img in spaces:
-        # Prepare image
+    cells = np.empty((len(spaces), 28, 28, 1), np.float32)
+    for i, num_img in enumerate(spaces):
         img = np.asarray(num_img)
         img = img[4:img.shape[0] - 4, 4:img.shape[1] - 4]
-        img = cv2.resize(img, (28, 28))
-        img = img / 255
-        img = img.reshape(1, 28, 28, 1)
+        cells[i, :, :, 0] = cv2.resize(img, (28, 28))
+    cells /= 255
+    return cells
+
+
+# Ink (0-1 below a space's background) and ink pixels a space needs to hold a digit
+INK_LEVEL = 0.15
+MIN_INK = 12
+
+
+def cell_ink(cell):
+    """
+    Ink of a prepared space, ignoring what's left of the grid lines at the edges
+    :param cell: (28, 28) array, values 0-1 (dark digits on a light background)
+    :returns: (28, 28) float array, digit pixels high
+    """
+
+    ink = np.clip(np.median(cell) - cell, 0, None)
+    ink[:2], ink[-2:], ink[:, :2], ink[:, -2:] = 0, 0, 0, 0
+    return ink
+
+
+def filled_layout(cells):
+    """
+    Which spaces hold a digit, from their ink only (no classifier)
+    :param cells: array of shape (n, 28, 28, 1) from prepare_cells
+    :returns: list of n bools
+    """
+
+    layout = []
+    for cell in np.asarray(cells).reshape(len(cells), 28, 28):
+        ink = cell_ink(cell)
+        top = ink.max()
+        layout.append(bool(top > INK_LEVEL and np.count_nonzero(ink > 0.5 * top) >= MIN_INK))
+    return layout
+
+
+def read_digits(predictions):
+    """
+    Turn the CNN's class probabilities into digits
+    :param predictions: array of shape (n, 10)
+    :returns: list of n ints (0 for blank spaces)
+    """
+
+    class_index = np.argmax(predictions, axis=-1)
+    prob_val = np.amax(predictions, axis=-1)
+
+    # <80% means blank space, else num
+    return [int(num) if prob > 0.8 else 0 for num, prob in zip(class_index, prob_val)]
+
 
-        # Get prediction
-        predictions = model.predict(img)
-        class_index = np.argmax(predictions, axis=-1)
-        prob_val = np.amax(predictions)
-        print(class_index, prob_val)
+def read_confidences(predictions):
+    """
+    Probability of the most likely class of each space
+    :param predictions: array of shape (n, 10)
+    :returns: list of n floats
+    """
+    return np.amax(predictions, axis=-1).tolist()
+
+
+def predict_probabilities(spaces, model):
+    """
+    Class probabilities for all 81 spaces on the board
+    :param spaces: list of images of the spaces
+    :param model: CNN model
+    :returns: array of shape (len(spaces), 10)
+    """
 
-        # Save to result (<80% means blank space, else num)
-        if prob_val > 0.8:
-            result.append(class_index[0])
-        else:
-            result.append(0)
-    return result
+    # One model call for every space
+    return model.predict(prepare_cells(spaces), verbose=0)
+
+
+def predict(spaces, model):
+    """
+    Get prediction for the number in all 81 spaces on the board
+    :param spaces: list of images of the spaces
+    :param model: CNN model
+    :returns: list of ints (0 for blank spaces)
+    """
+    return read_digits(predict_probabilities(spaces, model))
 
 
 def display_nums(img, list_nums, color=(0, 250, 0)):
@@ -177,6 +324,83 @@ def draw_grid(img):
     return img
 
 
+# Pre-rendered digits by (cell size, color), and grid templates by image shape
+_stamps = {}
+_grids = {}
+
+
+def digit_stamps(cell_size, color):
+    """
+    Digits drawn once per cell size and color (as display_nums draws them)
+    :param cell_size: (height, width) of a cell
+    :param color: RGB tuple
+    :returns: uint8 array of shape (10, height, width, 3), index 0 blank
+    """
+
+    key = (tuple(cell_size), tuple(color))
+    stamps = _stamps.get(key)
+    if stamps is None:
+        sec_height, sec_width = cell_size
+        stamps = np.zeros((10, sec_height, sec_width, 3), np.uint8)
+        for num in range(1, 10):
+            cv2.putText(stamps[num], str(num), (int(sec_width / 2) - 10, int(0.8 * sec_height)),
+                        cv2.FONT_HERSHEY_COMPLEX_SMALL, 2, color, 2, cv2.LINE_AA)
+        _stamps[key] = stamps
+    return stamps
+
+
+def stamp_nums(img, list_nums, color=(0, 250, 0)):
+    """
+    Composite pre-rendered digits into every cell in one pass (vectorized display_nums,
+    keeping the lighter of the digit and the image, identical on a blank image)
+    :param img: image to overlay the numbers on
+    :param list_nums: list of nums for all spaces (0 for none)
+    :param color: RGB tuple
+    :returns: image with the numbers stamped on top
+    """
+
+    sec_height, sec_width = img.shape[0] // 9, img.shape[1] // 9
+    stamps = digit_stamps((sec_height, sec_width), color).reshape(10, sec_height, sec_width * 3)
+
+    # Stamp of each cell, gathered into a new (9, 9, h, w * 3) array by the fancy indexing (one copy),
+    # then transposed to (9 rows, h, 9 cols, w * 3) image order as a view of it
+    cells = stamps[np.asarray(list_nums, np.intp).reshape(9, 9)].transpose(0, 2, 1, 3)
+
+    region = img[:9 * sec_height, :9 * sec_width]
+    if region.flags.c_contiguous:
+        view = region.reshape(9, sec_height, 9, sec_width * 3)
+        np.maximum(view, cells, out=view)
+    else:
+        region[...] = np.maximum(region, cells.reshape(region.shape))
+    return img
+
+
+def grid_template(shape):
+    """
+    Grid lines as draw_grid draws them on a black image, drawn once per image size
+    :param shape: shape of the image (height, width, 3)
+    :returns: uint8 image (white lines on black)
+    """
+
+    key = tuple(shape)
+    template = _grids.get(key)
+    if template is None:
+        template = draw_grid(np.zeros(key, np.uint8))
+        _grids[key] = template
+    return template
+
+
+def overlay_grid(img):
+    """
+    Draw the grid from its cached template (same lines as draw_grid)
+    :param img: image to overlay on (updated in place)
+    :returns: image with overlay
+    """
+
+    # Lines are white, so the lighter pixel is the line
+    return cv2.max(img, grid_template(img.shape), dst=img)
+
+
 def stack_images(img_arr, scale):
     """
     Stacks all of the images in one window
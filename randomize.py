@@ -7,6 +7,7 @@ Description:
 
 from dokusan import generators
 from algorithm import solve, show
+from formats import parse_lines, to_board
 
 
 # Difficulties
@@ -22,14 +23,9 @@ def random_sudoku_board(difficulty=150):
     :returns: (2d list) generated board
     """
 
-    # Generate board and turn string into array
-    random_board = (list(str(generators.random_sudoku(avg_rank=difficulty))))
-
-    # Convert to 2d list of ints (9x9)
-    random_board = [int(x) for x in random_board]
-    random_board = [random_board[i:i+9] for i in range(0, len(random_board), 9)]
-
-    return random_board
+    # Generate board and convert its string to a 2d list of ints (9x9)
+    random_board = str(generators.random_sudoku(avg_rank=difficulty))
+    return to_board(parse_lines(random_board.encode())[0])
 
 
 # Test Code
@@ -0,0 +1,92 @@
+"""
+File: render.py
+Description:
+    Dirty rectangle tracking for the pygame screens. Screens mark the
+    regions they draw to and only those regions are pushed to the
+    display, instead of updating the full window every frame. Also holds
+    the frame clock shared by the screen loops.
+"""
+
+import time
+
+import pygame
+
+
+# Frame rate cap of the screen loops (0 = uncapped, ex. headless benchmarks)
+FPS = 60
+
+
+class DirtyRects():
+    def __init__(self, screen):
+        """
+        Tracks the regions of the screen changed since the last update
+        :param screen: display surface being drawn to
+        """
+
+        self.screen = screen
+        self.rects = []
+        self.full = True  # First update pushes the whole window
+
+    def mark(self, rect):
+        """
+        Mark a region of the screen as changed
+        :param rect: pygame.Rect or (x, y, width, height)
+        """
+
+        self.rects.append(pygame.Rect(rect))
+
+    def mark_all(self):
+        """Mark the whole window as changed (ex. new screen drawn)"""
+        self.full = True
+
+    def blit(self, surface, pos):
+        """
+        Blit onto the screen and mark the covered region
+        :param surface: surface to draw
+        :param pos: (x, y) position on the screen
+        """
+
+        self.rects.append(self.screen.blit(surface, pos))
+
+    def update(self):
+        """Push the changed regions to the display"""
+
+        if self.full:
+            pygame.display.update()
+        elif self.rects:
+            pygame.display.update(self.rects)
+
+        self.full = False
+        self.rects.clear()
+
+
+class FrameClock():
+    # Functions called at the end of every frame with the clock (work and events times in seconds)
+    listeners = []
+
+    def __init__(self):
+        """Caps the frame rate of a screen loop and reports each frame's work time"""
+
+        self.clock = pygame.time.Clock()
+        self.frame_start = time.perf_counter()
+        self.events_end = None
+        self.work = 0  # Last frame's time, excluding the wait
+        self.events = 0  # Part of the last frame spent handling events
+
+    def events_done(self):
+        """Mark the end of the frame's event handling (the rest counts as rendering)"""
+        self.events_end = time.perf_counter()
+
+    def tick(self):
+        """End the frame: report its work time (excluding the wait) then cap the frame rate"""
+
+        now = time.perf_counter()
+        self.work = now - self.frame_start
+        self.events = 0
+        if self.events_end is not None and self.events_end > self.frame_start:
+            self.events = self.events_end - self.frame_start
+        for listener in FrameClock.listeners:
+            listener(self)
+
+        self.clock.tick(FPS)
+        self.frame_start = time.perf_counter()
@@ -0,0 +1,370 @@
+"""
+File: server.py
+Description:
+    Local HTTP solve service built on asyncio (standard library only).
+    POST /solve takes a board (JSON 9x9 list or 81 char string) and
+    POST /solve-image an uploaded JPEG. Image spaces are prepared in a
+    process pool and concurrent requests are micro-batched into one CNN
+    call. GET /stats reports latency and throughput counters.
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from email import policy
+from email.parser import BytesParser
+
+import numpy as np
+
+from algorithm import solve_flat
+from process import initialize_prediction_model
+from img_solver import prepare_image_cells, read_board_predictions
+
+
+# Largest request body accepted (bytes)
+MAX_BODY = 16 * 1024 * 1024
+
+HTTP_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error'}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        """Error returned to the client as a JSON response"""
+        super().__init__(message)
+        self.status = status
+
+
+def parse_board(value):
+    """
+    Read a board from a request
+    :param value: 9x9 list of ints or 81 char string ('0' or '.' for blanks)
+    :returns: list of 81 ints
+    """
+
+    if isinstance(value, str):
+        text = value.strip()
+        if len(text) != 81 or any(char not in '.0123456789' for char in text):
+            raise RequestError(400, 'board string must be 81 characters of 0-9 or .')
+        return [0 if char == '.' else int(char) for char in text]
+
+    if (isinstance(value, list) and len(value) == 9
+            and all(isinstance(row, list) and len(row) == 9 for row in value)):
+        values = [num for row in value for num in row]
+        if all(type(num) is int and 0 <= num <= 9 for num in values):  # bool is an int subclass
+            return values
+    raise RequestError(400, 'board must be a 9x9 list of ints (0-9)')
+
+
+def solve_values(values):
+    """
+    Solve a board (run in the process pool)
+    :param values: list of 81 ints (0 = empty)
+    :returns: list of 81 ints, or None if unsolvable
+    """
+
+    board = list(values)
+    if not solve_flat(board):
+        return None
+    return board
+
+
+def solve_predictions(predictions):
+    """
+    Read and solve a board from its spaces' class probabilities (run in the process pool),
+    correcting misread digits when it has no unique solution
+    :param predictions: array of shape (81, 10)
+    :returns: (list of 81 digits, list of 81 ints solution or None, list of corrected cells)
+    """
+
+    digits, solved, corrected = read_board_predictions(predictions)
+    if not all(num or fill for num, fill in zip(digits, solved)):
+        return digits, None, corrected
+    return digits, [num or fill for num, fill in zip(digits, solved)], corrected
+
+
+def image_bytes(body, content_type):
+    """
+    Get the uploaded image from a request body
+    :param body: request body (raw image or multipart form)
+    :param content_type: request Content-Type header
+    :returns: bytes of the image
+    """
+
+    if not content_type.startswith('multipart/form-data'):
+        return body
+
+    # First file of the form (ex. curl -F image=@puzzle.jpg)
+    head = b'Content-Type: ' + content_type.encode() + b'\r\n\r\n'
+    message = BytesParser(policy=policy.HTTP).parsebytes(head + body)
+    for part in message.iter_parts():
+        if part.get_filename() or part.get_content_maintype() == 'image':
+            return part.get_payload(decode=True)
+    raise RequestError(400, 'no image in form')
+
+
+class MicroBatcher():
+    def __init__(self, model, max_batch=8, max_wait=0.01):
+        """
+        Groups boards from concurrent requests into one classifier call
+        :param model: CNN model for digit prediction
+        :param max_batch: most boards (81 spaces each) per call
+        :param max_wait: longest time (seconds) a board waits for others to join its batch
+        """
+
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='classifier')
+        self.batches = 0
+        self.boards = 0
+        self.largest = 0
+
+    async def classify(self, cells):
+        """
+        Classify a board's spaces
+        :param cells: prepared spaces, array of shape (81, 28, 28, 1)
+        :returns: array of class probabilities, shape (81, 10)
+        """
+
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((cells, future))
+        return await future
+
+    async def run(self):
+        """Collect and classify batches (runs for the server's lifetime)"""
+
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batches += 1
+            self.boards += len(batch)
+            self.largest = max(self.largest, len(batch))
+            try:
+                cells = np.concatenate([item[0] for item in batch])
+                predictions = await loop.run_in_executor(
+                    self.executor, lambda: self.model.predict(cells, verbose=0))
+                for i, (_, future) in enumerate(batch):
+                    if not future.done():
+                        future.set_result(predictions[i*81:(i + 1)*81])
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+
+class Stats():
+    def __init__(self, window=1000):
+        """
+        Latency and throughput counters per endpoint
+        :param window: number of recent requests kept for latency percentiles
+        """
+
+        self.started = time.time()
+        self.requests = {}
+        self.errors = {}
+        self.latencies = {}
+        self.window = window
+
+    def record(self, path, seconds, ok):
+        """Count a finished request"""
+
+        self.requests[path] = self.requests.get(path, 0) + 1
+        if not ok:
+            self.errors[path] = self.errors.get(path, 0) + 1
+        self.latencies.setdefault(path, deque(maxlen=self.window)).append(seconds * 1000)
+
+    def report(self, batcher):
+        """Counters as a JSON-ready dict"""
+
+        uptime = time.time() - self.started
+        endpoints = {}
+        for path, count in self.requests.items():
+            latencies = sorted(self.latencies[path])
+            endpoints[path] = {
+                'requests': count,
+                'errors': self.errors.get(path, 0),
+                'per_second': round(count / uptime, 3),
+                'p50_ms': round(latencies[len(latencies) // 2], 2),
+                'p95_ms': round(latencies[int(len(latencies) * 0.95)], 2),
+                'max_ms': round(latencies[-1], 2)
+            }
+        return {'uptime_s': round(uptime, 1), 'endpoints': endpoints,
+                'batches': batcher.batches, 'batched_boards': batcher.boards,
+                'avg_batch': round(batcher.boards / batcher.batches, 2) if batcher.batches else 0,
+                'largest_batch': batcher.largest}
+
+
+class SolveServer():
+    def __init__(self, workers=None, max_batch=8, max_wait=0.01):
+        """
+        HTTP solve service
+        :param workers: (optional) processes for CPU-bound stages (default: CPU count)
+        :param max_batch: most boards per classifier call
+        :param max_wait: longest wait (seconds) for a batch to fill
+        """
+
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.batcher = MicroBatcher(initialize_prediction_model(), max_batch, max_wait)
+        self.stats = Stats()
+        self.routes = {
+            ('POST', '/solve'): self.solve,
+            ('POST', '/solve-image'): self.solve_image,
+            ('GET', '/stats'): self.get_stats
+        }
+
+    async def solve(self, body, headers):
+        """Solve a board given as JSON ({"board": ...}) or a plain 81 char string"""
+
+        text = body.decode('utf-8', 'replace').strip()
+        if text.startswith('{'):
+            try:
+                request = json.loads(text)
+            except ValueError:
+                raise RequestError(400, 'invalid JSON')
+            board = request.get('board') if isinstance(request, dict) else None
+        else:
+            board = text
+        values = parse_board(board)
+
+        loop = asyncio.get_running_loop()
+        solution = await loop.run_in_executor(self.pool, solve_values, values)
+        if solution is None:
+            raise RequestError(422, 'board has no solution')
+
+        # Same format as the request
+        if isinstance(board, str):
+            return {'solution': ''.join(map(str, solution))}
+        return {'solution': [solution[row*9:row*9 + 9] for row in range(9)]}
+
+    async def solve_image(self, body, headers):
+        """Read and solve the board in an uploaded image"""
+
+        data = image_bytes(body, headers.get('content-type', ''))
+        loop = asyncio.get_running_loop()
+        cells, error = await loop.run_in_executor(self.pool, prepare_image_cells, data)
+        if error:
+            raise RequestError(422, error)
+
+        predictions = await self.batcher.classify(cells)
+        digits, solution, corrected = await loop.run_in_executor(self.pool, solve_predictions, predictions)
+        return {'digits': ''.join(map(str, digits)),
+                'solution': ''.join(map(str, solution)) if solution else None,
+                'corrected': corrected}
+
+    async def get_stats(self, body, headers):
+        """Latency and throughput counters"""
+        return self.stats.report(self.batcher)
+
+    async def handle(self, reader, writer):
+        """Serve one HTTP request per connection"""
+
+        start = time.perf_counter()
+        path, status = None, 500
+        try:
+            try:
+                method, path, headers, body = await read_request(reader)
+                route = self.routes.get((method, path))
+                if route is None:
+                    known = any(route_path == path for _, route_path in self.routes)
+                    raise RequestError(405 if known else 404, f'no route for {method} {path}')
+                response, status = await route(body, headers), 200
+            except RequestError as error:
+                response, status = {'error': str(error)}, error.status
+            except Exception as error:
+                response = {'error': f'{type(error).__name__}: {error}'}
+
+            await write_response(writer, status, response)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass  # Client went away
+        finally:
+            writer.close()
+            if path in ('/solve', '/solve-image'):
+                self.stats.record(path, time.perf_counter() - start, status == 200)
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        """Run the server until cancelled"""
+
+        batcher_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f'Solvoku service on http://{host}:{port}')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher_task.cancel()
+            self.pool.shutdown(cancel_futures=True)
+
+
+async def read_request(reader):
+    """
+    Read an HTTP/1.1 request
+    :param reader: asyncio StreamReader
+    :returns: method, path, headers (lowercase names), body
+    """
+
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, _ = lines[0].split(' ', 2)
+    except ValueError:
+        raise RequestError(400, 'malformed request line')
+
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', 0) or 0)
+    except ValueError:
+        raise RequestError(400, 'invalid Content-Length')
+    if length < 0:
+        raise RequestError(400, 'invalid Content-Length')
+    if length > MAX_BODY:
+        raise RequestError(413, 'request body too large')
+    body = await reader.readexactly(length) if length else b''
+    return method.upper(), target.split('?', 1)[0], headers, body
+
+
+async def write_response(writer, status, response):
+    """Send a JSON response and close the connection"""
+
+    body = json.dumps(response).encode()
+    head = (f'HTTP/1.1 {status} {HTTP_STATUS.get(status, "Error")}\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+            f'Connection: close\r\n\r\n')
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+
+# Run service
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local Solvoku HTTP solve service')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=None, help='processes for CPU-bound stages')
+    parser.add_argument('--max-batch', type=int, default=8, help='most boards per classifier call')
+    parser.add_argument('--max-wait-ms', type=float, default=10, help='longest wait for a batch to fill')
+    args = parser.parse_args()
+
+    service = SolveServer(args.workers, args.max_batch, args.max_wait_ms / 1000)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
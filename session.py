@@ -0,0 +1,232 @@
+"""
+File: session.py
+Description:
+    Compact binary recording of game sessions and their replay. Each
+    session is a fixed size header (puzzle id, difficulty, givens) followed
+    by fixed size 8 byte events (time, kind, cell, value), buffered in
+    memory and appended to disk in batches. Replays rebuild the board
+    through BoardState at full speed, without rendering.
+"""
+
+import hashlib
+import os
+import struct
+import time
+
+from board_state import BoardState
+
+
+# Folder sessions are saved to
+SESSION_FOLDER = 'Sessions'
+
+# Most session files kept (the oldest are deleted when a session closes)
+MAX_SESSIONS = 200
+
+# File layout: header then events
+MAGIC = b'SLVK'
+VERSION = 1
+HEADER = struct.Struct('<4sBH8sd81s')  # magic, version, difficulty, puzzle id, start time, givens
+EVENT = struct.Struct('<IBBH')  # ms since start, kind, cell index, value
+
+# Events per disk write
+BATCH_EVENTS = 512
+
+# Event kinds (value meaning)
+SELECT = 1  # Cell selected
+DIGIT = 2  # Digit entered (digit)
+BACKSPACE = 3  # Cell cleared
+ENTER = 4  # Entry confirmed (1 if finalized, 0 if wrong / empty)
+CANCEL = 5  # Entry dropped by clicking elsewhere
+HINT = 6  # Hint shown (digit)
+END = 7  # Session over (mistakes), cell = 1 if completed
+
+KIND_NAMES = {SELECT: 'select', DIGIT: 'digit', BACKSPACE: 'backspace', ENTER: 'enter',
+              CANCEL: 'cancel', HINT: 'hint', END: 'end'}
+
+
+def puzzle_id(board):
+    """
+    Short id of a puzzle from its givens
+    :param board: 2d list of ints (0 = empty)
+    :returns: 8 bytes
+    """
+
+    givens = bytes(board[i // 9][i % 9] for i in range(81))
+    return hashlib.blake2b(givens, digest_size=8).digest()
+
+
+class SessionRecorder():
+    def __init__(self, board, difficulty, folder=None):
+        """
+        Records a game session's events (written to disk in batches)
+        :param board: 2d list of ints, the puzzle's givens
+        :param difficulty: difficulty the board was generated with
+        :param folder: (optional) folder to save to, SESSION_FOLDER by default
+        """
+
+        self.start = time.time()
+        self.start_counter = time.perf_counter()
+        self.id = puzzle_id(board)
+        self.folder = folder or SESSION_FOLDER
+        self.path = os.path.join(self.folder, f'{int(self.start)}_{self.id.hex()}.slv')
+        self.buffer = bytearray(HEADER.pack(MAGIC, VERSION, min(difficulty, 0xFFFF), self.id, self.start,
+                                            bytes(board[i // 9][i % 9] for i in range(81))))
+        self.pending = 0  # Events in the buffer
+        self.closed = False
+
+    def record(self, kind, cell=0, value=0):
+        """
+        Add an event (kept in memory until a batch is full)
+        :param kind: event kind (ex. DIGIT)
+        :param cell: cell index (row * 9 + col)
+        :param value: event value (ex. the digit)
+        """
+
+        if self.closed:
+            return
+        ms = int((time.perf_counter() - self.start_counter) * 1000)
+        self.buffer += EVENT.pack(ms, kind, cell, value)
+        self.pending += 1
+        if self.pending >= BATCH_EVENTS:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered bytes to the session file"""
+
+        if not self.buffer:
+            return
+        os.makedirs(self.folder, exist_ok=True)
+        with open(self.path, 'ab') as file:
+            file.write(self.buffer)
+        self.buffer.clear()
+        self.pending = 0
+
+    def close(self, mistakes, completed):
+        """
+        Record the final stats and write the rest of the session
+        :param mistakes: number of incorrect entries
+        :param completed: bool whether the board was solved
+        """
+
+        if self.closed:
+            return
+        self.record(END, int(completed), min(mistakes, 0xFFFF))
+        self.closed = True
+        self.flush()
+        prune_sessions(self.folder)
+
+
+def prune_sessions(folder=SESSION_FOLDER, keep=MAX_SESSIONS):
+    """
+    Delete the oldest session files past a limit
+    :param folder: (optional) folder of the session files
+    :param keep: (optional) most files kept
+    :returns: number of files deleted
+    """
+
+    try:
+        paths = [os.path.join(folder, name) for name in os.listdir(folder) if name.endswith('.slv')]
+    except OSError:
+        return 0
+    paths.sort(key=os.path.getmtime, reverse=True)
+
+    deleted = 0
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+            deleted += 1
+        except OSError:
+            pass
+    return deleted
+
+
+class Session():
+    def __init__(self, data):
+        """
+        A recorded session read from bytes
+        :param data: bytes of a session file
+        """
+
+        magic, version, self.difficulty, self.id, self.start, givens = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('Not a session recording')
+        self.board = [list(givens[row*9:row*9 + 9]) for row in range(9)]
+
+        # Drop a partial trailing event (ex. interrupted write)
+        body = memoryview(data)[HEADER.size:]
+        body = body[:len(body) - len(body) % EVENT.size]
+        self.events = list(EVENT.iter_unpack(body))  # (ms, kind, cell, value)
+
+
+def read_session(path):
+    """
+    Read a session file
+    :param path: path of the .slv file
+    :returns: Session
+    """
+
+    with open(path, 'rb') as file:
+        return Session(file.read())
+
+
+class ReplayState():
+    def __init__(self, board):
+        """Board and stats rebuilt from a session's events"""
+
+        self.shown = BoardState(board)  # Digits shown, as in the game
+        self.finalized = list(self.shown.givens)
+        self.selected = None
+        self.mistakes = 0
+        self.hints = 0
+        self.completed = False
+        self.elapsed_ms = 0
+        self.ended = False
+
+    def apply(self, event):
+        """
+        Apply one event
+        :param event: (ms, kind, cell, value)
+        """
+
+        ms, kind, cell, value = event
+        self.elapsed_ms = ms
+
+        if kind == SELECT:
+            self.selected = cell
+        elif kind == DIGIT:
+            self.shown.set_value(cell, value)
+        elif kind in (BACKSPACE, CANCEL):
+            self.shown.set_value(cell, 0)
+            if kind == CANCEL:
+                self.selected = None
+        elif kind == ENTER:
+            self.selected = None
+            if value:
+                self.finalized[cell] = True
+            else:
+                self.shown.set_value(cell, 0)
+                self.mistakes += 1
+        elif kind == HINT:
+            self.hints += 1
+        elif kind == END:
+            self.completed = bool(cell)
+            self.ended = True
+
+
+def replay(session, until_ms=None):
+    """
+    Rebuild a session's board and stats without rendering
+    :param session: Session (or path of a session file)
+    :param until_ms: (optional) stop at this time, to see the board mid-session
+    :returns: ReplayState
+    """
+
+    if not isinstance(session, Session):
+        session = read_session(session)
+
+    state = ReplayState(session.board)
+    for event in session.events:
+        if until_ms is not None and event[0] > until_ms:
+            break
+        state.apply(event)
+    return state
@@ -0,0 +1,201 @@
+"""
+File: solvoku.py
+Description:
+    Command line interface for Solvoku. 'solvoku.py solve' streams puzzles
+    (81 chars per line, 0 or . for blanks) from files or stdin, solves them
+    with a chosen engine across worker processes and writes solutions to
+    stdout in input order, with a throughput summary on stderr.
+"""
+
+import argparse
+import heapq
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from algorithm import solve, solve_flat, is_valid_board
+from formats import decode, to_board
+from hints import next_hint
+
+
+def solve_logic(board):
+    """
+    Solve with the hint engine's techniques, backtracking only for what they can't place
+    :param board: 2d list of ints (updated with the solution)
+    :returns: bool solved
+    """
+
+    while True:
+        hint = next_hint(board)
+        if hint is None:
+            return solve(board)
+        board[hint.index // 9][hint.index % 9] = hint.digit
+
+
+def solve_buffer(board):
+    """
+    Solve with the flat buffer solver (fewest candidates first, bitmasks)
+    :param board: 2d list of ints (updated with the solution)
+    :returns: bool solved
+    """
+
+    values = [num for row in board for num in row]
+    if not solve_flat(values):
+        return False
+    for row in range(9):
+        board[row][:] = values[row*9:row*9 + 9]
+    return True
+
+
+# Solving functions by engine name
+ENGINES = {
+    'backtrack': solve,
+    'logic': solve_logic,
+    'flat': solve_buffer
+}
+
+
+def parse_line(line):
+    """
+    Read a puzzle line
+    :param line: 81 chars of 0-9 or . (surrounding whitespace ignored)
+    :returns: 2d list of ints, or None if malformed
+    """
+
+    text = line.strip()
+    if len(text) != 81:
+        return None
+    try:
+        return to_board(decode(np.frombuffer(text.encode('latin-1'), np.uint8)))
+    except (UnicodeEncodeError, ValueError):
+        return None
+
+
+def solve_line(line, engine='backtrack'):
+    """
+    Solve one input line (run in the worker processes)
+    :param line: puzzle line
+    :param engine: name of the solving engine
+    :returns: (solution string or None, error or None, ms)
+    """
+
+    start = time.perf_counter()
+    board = parse_line(line)
+    if board is None:
+        return None, 'malformed puzzle', 0
+    if not is_valid_board(board) or not ENGINES[engine](board):
+        return None, 'no solution', (time.perf_counter() - start) * 1000
+    return ''.join(str(num) for row in board for num in row), None, (time.perf_counter() - start) * 1000
+
+
+def read_lines(paths, unreadable=None):
+    """
+    Yield (source, line number, line) for the puzzles of each input ('-' is stdin)
+    :param paths: list of files (empty for stdin)
+    :param unreadable: (optional) list that (path, error) of files that can't be opened are added to
+        (they are skipped)
+    """
+
+    for path in paths or ['-']:
+        try:
+            file = sys.stdin if path == '-' else open(path)
+        except OSError as error:
+            if unreadable is None:
+                raise
+            unreadable.append((path, error))
+            continue
+        try:
+            for number, line in enumerate(file, 1):
+                if line.strip():
+                    yield path, number, line
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+
+def solve_stream(paths, engine='backtrack', workers=1, slowest=5, out=sys.stdout, err=sys.stderr):
+    """
+    Solve puzzles line by line, writing results in input order (constant memory)
+    :param paths: list of input files (empty for stdin)
+    :param engine: name of the solving engine
+    :param workers: number of worker processes (1 solves in this process)
+    :param slowest: number of slowest puzzles listed in the summary
+    :param out: stream for solutions and per-line errors
+    :param err: stream for the summary
+    :returns: number of puzzles and input files that failed
+    """
+
+    start = time.perf_counter()
+    solved = failed = 0
+    slow = []  # Min heap of the slowest (ms, source, line number)
+    unreadable = []  # (path, error) of the inputs that couldn't be opened
+
+    def emit(source, number, solution, error, ms):
+        nonlocal solved, failed
+        if error:
+            failed += 1
+            out.write(f'ERROR {source}:{number}: {error}\n')
+        else:
+            solved += 1
+            out.write(solution + '\n')
+        if len(slow) < slowest:
+            heapq.heappush(slow, (ms, source, number))
+        elif slowest and ms > slow[0][0]:
+            heapq.heapreplace(slow, (ms, source, number))
+
+    if workers <= 1:
+        for source, number, line in read_lines(paths, unreadable):
+            emit(source, number, *solve_line(line, engine))
+    else:
+        # Bounded window of puzzles in flight, written as the oldest finishes
+        pending = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for source, number, line in read_lines(paths, unreadable):
+                pending.append((source, number, pool.submit(solve_line, line, engine)))
+                if len(pending) >= workers * 4:
+                    source, number, future = pending.popleft()
+                    emit(source, number, *future.result())
+            while pending:
+                source, number, future = pending.popleft()
+                emit(source, number, *future.result())
+    out.flush()
+
+    # Summary
+    elapsed = time.perf_counter() - start
+    total = solved + failed
+    err.write(f'{total} puzzles: {solved} solved, {failed} failed in {elapsed:.2f} s '
+              f'({total / elapsed if elapsed else 0:.1f} puzzles/s, engine {engine}, {workers} workers)\n')
+    for ms, source, number in sorted(slow, reverse=True):
+        err.write(f'  {ms:9.2f} ms  {source}:{number}\n')
+    for path, error in unreadable:
+        err.write(f'solvoku: {path}: {error.strerror or error}\n')
+    return failed + len(unreadable)
+
+
+def main(argv=None):
+    """Run the command line interface"""
+
+    parser = argparse.ArgumentParser(prog='solvoku', description='Solvoku command line tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    solve_parser = commands.add_parser('solve', help='solve puzzles line by line (81 chars, 0 or . for blanks)')
+    solve_parser.add_argument('files', nargs='*', help="input files (default: stdin, '-' for stdin)")
+    solve_parser.add_argument('--engine', choices=sorted(ENGINES), default='backtrack')
+    solve_parser.add_argument('--workers', type=int, default=1, help='worker processes')
+    solve_parser.add_argument('--slowest', type=int, default=5, help='slowest puzzles listed in the summary')
+
+    args = parser.parse_args(argv)
+    if args.command == 'solve':
+        failed = solve_stream(args.files, args.engine, args.workers, args.slowest)
+        return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # Output closed early (ex. piped to head)
+        sys.exit(1)
@@ -0,0 +1,111 @@
+"""
+File: template_classifier.py
+Description:
+    Lightweight stand-in for the CNN digit model, matching each space
+    against digits rendered with OpenCV's fonts. Has the same predict()
+    interface as the keras model, so the pipeline and its benchmarks can
+    run without the .h5 weights.
+"""
+
+import cv2
+import numpy as np
+
+from process import cell_ink, INK_LEVEL, MIN_INK
+
+
+# Fonts and stroke thicknesses the templates are drawn with
+FONTS = [cv2.FONT_HERSHEY_SIMPLEX, cv2.FONT_HERSHEY_DUPLEX, cv2.FONT_HERSHEY_COMPLEX,
+         cv2.FONT_HERSHEY_TRIPLEX, cv2.FONT_HERSHEY_PLAIN, cv2.FONT_HERSHEY_COMPLEX_SMALL]
+THICKNESSES = [2, 4, 6]
+
+# Side of the box a digit is scaled into (inside the 28x28 space)
+DIGIT_SIZE = 24
+
+# Blur (sigma) applied before matching, tolerates small differences in shape and stroke
+BLUR = 2
+
+# Sharpness of the match scores turned into probabilities
+SHARPNESS = 120
+
+
+def normalize_digit(ink):
+    """
+    Crop a digit to its ink, scale it into a DIGIT_SIZE box and center it (MNIST style)
+    :param ink: 2d float array, digit pixels high
+    :returns: flat float32 vector (28 * 28) with zero mean and unit length, or None if blank
+    """
+
+    mask = ink > 0.5 * ink.max() if ink.max() > 0 else ink > 0
+    if mask.sum() < MIN_INK:
+        return None
+    rows, cols = np.flatnonzero(mask.any(axis=1)), np.flatnonzero(mask.any(axis=0))
+    digit = ink[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1]
+
+    height, width = digit.shape
+    scale = DIGIT_SIZE / max(height, width)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    digit = cv2.resize(digit.astype(np.float32), size, interpolation=cv2.INTER_AREA)
+
+    out = np.zeros((28, 28), np.float32)
+    y, x = (28 - size[1]) // 2, (28 - size[0]) // 2
+    out[y:y + size[1], x:x + size[0]] = digit
+    out = cv2.GaussianBlur(out, (0, 0), BLUR)
+    out -= out.mean()
+    norm = np.linalg.norm(out)
+    return (out / norm).ravel() if norm else None
+
+
+def render_templates(fonts=FONTS, thicknesses=THICKNESSES):
+    """
+    Draw every digit in every font and thickness
+    :returns: (templates array of shape (m, 784), digit of each template)
+    """
+
+    templates, digits = [], []
+    for font in fonts:
+        for thickness in thicknesses:
+            for num in range(1, 10):
+                canvas = np.zeros((120, 120), np.uint8)
+                cv2.putText(canvas, str(num), (25, 95), font, 3, 255, thickness, cv2.LINE_AA)
+                vector = normalize_digit(canvas.astype(np.float32) / 255)
+                if vector is not None:
+                    templates.append(vector)
+                    digits.append(num)
+    return np.array(templates), np.array(digits)
+
+
+class TemplateClassifier():
+    def __init__(self, fonts=FONTS, thicknesses=THICKNESSES):
+        """
+        Digit classifier by template matching (stand-in for the CNN model)
+        :param fonts: OpenCV fonts the templates are drawn with
+        :param thicknesses: stroke thicknesses the templates are drawn with
+        """
+
+        self.templates, self.digits = render_templates(fonts, thicknesses)
+
+    def predict(self, cells, verbose=0):
+        """
+        Class probabilities of prepared spaces (same interface as the keras model)
+        :param cells: array of shape (n, 28, 28, 1), values 0-1 (dark digits on a light background)
+        :param verbose: ignored (keras compatibility)
+        :returns: array of shape (n, 10), class 0 for blank spaces
+        """
+
+        cells = np.asarray(cells, np.float32).reshape(len(cells), 28, 28)
+        predictions = np.zeros((len(cells), 10), np.float32)
+
+        for i, cell in enumerate(cells):
+            ink = cell_ink(cell)
+            vector = normalize_digit(ink) if ink.max() > INK_LEVEL else None
+            if vector is None:
+                predictions[i, 0] = 1
+                continue
+
+            # Best match of each digit, turned into probabilities
+            scores = self.templates @ vector
+            best = np.full(10, -np.inf, np.float32)
+            np.maximum.at(best, self.digits, scores)
+            exp = np.exp(SHARPNESS * (best[1:] - best[1:].max()))
+            predictions[i, 1:] = exp / exp.sum()
+        return predictions
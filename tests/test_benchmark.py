@@ -0,0 +1,25 @@
+"""
+File: test_benchmark.py
+Description:
+    Tests for the corpus benchmark's statistics.
+"""
+
+import pytest
+
+from benchmark import percentile
+
+
+@pytest.mark.parametrize('values, q, expected', [
+    ([5], 50, 5),
+    ([5], 95, 5),
+    ([1, 2], 50, 1),
+    ([1, 2], 95, 2),
+    ([1, 2, 3], 50, 2),
+    ([6, 1, 5, 2, 4, 3], 50, 3),
+    ([6, 1, 5, 2, 4, 3], 95, 6),
+    ([1, 2, 3, 4], 0, 1),
+    ([1, 2, 3, 4], 100, 4),
+    (list(range(1, 21)), 95, 19),
+])
+def test_percentile_nearest_rank(values, q, expected):
+    assert percentile(values, q) == expected
@@ -0,0 +1,46 @@
+"""
+File: test_pipeline.py
+Description:
+    Tests for the staged image pipeline's error handling.
+"""
+
+import glob
+import os
+import threading
+
+from pipeline import run_pipeline
+
+
+BOARDS = sorted(glob.glob(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Boards', '*.jpg')))
+
+
+class RaisingModel():
+    """Classifier whose every call fails"""
+
+    def predict(self, cells, verbose=0):
+        raise RuntimeError('model failed')
+
+
+def run_with_timeout(paths, model, timeout=60):
+    """run_pipeline on a thread, so a stalled pipeline fails the test instead of hanging it"""
+
+    outcome = {}
+    thread = threading.Thread(target=lambda: outcome.update(result=run_pipeline(paths, model, solve_workers=1)),
+                              daemon=True)
+    thread.start()
+    thread.join(timeout)
+    assert not thread.is_alive(), 'run_pipeline did not return'
+    return outcome['result']
+
+
+def test_model_error_is_reported_per_image():
+    paths = BOARDS + ['missing.jpg']
+    results, report = run_with_timeout(paths, RaisingModel())
+
+    assert len(results) == len(paths)
+    assert [result.path for result in results] == paths
+    for result in results[:-1]:
+        assert result.error == 'Error: model failed'
+        assert result.solution is None
+    assert results[-1].error == 'Error: image not found'
+    assert report['images'] == len(paths)
@@ -0,0 +1,125 @@
+"""
+File: tracing.py
+Description:
+    Lightweight per-stage tracing for the image pipeline. Records the
+    duration and memory delta of each named stage so slow steps of the
+    img_solver module can be found, with a no-op tracer used when disabled.
+"""
+
+import json
+import time
+import tracemalloc
+
+
+class _NullStage():
+    """Shared do-nothing context manager handed out when tracing is off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage():
+    """Context manager timing a single stage of a traced run"""
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        if self.tracer.memory:
+            self.start_mem = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        mem_delta = 0
+        if self.tracer.memory:
+            mem_delta = tracemalloc.get_traced_memory()[0] - self.start_mem
+
+        self.tracer.records.append({'stage': self.name,
+                                    'ms': duration * 1000,
+                                    'mem_kb': mem_delta / 1024})
+        return False
+
+
+class Tracer():
+    def __init__(self, enabled=True, memory=False, listener=None):
+        """
+        Collects stage timings for one run of the pipeline
+        :param enabled: whether to record timings (False = no-op stages)
+        :param memory: whether to record memory deltas with tracemalloc
+        :param listener: (optional) function called with each stage name as it starts
+        """
+
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.listener = listener
+        self.records = []
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name):
+        """
+        Time a block of code as a named stage
+        :param name: name of the stage (ex. 'imread')
+        :returns: context manager for a with statement
+        """
+
+        if self.listener is not None:
+            self.listener(name)
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def total_ms(self):
+        """Total traced time in milliseconds"""
+        return sum(record['ms'] for record in self.records)
+
+    def to_json(self, **extra):
+        """
+        Format the records as a single JSON line (batch mode)
+        :param extra: additional fields to store with the records (ex. path)
+        :returns: JSON str
+        """
+
+        line = dict(extra)
+        line['total_ms'] = round(self.total_ms(), 3)
+        line['stages'] = [{key: (round(value, 3) if isinstance(value, float) else value)
+                           for key, value in record.items()} for record in self.records]
+        return json.dumps(line)
+
+
+# Shared disabled tracer (default for untraced calls)
+NULL_TRACER = Tracer(enabled=False)
+
+
+def summary_table(tracers):
+    """
+    Build a table of per-stage statistics over one or more traced runs
+    :param tracers: list of Tracer objects
+    :returns: table as a str
+    """
+
+    # Group durations and memory deltas by stage, keeping pipeline order
+    stages = {}
+    for tracer in tracers:
+        for record in tracer.records:
+            stage = stages.setdefault(record['stage'], {'ms': [], 'mem_kb': []})
+            stage['ms'].append(record['ms'])
+            stage['mem_kb'].append(record['mem_kb'])
+
+    lines = [f"{'stage':<16}{'calls':>6}{'mean ms':>10}{'max ms':>10}{'total ms':>11}{'mem kb':>10}"]
+    for name, stage in stages.items():
+        times = stage['ms']
+        lines.append(f"{name:<16}{len(times):>6}{sum(times) / len(times):>10.2f}"
+                     f"{max(times):>10.2f}{sum(times):>11.2f}"
+                     f"{sum(stage['mem_kb']) / len(times):>10.1f}")
+    return '\n'.join(lines)
@@ -0,0 +1,93 @@
+"""
+File: worker.py
+Description:
+    Runs the img_solver pipeline on a background thread so the pygame
+    event loop keeps running during a solve. Jobs report the stage they
+    are currently in and can be cancelled between stages.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from img_solver import display_image_solution
+from cache import default_cache
+from tracing import Tracer
+
+
+# Readable progress text for each pipeline stage
+STAGE_LABELS = {
+    'queued': 'Waiting...',
+    'cache': 'Checking saved solves...',
+    'load_model': 'Loading model...',
+    'imread': 'Reading image...',
+    'resize': 'Reading image...',
+    'pre_process': 'Finding board...',
+    'findContours': 'Finding board...',
+    'largest_contour': 'Finding board...',
+    'warp': 'Straightening board...',
+    'split_spaces': 'Reading digits...',
+    'predict': 'Reading digits...',
+    'solve': 'Solving...',
+    'correct': 'Checking misread digits...',
+    'render': 'Drawing solution...',
+    'imwrite': 'Saving images...'
+}
+
+# Single background worker (solves run one at a time)
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='solver')
+
+
+class SolveCancelled(Exception):
+    """Raised inside the worker when a job is cancelled"""
+
+
+class SolveJob():
+    def __init__(self, path_img, operation=None):
+        """
+        Submit an image solve to the background worker
+        :param path_img: image file of a sudoku board
+        :param operation: view or list of views to render
+        """
+
+        self.path = path_img
+        self.stage = 'queued'
+        self._cancel_event = threading.Event()
+        self._future = _executor.submit(self._run, path_img, operation)
+
+    def _on_stage(self, name):
+        """Tracer listener: record progress and stop if cancelled"""
+        if self._cancel_event.is_set():
+            raise SolveCancelled()
+        self.stage = name
+
+    def _run(self, path_img, operation):
+        """Body of the job (runs on the worker thread)"""
+        tracer = Tracer(enabled=False, listener=self._on_stage)
+        return display_image_solution(path_img, operation, tracer=tracer, cache=default_cache())
+
+    def label(self):
+        """Readable text for the current stage"""
+        return STAGE_LABELS.get(self.stage, self.stage)
+
+    def done(self):
+        """Whether the job finished (poll once per frame)"""
+        return self._future.done()
+
+    def cancel(self):
+        """Cancel the job (stops at the next stage boundary)"""
+        self._cancel_event.set()
+        self._future.cancel()
+
+    def cancelled(self):
+        """Whether the job was cancelled"""
+        return self._cancel_event.is_set()
+
+    def result(self):
+        """
+        Result of a finished job
+        :returns: ImageResult, or None if cancelled
+        """
+
+        if self.cancelled():
+            return None
+        return self._future.result()